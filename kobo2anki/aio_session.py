@@ -0,0 +1,199 @@
+import json
+import random
+import asyncio
+import logging
+import dataclasses
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from kobo2anki import errors
+from kobo2anki.circuit_breaker import get_circuit_breaker
+from kobo2anki.http_session import (
+    DEFAULT_BACKOFF_FACTOR, DEFAULT_BACKOFF_JITTER, DEFAULT_HOST_CONCURRENCY, DEFAULT_HOST_RATE, DEFAULT_RETRIES,
+    DEFAULT_TIMEOUT, MAX_RETRY_AFTER, RETRY_STATUSES, HostRateLimiter,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# errors of a single attempt, request is retried after them
+TRANSIENT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+# errors callers get when request couldn't be made
+REQUEST_ERRORS = TRANSIENT_ERRORS + (errors.CircuitOpenError,)
+
+
+@dataclasses.dataclass
+class AsyncResponse:
+    """
+    Finished response, body is read before the connection goes back to the pool.
+    """
+    status_code: int
+    content: bytes
+    headers: Dict[str, str]
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class AsyncHTTPSession:
+    """
+    Counterpart of HTTPSession for an event loop, built on aiohttp:
+    keep-alive connections with at most `max_requests_per_host` of them per host,
+    a timeout of the whole request, retries of throttled and failed requests
+    with jittered exponential backoff, per host rate limiting and per host circuit breakers,
+    which are shared with HTTPSession.
+    aiohttp session is created on the first request, so it is bound to the loop making it.
+    """
+
+    def __init__(
+            self,
+            timeout: float = DEFAULT_TIMEOUT,
+            max_requests_per_host: int = DEFAULT_HOST_CONCURRENCY,
+            retries: int = DEFAULT_RETRIES,
+            backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+            rate_limiter: Optional[HostRateLimiter] = None,
+    ):
+        if max_requests_per_host < 1:
+            raise ValueError(f"Host concurrency limit must be positive, got {max_requests_per_host}")
+        self.timeout = timeout
+        self.max_requests_per_host = max_requests_per_host
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self._retries = retries
+        self._backoff_factor = backoff_factor
+        self._session = None  # type: Optional[aiohttp.ClientSession]
+
+    async def __aenter__(self) -> "AsyncHTTPSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get(self, url: str, **kwargs) -> AsyncResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> AsyncResponse:
+        return await self.request("HEAD", url, **kwargs)
+
+    async def request(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        breaker = get_circuit_breaker(urlparse(url).netloc)
+        breaker.before_call()
+        failed = True
+        try:
+            response = await self._request_with_retries(method, url, **kwargs)
+            # retries are already exhausted at this point
+            failed = response.status_code in RETRY_STATUSES
+            return response
+        finally:
+            # cancelled request counts as failed too, so a half-open circuit isn't left waiting for it
+            if failed:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+    async def _request_with_retries(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        session = self._get_session()
+        attempt = 0
+        while True:
+            wait = self.rate_limiter.reserve(url)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    result = AsyncResponse(response.status, await response.read(), dict(response.headers))
+            except TRANSIENT_ERRORS as exc:
+                if attempt >= self._retries:
+                    raise
+                delay = self._get_backoff(attempt)
+                logger.debug("%s %s failed, will retry in %.2f seconds. Err: %r", method, url, delay, exc)
+            else:
+                if result.status_code not in RETRY_STATUSES or attempt >= self._retries:
+                    return result
+                delay = self._get_retry_after(result)
+                if delay is None:
+                    delay = self._get_backoff(attempt)
+                logger.debug(
+                    "%s %s got status %d, will retry in %.2f seconds", method, url, result.status_code, delay
+                )
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _get_backoff(self, attempt: int) -> float:
+        # same delays as JitteredRetry of HTTPSession
+        return self._backoff_factor * 2 ** attempt + random.uniform(0, DEFAULT_BACKOFF_JITTER)
+
+    def _get_retry_after(self, response: AsyncResponse) -> Optional[float]:
+        try:
+            retry_after = float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            # HTTP date isn't supported, backoff is used then
+            return None
+        return min(max(retry_after, 0), MAX_RETRY_AFTER)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            logger.debug(
+                "Initialize async HTTP session, timeout %s, %d requests per host",
+                self.timeout, self.max_requests_per_host
+            )
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, limit_per_host=self.max_requests_per_host),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+
+_timeout = DEFAULT_TIMEOUT  # type: float
+_max_requests_per_host = DEFAULT_HOST_CONCURRENCY
+_retries = DEFAULT_RETRIES
+_host_rate = DEFAULT_HOST_RATE  # type: float
+_session = None  # type: Optional[AsyncHTTPSession]
+_session_loop = None  # type: Optional[asyncio.AbstractEventLoop]
+
+
+def configure_async_session(
+        timeout: float = DEFAULT_TIMEOUT,
+        max_requests_per_host: int = DEFAULT_HOST_CONCURRENCY,
+        retries: int = DEFAULT_RETRIES,
+        host_rate: float = DEFAULT_HOST_RATE,
+):
+    """
+    Choose settings of sessions returned by get_async_session.
+    """
+    global _timeout, _max_requests_per_host, _retries, _host_rate  # pylint: disable=global-statement
+    _timeout = timeout
+    _max_requests_per_host = max_requests_per_host
+    _retries = retries
+    _host_rate = host_rate
+
+
+def get_async_session() -> AsyncHTTPSession:
+    """
+    Returns HTTP session shared by all network components on the running event loop.
+    Should be closed with close_async_session before the loop is closed.
+    """
+    global _session, _session_loop  # pylint: disable=global-statement
+    loop = asyncio.get_running_loop()
+    if _session is None or _session_loop is not loop:
+        _session = AsyncHTTPSession(
+            timeout=_timeout,
+            max_requests_per_host=_max_requests_per_host,
+            retries=_retries,
+            rate_limiter=HostRateLimiter(_host_rate),
+        )
+        _session_loop = loop
+    return _session
+
+
+async def close_async_session():
+    global _session, _session_loop  # pylint: disable=global-statement
+    if _session is not None and _session_loop is asyncio.get_running_loop():
+        await _session.close()
+    _session = None
+    _session_loop = None
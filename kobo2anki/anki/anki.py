@@ -6,6 +6,7 @@ from typing import List, Optional
 
 import genanki
 
+from kobo2anki import errors
 from kobo2anki.anki import model
 from kobo2anki.model import WordDefinition
 from kobo2anki.image_searcher import ImageSearcher
@@ -45,10 +46,13 @@ class AnkiDeck:
                 deck_id
             )
             if word_definition.pronunciation:
-                word_definition.pronunciation.save_audio_file_to(
-                    os.path.join(self.tempdir, word_definition.pronunciation.get_filename())
-                )
-                media_files.append(word_definition.pronunciation.get_filename())
+                try:
+                    word_definition.pronunciation.save_audio_file_to(
+                        os.path.join(self.tempdir, word_definition.pronunciation.get_filename())
+                    )
+                    media_files.append(word_definition.pronunciation.get_filename())
+                except errors.GettingPronunciationError as exc:
+                    logger.warning("Word %s will have no pronunciation. Err: %s", word_definition.word, exc)
             if word_definition.image:
                 word_definition.image.save_image_to(
                     os.path.join(self.tempdir, word_definition.image.get_filename())
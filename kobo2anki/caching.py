@@ -1,16 +1,198 @@
 import os
+import bz2
+import time
+import lzma
+import zlib
+import struct
+import hashlib
+import sqlite3
 import logging
+import tempfile
+import threading
+import contextlib
+import collections
+import dataclasses
 import appdirs
 
-from typing import Optional
+try:
+    import fcntl
+except ImportError:  # not available on Windows, cache files are not locked there
+    fcntl = None  # type: ignore
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Protocol, Set, Tuple, Type, Union, runtime_checkable
 
 logger = logging.getLogger(__name__)
 
+# words dictionaries don't know are not asked again for 30 days by default
+DEFAULT_NEGATIVE_CACHE_TTL = 30 * 24 * 60 * 60
+
+DEFAULT_MEMORY_CACHE_ENTRIES = 10000
+DEFAULT_MEMORY_CACHE_BYTES = 64 * 1024 * 1024
+
+DAY = 24 * 60 * 60
+MB = 1024 * 1024
+
+
+@dataclasses.dataclass
+class EntityLimits:
+    """
+    Limits for one cache entity, None means no limit.
+    max_bytes - when entity takes more, least recently used records are removed by gc.
+    max_age - records stored more than max_age seconds ago are treated as missing and removed by gc.
+    """
+    max_bytes: Optional[int] = None
+    max_age: Optional[float] = None
+
+
+# entities which are not listed here are not limited
+DEFAULT_ENTITY_LIMITS = {
+    "wp": EntityLimits(max_bytes=512 * MB),
+    "images": EntityLimits(max_bytes=512 * MB),
+    "oxforddictionaries": EntityLimits(max_bytes=256 * MB, max_age=365 * DAY),
+    "freedictionary": EntityLimits(max_bytes=256 * MB, max_age=365 * DAY),
+}  # type: Dict[str, EntityLimits]
+
+
+@dataclasses.dataclass
+class EntityUsage:
+    entries: int = 0
+    bytes: int = 0
+
+
+@dataclasses.dataclass
+class GCResult:
+    removed_entries: int = 0
+    freed_bytes: int = 0
+
+
+# All cache backends must implement this protocol
+@runtime_checkable
+class CacheHandler(Protocol):
+
+    def get_cached_data(self, entity: str, key: str) -> Optional[bytes]:
+        pass
+
+    def save_data_to_cache(self, entity: str, key: str, data: bytes):
+        pass
+
+    def get_many(self, entity: str, keys: Iterable[str]) -> Dict[str, bytes]:
+        """
+        Returns cached data for keys which are in the cache, missing keys are skipped.
+        """
+        pass
+
+    def put_many(self, entity: str, items: Dict[str, bytes]):
+        pass
+
+
+@dataclasses.dataclass(frozen=True)
+class Codec:
+    codec_id: int
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+def _identity(data: bytes) -> bytes:
+    return data
+
+
+CODECS = {
+    "identity": Codec(0, _identity, _identity),
+    "zlib": Codec(1, zlib.compress, zlib.decompress),
+    "lzma": Codec(2, lzma.compress, lzma.decompress),
+    "bz2": Codec(3, bz2.compress, bz2.decompress),
+}  # type: Dict[str, Codec]
+CODECS_BY_ID = {codec.codec_id: codec for codec in CODECS.values()}
+
+# dictionary responses are verbose JSON and compress well,
+# media files(mp3, jpg) are already compressed, so other entities are stored as is
+DEFAULT_ENTITY_CODECS = {
+    "oxforddictionaries": "zlib",
+    "freedictionary": "zlib",
+}  # type: Dict[str, str]
+
+
+# Cache files start with a header: magic, format version, codec and sha256 of the
+# stored(compressed) data. Files without the header were written by older versions
+# and are read as is, version 1 files have no codec and are never compressed.
+RECORD_MAGIC = b"K2AC"
+RECORD_VERSION = 2
+RECORD_HEADER = struct.Struct(">4sBB32s")
+RECORD_HEADER_V1 = struct.Struct(">4sB32s")
+
+LOCK_FILENAME = ".lock"
+TMP_FILE_PREFIX = ".tmp-"
+# temp files older than that were left by crashed runs
+STALE_TMP_FILE_AGE = 60 * 60
+
+
+def _pack_record(data: bytes, codec: Codec) -> bytes:
+    payload = codec.compress(data)
+    header = RECORD_HEADER.pack(
+        RECORD_MAGIC, RECORD_VERSION, codec.codec_id, hashlib.sha256(payload).digest()
+    )
+    return header + payload
+
+
+def _unpack_record(raw_data: bytes) -> Optional[bytes]:
+    """
+    Returns record data, or None if data doesn't match its checksum or can't be decompressed.
+    """
+    if not raw_data.startswith(RECORD_MAGIC) or len(raw_data) < RECORD_HEADER_V1.size:
+        return raw_data
+    version = raw_data[len(RECORD_MAGIC)]
+    if version == 1:
+        _, _, checksum = RECORD_HEADER_V1.unpack_from(raw_data)
+        codec = CODECS["identity"]
+        payload = raw_data[RECORD_HEADER_V1.size:]
+    elif version == RECORD_VERSION and len(raw_data) >= RECORD_HEADER.size:
+        _, _, codec_id, checksum = RECORD_HEADER.unpack_from(raw_data)
+        if codec_id not in CODECS_BY_ID:
+            logger.warning("Unknown cache record codec %d", codec_id)
+            return None
+        codec = CODECS_BY_ID[codec_id]
+        payload = raw_data[RECORD_HEADER.size:]
+    else:
+        logger.warning("Unknown cache record version %d", version)
+        return None
+    if hashlib.sha256(payload).digest() != checksum:
+        return None
+    return _decompress(codec, payload)
+
+
+def _decompress(codec: Codec, payload: bytes) -> Optional[bytes]:
+    try:
+        return codec.decompress(payload)
+    except (zlib.error, lzma.LZMAError, OSError, ValueError) as exc:
+        logger.warning("Can't decompress cache record. Err: %s", exc)
+        return None
+
+
+def _get_codec_name(entity: str, codecs: Dict[str, str]) -> str:
+    return codecs.get(entity, "identity")
+
+
+def _is_expired(stored_at: float, limits: Optional[EntityLimits], now: float) -> bool:
+    return bool(limits and limits.max_age is not None and now - stored_at > limits.max_age)
+
 
 class LocalFSCaching:
+    """
+    Keeps every cache record in a separate file <cache dir>/kobo2anki/<entity>/<key>
+    File's mtime is the time record was stored, atime is the time it was used last time.
+    Files are written to a temp file and renamed, so readers never see partially written
+    records and don't need locks. Writers hold the entity's lock file, so several
+    processes can share one cache dir.
+    """
 
-    def __init__(self):
+    def __init__(
+            self,
+            entity_limits: Optional[Dict[str, EntityLimits]] = None,
+            codecs: Optional[Dict[str, str]] = None,
+    ):
         self._cache_dir = appdirs.user_cache_dir()
+        self._entity_limits = DEFAULT_ENTITY_LIMITS if entity_limits is None else entity_limits
+        self._codecs = DEFAULT_ENTITY_CODECS if codecs is None else codecs
         logger.debug("Use '%s' as cache dir", self._cache_dir)
 
     def _get_cache_file_path(self, key: str, entity: str) -> str:
@@ -31,25 +213,641 @@ class LocalFSCaching:
         cache_file_path = self._get_cache_file_path(key, entity)
         try:
             with open(cache_file_path, 'rb') as fh:
-                result = fh.read()
+                file_stat = os.fstat(fh.fileno())
+                now = time.time()
+                if _is_expired(file_stat.st_mtime, self._entity_limits.get(entity), now):
+                    logger.debug("Cache for %s with key %s expired", key, entity)
+                    return None
+                result = _unpack_record(fh.read())
+            if result is None:
+                logger.warning(
+                    "Cache file %s is corrupted, will ignore it", cache_file_path
+                )
+                return None
+            # remember when record was used, gc removes least recently used records first
+            os.utime(cache_file_path, (now, file_stat.st_mtime))
         except FileNotFoundError:
             logger.debug("Cache for %s with key %s not found", key, entity)
         return result
 
     def save_data_to_cache(self, entity: str, key: str, data: bytes):
         cache_file_path = self._get_cache_file_path(key, entity)
-        if os.path.exists(cache_file_path):
-            logger.warning(
-                """Looks like we already have some cache fo key %s
-                and entity %s. Will overwrite it.""",
-                key, entity
-            )
-        else:
-            cache_dir = os.path.dirname(cache_file_path)
-            if not os.path.exists(cache_dir):
-                logger.debug("Going to create cache dir '%s'", cache_dir)
-                os.makedirs(cache_dir)
-
-        with open(cache_file_path, "wb") as fh:
-            fh.write(data)
+        cache_dir = os.path.dirname(cache_file_path)
+        with self._lock_entity(entity):
+            if os.path.exists(cache_file_path):
+                logger.warning(
+                    """Looks like we already have some cache fo key %s
+                    and entity %s. Will overwrite it.""",
+                    key, entity
+                )
+            fd, tmp_file_path = tempfile.mkstemp(dir=cache_dir, prefix=TMP_FILE_PREFIX)
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(_pack_record(data, CODECS[_get_codec_name(entity, self._codecs)]))
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                os.replace(tmp_file_path, cache_file_path)
+            except BaseException:
+                os.remove(tmp_file_path)
+                raise
         logger.debug("Recorded %d bytes into cache file %s", len(data), cache_file_path)
+
+    @contextlib.contextmanager
+    def _lock_entity(self, entity: str) -> Iterator[None]:
+        entity_dir = os.path.join(self._cache_dir, "kobo2anki", entity)
+        os.makedirs(entity_dir, exist_ok=True)
+        with open(os.path.join(entity_dir, LOCK_FILENAME), "ab") as lock_fh:
+            if fcntl is not None:
+                fcntl.flock(lock_fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_fh.fileno(), fcntl.LOCK_UN)
+
+    def get_many(self, entity: str, keys: Iterable[str]) -> Dict[str, bytes]:
+        result = {}  # type: Dict[str, bytes]
+        for key in keys:
+            data = self.get_cached_data(entity, key)
+            if data is not None:
+                result[key] = data
+        return result
+
+    def put_many(self, entity: str, items: Dict[str, bytes]):
+        for key, data in items.items():
+            self.save_data_to_cache(entity, key, data)
+
+    def iter_entity(self, entity: str) -> Iterator[Tuple[str, bytes]]:
+        """
+        Yields all keys and data of an entity, expiration isn't checked.
+        """
+        entity_dir = os.path.join(self._cache_dir, "kobo2anki", entity)
+        if not os.path.isdir(entity_dir):
+            return
+        for file_path, _ in sorted(self._get_entity_files(entity)):
+            try:
+                with open(file_path, "rb") as fh:
+                    data = _unpack_record(fh.read())
+            except FileNotFoundError:
+                # removed by gc of other process
+                continue
+            if data is None:
+                logger.warning("Cache file %s is corrupted, skip it", file_path)
+                continue
+            yield os.path.basename(file_path), data
+
+    def _get_entities(self) -> List[str]:
+        root_dir = os.path.join(self._cache_dir, "kobo2anki")
+        if not os.path.isdir(root_dir):
+            return []
+        return sorted(
+            entity for entity in os.listdir(root_dir)
+            if os.path.isdir(os.path.join(root_dir, entity))
+        )
+
+    def _get_entity_files(self, entity: str) -> List[Tuple[str, os.stat_result]]:
+        entity_dir = os.path.join(self._cache_dir, "kobo2anki", entity)
+        files = []
+        with os.scandir(entity_dir) as entries:
+            for entry in entries:
+                # skip lock and temp files
+                if entry.is_file() and not entry.name.startswith("."):
+                    files.append((entry.path, entry.stat()))
+        return files
+
+    def _remove_stale_tmp_files(self, entity: str, now: float):
+        entity_dir = os.path.join(self._cache_dir, "kobo2anki", entity)
+        with os.scandir(entity_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith(TMP_FILE_PREFIX) and \
+                        now - entry.stat().st_mtime > STALE_TMP_FILE_AGE:
+                    logger.debug("Remove stale temp file %s", entry.path)
+                    os.remove(entry.path)
+
+    def usage(self) -> Dict[str, EntityUsage]:
+        result = {}  # type: Dict[str, EntityUsage]
+        for entity in self._get_entities():
+            files = self._get_entity_files(entity)
+            result[entity] = EntityUsage(
+                entries=len(files),
+                bytes=sum(file_stat.st_size for _, file_stat in files)
+            )
+        return result
+
+    def gc(self) -> GCResult:
+        """
+        Remove expired records, then least recently used records of entities over their quota.
+        """
+        result = GCResult()
+        now = time.time()
+        for entity in self._get_entities():
+            limits = self._entity_limits.get(entity)
+            with self._lock_entity(entity):
+                self._remove_stale_tmp_files(entity, now)
+                if limits is None:
+                    continue
+                # the most recently used records are kept first
+                files = sorted(
+                    self._get_entity_files(entity), key=lambda item: item[1].st_atime, reverse=True
+                )
+                to_remove = []
+                kept_bytes = 0
+                for file_path, file_stat in files:
+                    if not _is_expired(file_stat.st_mtime, limits, now):
+                        kept_bytes += file_stat.st_size
+                        if limits.max_bytes is None or kept_bytes <= limits.max_bytes:
+                            continue
+                    to_remove.append((file_path, file_stat))
+                for file_path, file_stat in to_remove:
+                    try:
+                        os.remove(file_path)
+                    except FileNotFoundError:
+                        continue
+                    result.removed_entries += 1
+                    result.freed_bytes += file_stat.st_size
+            if to_remove:
+                logger.info("Removed %d records of cache entity %s", len(to_remove), entity)
+        return result
+
+
+class SQLiteCaching:
+    """
+    Keeps all cache entities in one SQLite database(WAL mode) in
+    <cache dir>/kobo2anki/cache.sqlite.
+    On first use imports cache files left by LocalFSCaching and removes them,
+    reading cache usage doesn't count as use.
+    """
+
+    db_filename = "cache.sqlite"
+    # SQLite limits number of variables in one query
+    batch_size = 500
+    busy_timeout = 30
+    # VACUUM rewrites the whole DB, so gc runs it only when that share of pages is free
+    vacuum_free_ratio = 0.25
+
+    def __init__(
+            self,
+            db_path: Optional[str] = None,
+            entity_limits: Optional[Dict[str, EntityLimits]] = None,
+            codecs: Optional[Dict[str, str]] = None,
+    ):
+        self._cache_dir = os.path.join(appdirs.user_cache_dir(), "kobo2anki")
+        self._entity_limits = DEFAULT_ENTITY_LIMITS if entity_limits is None else entity_limits
+        self._codecs = DEFAULT_ENTITY_CODECS if codecs is None else codecs
+        self._db_path = db_path or os.path.join(self._cache_dir, self.db_filename)
+        logger.debug("Use '%s' as cache DB", self._db_path)
+        db_dir = os.path.dirname(self._db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        # connection is shared by all threads, access to it is serialized by the lock
+        self._lock = threading.Lock()
+        self._fs_migrated = False
+        self._migration_lock = threading.Lock()
+        # writes are done in transactions, so the DB stays consistent after crashes,
+        # other processes using the same DB wait for their turn up to the timeout
+        self._con = sqlite3.connect(
+            self._db_path, check_same_thread=False, timeout=self.busy_timeout
+        )
+        with self._lock, self._con:
+            self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.execute("PRAGMA synchronous=NORMAL")
+            self._con.execute(
+                """CREATE TABLE IF NOT EXISTS cache (
+                    entity TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL DEFAULT 0,
+                    codec TEXT NOT NULL DEFAULT 'identity',
+                    PRIMARY KEY (entity, key)
+                ) WITHOUT ROWID"""
+            )
+            # add columns missing in DBs created by older versions
+            columns = [row[1] for row in self._con.execute("PRAGMA table_info(cache)")]
+            if "accessed_at" not in columns:
+                self._con.execute(
+                    "ALTER TABLE cache ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0"
+                )
+            if "codec" not in columns:
+                self._con.execute(
+                    "ALTER TABLE cache ADD COLUMN codec TEXT NOT NULL DEFAULT 'identity'"
+                )
+            self._con.execute(
+                "CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (entity, accessed_at)"
+            )
+            self._con.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)"
+            )
+
+    def get_cached_data(self, entity: str, key: str) -> Optional[bytes]:
+        result = self.get_many(entity, [key])
+        if key not in result:
+            logger.debug("Cache for %s with key %s not found", key, entity)
+            return None
+        return result[key]
+
+    def save_data_to_cache(self, entity: str, key: str, data: bytes):
+        self.put_many(entity, {key: data})
+        logger.debug("Recorded %d bytes into cache for key %s and entity %s", len(data), key, entity)
+
+    def get_many(self, entity: str, keys: Iterable[str]) -> Dict[str, bytes]:
+        self._migrate_from_fs()
+        keys = list(keys)
+        result = {}  # type: Dict[str, bytes]
+        for i in range(0, len(keys), self.batch_size):
+            batch = keys[i:i + self.batch_size]
+            placeholders = ",".join("?" * len(batch))
+            now = time.time()
+            with self._lock, self._con:
+                rows = self._con.execute(
+                    f"SELECT key, data, stored_at, codec FROM cache WHERE entity = ? AND key IN ({placeholders})",
+                    (entity, *batch)
+                ).fetchall()
+                rows = [
+                    row for row in rows
+                    if not _is_expired(row[2], self._entity_limits.get(entity), now)
+                ]
+                # remember when records were used, gc removes least recently used records first
+                self._con.executemany(
+                    "UPDATE cache SET accessed_at = ? WHERE entity = ? AND key = ?",
+                    [(now, entity, row[0]) for row in rows]
+                )
+            for key, payload, _, codec_name in rows:
+                if codec_name not in CODECS:
+                    logger.warning("Unknown codec %s of cache record %s/%s", codec_name, entity, key)
+                    continue
+                data = _decompress(CODECS[codec_name], payload)
+                if data is not None:
+                    result[key] = data
+        logger.debug("Found %d of %d keys in cache for entity %s", len(result), len(keys), entity)
+        return result
+
+    def put_many(self, entity: str, items: Dict[str, bytes]):
+        self._migrate_from_fs()
+        self._put_many(entity, items)
+
+    def _put_many(self, entity: str, items: Dict[str, bytes]):
+        stored_at = time.time()
+        codec_name = _get_codec_name(entity, self._codecs)
+        codec = CODECS[codec_name]
+        records = [
+            (entity, key, codec.compress(data), stored_at, stored_at, codec_name)
+            for key, data in items.items()
+        ]
+        with self._lock, self._con:
+            self._con.executemany(
+                "INSERT OR REPLACE INTO cache (entity, key, data, stored_at, accessed_at, codec) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                records
+            )
+
+    def iter_entity(self, entity: str) -> Iterator[Tuple[str, bytes]]:
+        """
+        Yields all keys and data of an entity, expiration isn't checked.
+        Records are read in batches, so DB isn't locked while caller processes them.
+        """
+        self._migrate_from_fs()
+        last_key = ""
+        while True:
+            with self._lock:
+                rows = self._con.execute(
+                    "SELECT key, data, codec FROM cache WHERE entity = ? AND key > ? ORDER BY key LIMIT ?",
+                    (entity, last_key, self.batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for key, payload, codec_name in rows:
+                data = _decompress(CODECS[codec_name], payload) if codec_name in CODECS else None
+                if data is None:
+                    logger.warning("Can't read cache record %s/%s, skip it", entity, key)
+                    continue
+                yield key, data
+            last_key = rows[-1][0]
+
+    def usage(self) -> Dict[str, EntityUsage]:
+        with self._lock:
+            rows = self._con.execute(
+                "SELECT entity, count(*), sum(length(data)) FROM cache GROUP BY entity ORDER BY entity"
+            ).fetchall()
+        return {row[0]: EntityUsage(entries=row[1], bytes=row[2] or 0) for row in rows}
+
+    def gc(self) -> GCResult:
+        """
+        Remove expired records, then least recently used records of entities over their quota.
+        """
+        self._migrate_from_fs()
+        result = GCResult()
+        now = time.time()
+        for entity, limits in self._entity_limits.items():
+            with self._lock, self._con:
+                rows = self._con.execute(
+                    "SELECT key, length(data), stored_at FROM cache WHERE entity = ? "
+                    "ORDER BY accessed_at DESC",
+                    (entity,)
+                ).fetchall()
+                to_remove = []
+                kept_bytes = 0
+                for key, size, stored_at in rows:
+                    if not _is_expired(stored_at, limits, now):
+                        kept_bytes += size
+                        if limits.max_bytes is None or kept_bytes <= limits.max_bytes:
+                            continue
+                    to_remove.append((entity, key))
+                    result.removed_entries += 1
+                    result.freed_bytes += size
+                self._con.executemany(
+                    "DELETE FROM cache WHERE entity = ? AND key = ?", to_remove
+                )
+            if to_remove:
+                logger.info("Removed %d records of cache entity %s", len(to_remove), entity)
+        self._vacuum_if_fragmented()
+        return result
+
+    def _vacuum_if_fragmented(self):
+        # deleted rows only leave free pages, which are reused by later writes,
+        # file shrinks when DB is rebuilt
+        with self._lock:
+            free_pages = self._con.execute("PRAGMA freelist_count").fetchone()[0]
+            pages = self._con.execute("PRAGMA page_count").fetchone()[0]
+            if not pages or free_pages / pages < self.vacuum_free_ratio:
+                return
+            logger.info("%d of %d cache DB pages are free, rebuild it", free_pages, pages)
+            self._con.execute("VACUUM")
+
+    def _migrate_from_fs(self):
+        """
+        One time import of cache files created by LocalFSCaching.
+        Files are removed once they are committed to DB, interrupted import
+        continues on the next use with the files which are left.
+        """
+        if self._fs_migrated:
+            return
+        with self._migration_lock:
+            if self._fs_migrated:
+                return
+            with self._lock:
+                migrated = self._con.execute(
+                    "SELECT value FROM meta WHERE name = 'fs_migrated'"
+                ).fetchone()
+            if not migrated:
+                self._import_fs_files()
+                with self._lock, self._con:
+                    self._con.execute(
+                        "INSERT OR REPLACE INTO meta (name, value) VALUES ('fs_migrated', ?)",
+                        (str(time.time()),)
+                    )
+            self._fs_migrated = True
+
+    def _import_fs_files(self):
+        if not os.path.isdir(self._cache_dir):
+            return
+        imported = 0
+        for entity in os.listdir(self._cache_dir):
+            entity_dir = os.path.join(self._cache_dir, entity)
+            if not os.path.isdir(entity_dir):
+                continue
+            # files are written in batches, so the whole entity is never kept in memory
+            items = {}  # type: Dict[str, bytes]
+            batch_files = []  # type: List[str]
+            entity_imported = 0
+            for key in os.listdir(entity_dir):
+                file_path = os.path.join(entity_dir, key)
+                if key.startswith(".") or not os.path.isfile(file_path):
+                    continue
+                with open(file_path, "rb") as fh:
+                    data = _unpack_record(fh.read())
+                # corrupted files are removed with the imported ones
+                batch_files.append(file_path)
+                if data is None:
+                    continue
+                items[key] = data
+                if len(items) >= self.batch_size:
+                    entity_imported += self._import_batch(entity, items, batch_files)
+                    items, batch_files = {}, []
+            entity_imported += self._import_batch(entity, items, batch_files)
+            imported += entity_imported
+            logger.debug("Imported %d cache files for entity %s", entity_imported, entity)
+            # lock and unfinished temporary files are left, directory is kept if anything else is there
+            for name in os.listdir(entity_dir):
+                if name == LOCK_FILENAME or name.startswith(TMP_FILE_PREFIX):
+                    os.remove(os.path.join(entity_dir, name))
+            try:
+                os.rmdir(entity_dir)
+            except OSError:
+                logger.warning("Cache dir %s isn't empty after import, will keep it", entity_dir)
+        if imported:
+            logger.info("Imported %d cache files into %s", imported, self._db_path)
+
+    def _import_batch(self, entity: str, items: Dict[str, bytes], files: List[str]) -> int:
+        self._put_many(entity, items)
+        for file_path in files:
+            os.remove(file_path)
+        return len(items)
+
+
+@dataclasses.dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class MemoryLRUCaching:
+    """
+    Keeps recently used records in memory in front of another cache backend.
+    Memory tier is bounded by number of records and their total size, least
+    recently used records are evicted first. Writes go to both tiers.
+    """
+
+    def __init__(
+            self,
+            backend: CacheHandler,
+            max_entries: int = DEFAULT_MEMORY_CACHE_ENTRIES,
+            max_bytes: int = DEFAULT_MEMORY_CACHE_BYTES,
+    ):
+        self._backend = backend
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._records = collections.OrderedDict()  # type: collections.OrderedDict[Tuple[str, str], bytes]
+        self._size = 0
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> CacheHandler:
+        return self._backend
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return dataclasses.replace(self._stats)
+
+    def get_cached_data(self, entity: str, key: str) -> Optional[bytes]:
+        data = self._get_from_memory(entity, key)
+        if data is None:
+            data = self._backend.get_cached_data(entity, key)
+            if data is not None:
+                self._put_to_memory(entity, key, data)
+        return data
+
+    def save_data_to_cache(self, entity: str, key: str, data: bytes):
+        self._backend.save_data_to_cache(entity, key, data)
+        self._put_to_memory(entity, key, data)
+
+    def get_many(self, entity: str, keys: Iterable[str]) -> Dict[str, bytes]:
+        result = {}  # type: Dict[str, bytes]
+        missing_keys = []  # type: List[str]
+        for key in keys:
+            data = self._get_from_memory(entity, key)
+            if data is None:
+                missing_keys.append(key)
+            else:
+                result[key] = data
+        if missing_keys:
+            backend_result = self._backend.get_many(entity, missing_keys)
+            for key, data in backend_result.items():
+                self._put_to_memory(entity, key, data)
+            result.update(backend_result)
+        return result
+
+    def put_many(self, entity: str, items: Dict[str, bytes]):
+        self._backend.put_many(entity, items)
+        for key, data in items.items():
+            self._put_to_memory(entity, key, data)
+
+    def _get_from_memory(self, entity: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._records.get((entity, key))
+            if data is None:
+                self._stats.misses += 1
+            else:
+                self._stats.hits += 1
+                self._records.move_to_end((entity, key))
+            return data
+
+    def _put_to_memory(self, entity: str, key: str, data: bytes):
+        if len(data) > self._max_bytes:
+            logger.debug("Record %s/%s is too big to keep it in memory", entity, key)
+            return
+        with self._lock:
+            old_data = self._records.pop((entity, key), None)
+            if old_data is not None:
+                self._size -= len(old_data)
+            self._records[(entity, key)] = data
+            self._size += len(data)
+            while len(self._records) > self._max_entries or self._size > self._max_bytes:
+                _, evicted_data = self._records.popitem(last=False)
+                self._size -= len(evicted_data)
+                self._stats.evictions += 1
+
+
+CACHE_BACKENDS = {
+    "sqlite": SQLiteCaching,
+    "fs": LocalFSCaching,
+}  # type: Dict[str, Type[Union[SQLiteCaching, LocalFSCaching]]]
+DEFAULT_CACHE_BACKEND = "sqlite"
+
+_cache_backend = DEFAULT_CACHE_BACKEND
+_cache_codecs = None  # type: Optional[Dict[str, str]]
+_memory_cache_entries = DEFAULT_MEMORY_CACHE_ENTRIES
+_memory_cache_bytes = DEFAULT_MEMORY_CACHE_BYTES
+_cache_handler = None  # type: Optional[MemoryLRUCaching]
+_cache_handler_lock = threading.Lock()
+
+
+def configure_cache(
+        backend: str = DEFAULT_CACHE_BACKEND,
+        memory_cache_entries: int = DEFAULT_MEMORY_CACHE_ENTRIES,
+        memory_cache_bytes: int = DEFAULT_MEMORY_CACHE_BYTES,
+        codecs: Optional[Dict[str, str]] = None,
+):
+    """
+    Choose cache backend, entity codecs and memory tier limits used by get_cache_handler.
+    """
+    global _cache_backend, _cache_codecs, _memory_cache_entries, _memory_cache_bytes, _cache_handler  # pylint: disable=global-statement
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(
+            f"Unknown cache backend {backend}, supported backends: {list(CACHE_BACKENDS)}"
+        )
+    for codec_name in (codecs or {}).values():
+        if codec_name not in CODECS:
+            raise ValueError(f"Unknown cache codec {codec_name}, supported codecs: {list(CODECS)}")
+    with _cache_handler_lock:
+        _cache_backend = backend
+        _cache_codecs = codecs
+        _memory_cache_entries = memory_cache_entries
+        _memory_cache_bytes = memory_cache_bytes
+        _cache_handler = None
+
+
+def get_cache_handler() -> MemoryLRUCaching:
+    """
+    Returns cache handler shared by the whole process,
+    configured backend with in-memory LRU tier in front of it.
+    """
+    global _cache_handler  # pylint: disable=global-statement
+    with _cache_handler_lock:
+        if _cache_handler is None:
+            logger.debug("Initialize '%s' cache backend", _cache_backend)
+            _cache_handler = MemoryLRUCaching(
+                CACHE_BACKENDS[_cache_backend](codecs=_cache_codecs),
+                max_entries=_memory_cache_entries,
+                max_bytes=_memory_cache_bytes,
+            )
+        return _cache_handler
+
+
+class NegativeResultCache:
+    """
+    Remembers keys which had no result(e.g. word dictionary doesn't know),
+    so we don't ask for them again until `ttl` seconds pass.
+    Misses are kept in the given cache handler under '<entity>_misses' entity.
+    """
+
+    def __init__(self, cache_handler: CacheHandler, entity: str, ttl: float):
+        self._cache_handler = cache_handler
+        self._entity = f"{entity}_misses"
+        self._ttl = ttl
+
+    def is_known_miss(self, key: str) -> bool:
+        if self._ttl <= 0:
+            return False
+        cached_data = self._cache_handler.get_cached_data(self._entity, key)
+        if cached_data is None:
+            return False
+        try:
+            recorded_at = float(cached_data)
+        except ValueError:
+            logger.warning("Can't parse negative cache for key %s", key)
+            return False
+        age = time.time() - recorded_at
+        if age > self._ttl:
+            logger.debug("Negative cache for key %s expired %d seconds ago", key, age - self._ttl)
+            return False
+        return True
+
+    def get_known_misses(self, keys: Iterable[str]) -> Set[str]:
+        """
+        Same as is_known_miss, but for many keys with one cache read.
+        """
+        if self._ttl <= 0:
+            return set()
+        known_misses = set()
+        now = time.time()
+        for key, cached_data in self._cache_handler.get_many(self._entity, list(keys)).items():
+            try:
+                recorded_at = float(cached_data)
+            except ValueError:
+                logger.warning("Can't parse negative cache for key %s", key)
+                continue
+            if now - recorded_at <= self._ttl:
+                known_misses.add(key)
+        return known_misses
+
+    def record_miss(self, key: str):
+        if self._ttl <= 0:
+            return
+        self._cache_handler.save_data_to_cache(
+            self._entity, key, str(time.time()).encode()
+        )
+        logger.debug("Recorded miss for key %s in %s", key, self._entity)
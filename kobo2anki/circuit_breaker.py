@@ -0,0 +1,123 @@
+import enum
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+from kobo2anki import errors
+
+
+logger = logging.getLogger(__name__)
+
+# consecutive failures after which calls are not made anymore
+DEFAULT_FAILURE_THRESHOLD = 5
+# seconds before a single trial call is let through after the circuit was opened
+DEFAULT_RESET_TIMEOUT = 30.0
+
+
+class CircuitState(enum.Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing service.
+    Closed circuit lets all calls through and counts consecutive failures,
+    after `failure_threshold` of them circuit opens and calls fail right away.
+    When `reset_timeout` passes circuit is half-open: one trial call is let through,
+    its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+            reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+    ):
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._open_for = reset_timeout
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._get_state()
+
+    def before_call(self):
+        """
+        Raises CircuitOpenError if call shouldn't be made.
+        """
+        with self._lock:
+            state = self._get_state()
+            if state == CircuitState.CLOSED:
+                return
+            if state == CircuitState.HALF_OPEN and not self._trial_in_progress:
+                logger.info("Circuit %s is half-open, trying a call", self.name)
+                self._trial_in_progress = True
+                return
+        raise errors.CircuitOpenError(self.name)
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CircuitState.CLOSED:
+                logger.info("Circuit %s is closed again", self.name)
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state != CircuitState.CLOSED or self._failures >= self._failure_threshold:
+                self._open(self._reset_timeout)
+
+    def trip(self, open_for: Optional[float] = None):
+        """
+        Opens circuit right away, e.g. when service rejected credentials.
+        By default it stays open until the process exits.
+        """
+        with self._lock:
+            self._open(float("inf") if open_for is None else open_for)
+
+    def _open(self, open_for: float):
+        if self._state != CircuitState.OPEN:
+            logger.warning(
+                "Circuit %s is open after %d failures, calls will fail for %s seconds",
+                self.name, self._failures, open_for
+            )
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._open_for = open_for
+        self._trial_in_progress = False
+
+    def _get_state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self._open_for:
+            self._state = CircuitState.HALF_OPEN
+        return self._state
+
+
+_breakers = {}  # type: Dict[str, CircuitBreaker]
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    Returns circuit breaker shared by the whole process for a host or a service name.
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def reset_circuit_breakers():
+    with _breakers_lock:
+        _breakers.clear()
@@ -1,17 +1,65 @@
-from typing import Protocol, runtime_checkable
-from kobo2anki.dicts.freedict import client as freedict_client
+import importlib
+from types import ModuleType
+from typing import Dict, Iterable, Iterator, Mapping, Protocol, Union, runtime_checkable
 from kobo2anki.model import WordDefinition
-from kobo2anki.dicts.oxforddictionaries import client as of_client
 
 
-CLIENTS = {
-    "oxforddict": of_client,
-    "freedict": freedict_client
-}
+class _LazyModules(Mapping[str, ModuleType]):
+    """
+    Mapping of names to modules which are imported on first access,
+    so listing names doesn't import NLTK or HTTP clients of every dictionary.
+    """
+
+    def __init__(self, module_names: Dict[str, str]):
+        self._module_names = module_names
+
+    def __getitem__(self, name: str) -> ModuleType:
+        return importlib.import_module(self._module_names[name])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._module_names)
+
+    def __len__(self) -> int:
+        return len(self._module_names)
+
+
+CLIENTS = _LazyModules({
+    "oxforddict": "kobo2anki.dicts.oxforddictionaries.client",
+    "freedict": "kobo2anki.dicts.freedict.client",
+    "wordnet": "kobo2anki.dicts.wordnet.client",
+    "offline": "kobo2anki.dicts.offline.client",
+})
 
 
 # All Dict clients must implement this protocol
 @runtime_checkable
 class DictClient(Protocol):
     def get_definition(self, word: str) -> WordDefinition:
-        pass
\ No newline at end of file
+        pass
+
+    def get_definitions(
+            self, words: Iterable[str]
+    ) -> Dict[str, Union[WordDefinition, Exception]]:
+        """
+        Returns a mapping of every word to its definition or to an error
+        explaining why definition can't be found.
+        Cached words are read at once, only the rest is looked up in the dictionary.
+        """
+        pass
+
+
+# Dict clients which look words up on an asyncio event loop implement this protocol too
+@runtime_checkable
+class AsyncDictClient(Protocol):
+    async def aget_definition(self, word: str) -> WordDefinition:
+        pass
+
+    async def aget_definitions(
+            self, words: Iterable[str]
+    ) -> Dict[str, Union[WordDefinition, Exception]]:
+        """
+        Returns a mapping of every word to its definition or to an error
+        explaining why definition can't be found.
+        All words are looked up at once, concurrency is limited by the async HTTP session.
+        """
+        pass
@@ -0,0 +1,26 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, Union
+
+from kobo2anki.model import WordDefinition
+from kobo2anki.dicts.batch import LOOKUP_ERRORS
+
+
+async def gather_definitions(
+        aget_definition: Callable[[str], Awaitable[WordDefinition]],
+        words: Iterable[str],
+) -> Dict[str, Union[WordDefinition, Exception]]:
+    """
+    Look up all words at the same time using `aget_definition`.
+    Returns a mapping of word to its definition or to a lookup error,
+    in the order words were given.
+    """
+    unique_words = list(dict.fromkeys(words))
+
+    async def _get(word: str) -> Union[WordDefinition, Exception]:
+        try:
+            return await aget_definition(word)
+        except LOOKUP_ERRORS as exc:
+            return exc
+
+    results = await asyncio.gather(*map(_get, unique_words))
+    return dict(zip(unique_words, results))
@@ -0,0 +1,45 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Union
+
+from kobo2anki.model import WordDefinition
+from kobo2anki.dicts import errors
+
+logger = logging.getLogger(__name__)
+
+# number of words looked up at the same time by get_definitions of dict clients
+DEFAULT_LOOKUP_WORKERS = 8
+
+# Errors which mean we can't get definition for a particular word,
+# every other error is unexpected and isn't stored as a lookup result
+LOOKUP_ERRORS = (
+    errors.WordTranslationNotFound,
+    errors.CantParseDictData,
+    errors.NotAbleToGetWordTranlsation,
+)
+
+
+def map_definitions(
+        get_definition: Callable[[str], WordDefinition],
+        words: Iterable[str],
+        workers: int = DEFAULT_LOOKUP_WORKERS,
+) -> Dict[str, Union[WordDefinition, Exception]]:
+    """
+    Look up words using `get_definition` on up to `workers` threads.
+    Returns a mapping of word to its definition or to a lookup error,
+    in the order words were given.
+    """
+    unique_words = list(dict.fromkeys(words))
+
+    def _get(word: str) -> Union[WordDefinition, Exception]:
+        try:
+            return get_definition(word)
+        except LOOKUP_ERRORS as exc:
+            return exc
+
+    if workers <= 1 or len(unique_words) <= 1:
+        return {word: _get(word) for word in unique_words}
+    logger.debug("Will look up %d words using %d workers", len(unique_words), workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_get, unique_words)
+        return dict(zip(unique_words, results))
@@ -16,3 +16,9 @@ class CantParseDictData(Exception):
     def __init__(self, details: str):
         msg = f"Can't parse dictionary response. Err {details}"
         super().__init__(msg)
+
+
+class OfflineDictFormatError(Exception):
+    def __init__(self, path: str, details: str):
+        msg = f"Can't open offline dictionary {path}. Err: {details}"
+        super().__init__(msg)
@@ -1,91 +1,226 @@
-from typing import Dict
+from typing import Dict, Iterable, List, Optional, Union
 
 import json
 import logging
 import requests
 
 from kobo2anki import model
+from kobo2anki.caching import get_cache_handler, NegativeResultCache, DEFAULT_NEGATIVE_CACHE_TTL
 from kobo2anki.dicts import errors
+from kobo2anki.dicts.aio import gather_definitions
+from kobo2anki.dicts.batch import DEFAULT_LOOKUP_WORKERS, map_definitions
+from kobo2anki.http_session import get_session
+from kobo2anki.aio_session import REQUEST_ERRORS, AsyncResponse, get_async_session
+from kobo2anki.dicts.freedict import parser
 from kobo2anki.pronunciation import WordPronunciation
 from kobo2anki.dicts.freedict.pronunciation_guesser import PronunciationURLGuesser
 
 
 logger = logging.getLogger(__name__)
 
+BASE_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/"
+DICT_NAME = "freedictionary"
+
 
 class FreeDictionaryClient:
 
-    def __init__(self):
-        self.pronunciation_url_guesser = PronunciationURLGuesser()
+    def __init__(
+            self,
+            negative_cache_ttl: float = DEFAULT_NEGATIVE_CACHE_TTL,
+            lookup_workers: int = DEFAULT_LOOKUP_WORKERS,
+    ):
+        self.pronunciation_url_guesser = PronunciationURLGuesser(negative_cache_ttl=negative_cache_ttl)
+        self._cache_handler = get_cache_handler()
+        self._negative_cache = NegativeResultCache(self._cache_handler, DICT_NAME, negative_cache_ttl)
+        self._session = get_session()
+        self._lookup_workers = lookup_workers
 
     def get_definition(self, word: str) -> model.WordDefinition:
         """
         Experimental, asked chatGPT to write code for API
         """
         logger.info("Getting defintion for word %s, using 'freedict'", word)
-        base_url = "https://api.dictionaryapi.dev/api/v2/entries/en/"
-        try:
-            logger.debug(
-                "Will use url %s to get word %s definition", base_url + word, word)
-            response = requests.get(base_url + word, timeout=10)
-            logger.debug("Got response with code %d", response.status_code)
-            if response.status_code == 404:
+        data = self._get_raw_response(word)
+        return self._parse_json_definition(word, data)
+
+    def get_definitions(
+            self, words: Iterable[str]
+    ) -> Dict[str, Union[model.WordDefinition, Exception]]:
+        # read cache for all words at once, only misses go to the dictionary
+        unique_words = list(dict.fromkeys(words))
+        cached_responses = self._get_many_cached_json(unique_words)
+        known_misses = self._negative_cache.get_known_misses(
+            [word for word in unique_words if word not in cached_responses]
+        )
+
+        def _get(word: str) -> model.WordDefinition:
+            if word in known_misses:
+                raise errors.WordTranslationNotFound(word)
+            response_json = cached_responses.get(word)
+            if response_json is None:
+                response_json = self._get_word_from_dictionary(word)
+                self._save_response_to_cache(word, response_json)
+            return self._parse_json_definition(word, response_json)
+
+        return map_definitions(_get, unique_words, self._lookup_workers)
+
+    async def aget_definition(self, word: str) -> model.WordDefinition:
+        logger.info("Getting defintion for word %s, using 'freedict'", word)
+        data = self._get_cached_json(word)
+        if data is None:
+            data = await self._aget_word_from_dictionary(word)
+            self._save_response_to_cache(word, data)
+        return await self._aparse_json_definition(word, data)
+
+    async def aget_definitions(
+            self, words: Iterable[str]
+    ) -> Dict[str, Union[model.WordDefinition, Exception]]:
+        # cache is read the same way as by get_definitions, only misses go to the event loop
+        unique_words = list(dict.fromkeys(words))
+        cached_responses = self._get_many_cached_json(unique_words)
+        known_misses = self._negative_cache.get_known_misses(
+            [word for word in unique_words if word not in cached_responses]
+        )
+
+        async def _get(word: str) -> model.WordDefinition:
+            if word in known_misses:
                 raise errors.WordTranslationNotFound(word)
+            response_json = cached_responses.get(word)
+            if response_json is None:
+                response_json = await self._aget_word_from_dictionary(word)
+                self._save_response_to_cache(word, response_json)
+            return await self._aparse_json_definition(word, response_json)
+
+        return await gather_definitions(_get, unique_words)
+
+    def _parse_json_definition(self, word: str, data: List[Dict]) -> model.WordDefinition:
+        definition = parser.parse_data(word, data)
+        pronunciation_url = parser.get_audio_file_url(data)
+        if not pronunciation_url:
+            logger.info("Word has no pronunciation, will true to guess it")
+            pronunciation_url = self.pronunciation_url_guesser.get_url(word)
+            self._log_guessed_url(word, pronunciation_url)
+        definition.pronunciation = self._build_pronunciation(pronunciation_url)
+        return definition
+
+    async def _aparse_json_definition(self, word: str, data: List[Dict]) -> model.WordDefinition:
+        definition = parser.parse_data(word, data)
+        pronunciation_url = parser.get_audio_file_url(data)
+        if not pronunciation_url:
+            logger.info("Word has no pronunciation, will true to guess it")
+            pronunciation_url = await self.pronunciation_url_guesser.aget_url(word)
+            self._log_guessed_url(word, pronunciation_url)
+        definition.pronunciation = self._build_pronunciation(pronunciation_url)
+        return definition
+
+    def _log_guessed_url(self, word: str, url: Optional[str]):
+        if url:
+            logger.info("Was able to guess URL for for word '%s'", word)
+        else:
+            logger.info("Wasn't able to guess URL")
+
+    def _build_pronunciation(self, url: Optional[str]) -> Optional[WordPronunciation]:
+        if not url:
+            return None
+        logger.debug("Found pronunciation, url - %s", url)
+        return WordPronunciation(url)
+
+    def _get_raw_response(self, word: str) -> List[Dict]:
+        response_json = self._get_cached_json(word)
+        if response_json is None:
+            response_json = self._get_word_from_dictionary(word)
+            self._save_response_to_cache(word, response_json)
+        return response_json
 
-            if response.status_code != 200:
-                raise errors.NotAbleToGetWordTranlsation(
+    def _get_word_cache_key(self, word: str) -> str:
+        cache_key = f"word_{word}.json"
+        return cache_key
+
+    def _get_cached_json(self, word: str) -> Optional[List[Dict]]:
+        result = None  # type: Optional[List[Dict]]
+        cached_data = self._cache_handler.get_cached_data(
+            DICT_NAME,
+            self._get_word_cache_key(word)
+        )
+        if cached_data is None:
+            logger.debug("We don't have cache from word '%s'", word)
+        else:
+            try:
+                result = json.loads(cached_data)
+            except json.JSONDecodeError as exc:
+                logger.warning(
+                    "Can't parse cache json for word '%s'. Err: %s",
                     word,
-                    f"Got status code {response.status_code}"
+                    exc
                 )
+        return result
+
+    def _get_many_cached_json(self, words: List[str]) -> Dict[str, List[Dict]]:
+        keys = {self._get_word_cache_key(word): word for word in words}
+        result = {}  # type: Dict[str, List[Dict]]
+        for key, cached_data in self._cache_handler.get_many(DICT_NAME, list(keys)).items():
             try:
-                data = response.json()
-                logger.debug("Parsed response: %s", data)
+                result[keys[key]] = json.loads(cached_data)
             except json.JSONDecodeError as exc:
-                raise errors.CantParseDictData(f"Response JSON can't be parsed. Err: {exc}")
+                logger.warning(
+                    "Can't parse cache json for word '%s'. Err: %s",
+                    keys[key],
+                    exc
+                )
+        logger.debug("Found cache for %d of %d words", len(result), len(words))
+        return result
+
+    def _save_response_to_cache(self, word: str, response_json: List[Dict]):
+        self._cache_handler.save_data_to_cache(
+            DICT_NAME,
+            self._get_word_cache_key(word),
+            json.dumps(response_json).encode()
+        )
+        logger.debug(
+            "Saved cache for word %s", word
+        )
+
+    def _get_word_from_dictionary(self, word: str) -> List[Dict]:
+        if self._negative_cache.is_known_miss(word):
+            logger.debug("Dictionary didn't know word %s last time, will not call it", word)
+            raise errors.WordTranslationNotFound(word)
+        try:
+            logger.debug(
+                "Will use url %s to get word %s definition", BASE_URL + word, word)
+            response = self._session.get(BASE_URL + word)
         except requests.RequestException as exc:  # the most general error
             raise errors.NotAbleToGetWordTranlsation(word, exc) from exc
-        explanations: Dict = {}
-        for meaning in data[0]["meanings"]:
-            part = model.Parts(meaning["partOfSpeech"])
-            logger.debug("Found defintion for part %s", part)
-
-            if part not in explanations:
-                explanations[part] = []
-
-            definitions_list = []
-            for def_data in meaning["definitions"]:
-                definitions = [def_data.get("definition", "")]
-                synonyms = def_data.get("synonyms", [])
-                examples = [def_data.get("example")] if def_data.get("example") else []
-
-                definition = model.Definition(definitions=definitions, synonyms=synonyms, examples=examples)
-                logger.debug(
-                    "Added defintion '%s' with synonyms '%s' and examples '%s'",
-                    definition, synonyms, examples
-                )
-                definitions_list.append(definition)
+        return self._parse_response(word, response)
+
+    async def _aget_word_from_dictionary(self, word: str) -> List[Dict]:
+        if self._negative_cache.is_known_miss(word):
+            logger.debug("Dictionary didn't know word %s last time, will not call it", word)
+            raise errors.WordTranslationNotFound(word)
+        try:
+            logger.debug(
+                "Will use url %s to get word %s definition", BASE_URL + word, word)
+            response = await get_async_session().get(BASE_URL + word)
+        except REQUEST_ERRORS as exc:
+            raise errors.NotAbleToGetWordTranlsation(word, repr(exc)) from exc
+        return self._parse_response(word, response)
 
-            explanations[part].extend(definitions_list)
+    def _parse_response(self, word: str, response: Union[requests.Response, AsyncResponse]) -> List[Dict]:
+        logger.debug("Got response with code %d", response.status_code)
+        if response.status_code == 404:
+            self._negative_cache.record_miss(word)
+            raise errors.WordTranslationNotFound(word)
 
-        part_explanations = [model.PartExplanations(part=k, definitions=v) for k, v in explanations.items()]
-        transcription = data[0].get("phonetic", None)
-        pronunciation_url = data[0].get("phonetics")[0].get("audio") if data[0].get("phonetics") else None
-        if pronunciation_url:
-            logger.debug("Found pronunciation, url - %s", pronunciation_url)
-            pronunciation = WordPronunciation(pronunciation_url)
-        else:
-            logger.info("Word has no pronunciation, will true to guess it")
-            url = self.pronunciation_url_guesser.get_url(word)
-            if url:
-                logger.info("Was able to guess URL for for word '%s'", word)
-                pronunciation = WordPronunciation(url)
-            else:
-                logger.info("Wasn't able to guess URL")
-                pronunciation = None
-        return model.WordDefinition(
-            word=word, transcription=transcription,
-            explanations=part_explanations, pronunciation=pronunciation
-        )
+        if response.status_code != 200:
+            raise errors.NotAbleToGetWordTranlsation(
+                word,
+                f"Got status code {response.status_code}"
+            )
+        try:
+            data = response.json()
+            logger.debug("Parsed response: %s", data)
+        except json.JSONDecodeError as exc:
+            raise errors.CantParseDictData(f"Response JSON can't be parsed. Err: {exc}")
+        return data
 
     def __repr__(self):
-        return "OxfordDictionaryClient"
+        return "FreeDictionaryClient"
@@ -0,0 +1,47 @@
+import logging
+from typing import Dict, List, Optional
+
+from kobo2anki import model
+from kobo2anki.dicts import errors
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_data(word: str, raw_data: List[Dict]) -> model.WordDefinition:
+    if not raw_data or "meanings" not in raw_data[0]:
+        raise errors.CantParseDictData("Response has no meanings")
+
+    explanations: Dict = {}
+    for meaning in raw_data[0]["meanings"]:
+        part = model.Parts(meaning["partOfSpeech"])
+        logger.debug("Found defintion for part %s", part)
+
+        if part not in explanations:
+            explanations[part] = []
+
+        definitions_list = []
+        for def_data in meaning["definitions"]:
+            definitions = [def_data.get("definition", "")]
+            synonyms = def_data.get("synonyms", [])
+            examples = [def_data.get("example")] if def_data.get("example") else []
+
+            definition = model.Definition(definitions=definitions, synonyms=synonyms, examples=examples)
+            logger.debug(
+                "Added defintion '%s' with synonyms '%s' and examples '%s'",
+                definition, synonyms, examples
+            )
+            definitions_list.append(definition)
+
+        explanations[part].extend(definitions_list)
+
+    part_explanations = [model.PartExplanations(part=k, definitions=v) for k, v in explanations.items()]
+    transcription = raw_data[0].get("phonetic", None)
+    return model.WordDefinition(
+        word=word, transcription=transcription, explanations=part_explanations
+    )
+
+
+def get_audio_file_url(raw_data: List[Dict]) -> Optional[str]:
+    phonetics = raw_data[0].get("phonetics")
+    return phonetics[0].get("audio") if phonetics else None
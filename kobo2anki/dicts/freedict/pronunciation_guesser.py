@@ -1,42 +1,288 @@
-from typing import Optional, Iterable
+import json
+import asyncio
+import logging
+import threading
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Optional, Iterable, List, Tuple, Union
 from urllib.parse import urljoin
+
 import requests
 
+from kobo2anki.caching import get_cache_handler, NegativeResultCache, DEFAULT_NEGATIVE_CACHE_TTL
+from kobo2anki.http_session import RETRY_STATUSES, get_session
+from kobo2anki.aio_session import REQUEST_ERRORS, AsyncResponse, get_async_session
+
+
+logger = logging.getLogger(__name__)
+
+# number of candidate URLs probed at the same time
+DEFAULT_PROBE_WORKERS = 8
+# templates which never produced an existing URL are not tried after that many misses
+DEFAULT_MAX_TEMPLATE_MISSES = 50
+
+
+@dataclasses.dataclass
+class TemplateStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        # smoothed, so templates without statistics yet are tried before bad ones
+        return (self.hits + 1) / (self.hits + self.misses + 2)
+
 
 class PronunciationURLGuesser:
     """
-    Trying to buind an URL to download words pronunciation from different dicts
+    Trying to buind an URL to download words pronunciation from different dicts.
+    URL templates are tried in order of their observed hit rate, statistics is kept in cache.
     """
 
+    cache_entity = "pronunciation_urls"
+    stats_cache_entity = "pronunciation_templates"
+    base_dicts = [
+        {
+            "base": "https://audio.oxforddictionaries.com/en/mp3/",
+            "path_templates": [
+                "{word}__us_1.mp3",
+                "{word}__us_2.mp3",
+                "{word}__us_3.mp3",
+                "{word}-us.mp3",
+                "{word}.mp3",
+                "{word}-au.mp3",
+                "{word}-uk.mp3",
+            ]
+        }
+    ]
+
+    def __init__(
+            self,
+            negative_cache_ttl: float = DEFAULT_NEGATIVE_CACHE_TTL,
+            probe_workers: int = DEFAULT_PROBE_WORKERS,
+            max_template_misses: int = DEFAULT_MAX_TEMPLATE_MISSES,
+    ):
+        self._session = get_session()
+        self._cache_handler = get_cache_handler()
+        self._negative_cache = NegativeResultCache(
+            self._cache_handler, self.cache_entity, negative_cache_ttl
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=probe_workers, thread_name_prefix="pronunciation-probe"
+        )
+        self._max_template_misses = max_template_misses
+        self._stats_lock = threading.Lock()
+        self._template_stats = self._load_template_stats()
+
     def get_url(self, word: str) -> Optional[str]:
-        for url in self._guess_urls(word):
-            if self._test_url(url):
-                return url
+        known, url = self._get_known_url(word)
+        if known:
+            return url
+
+        url_templates = self._get_url_templates()
+        updated_stats = {}  # type: Dict[str, TemplateStats]
+        failed_urls = []  # type: List[str]
+        # the best template usually succeeds, so try it alone before probing all others
+        url = self._probe_urls(url_templates[:1], word, updated_stats, failed_urls)
+        if url is None:
+            url = self._probe_urls(url_templates[1:], word, updated_stats, failed_urls)
+        self._remember_probes(word, url, updated_stats, failed_urls)
+        return url
+
+    async def aget_url(self, word: str) -> Optional[str]:
+        """
+        Same as get_url, but probes are sent on the running event loop.
+        """
+        known, url = self._get_known_url(word)
+        if known:
+            return url
+
+        url_templates = self._get_url_templates()
+        updated_stats = {}  # type: Dict[str, TemplateStats]
+        failed_urls = []  # type: List[str]
+        url = await self._aprobe_urls(url_templates[:1], word, updated_stats, failed_urls)
+        if url is None:
+            url = await self._aprobe_urls(url_templates[1:], word, updated_stats, failed_urls)
+        self._remember_probes(word, url, updated_stats, failed_urls)
+        return url
+
+    def _get_known_url(self, word: str) -> Tuple[bool, Optional[str]]:
+        """
+        Returns whether URL of the word is known without probing and the URL.
+        """
+        cached_url = self._cache_handler.get_cached_data(self.cache_entity, word)
+        if cached_url:
+            logger.debug("Found cached pronunciation url for word %s", word)
+            return True, cached_url.decode()
+        if self._negative_cache.is_known_miss(word):
+            logger.debug("No pronunciation was found for word %s last time, will not probe", word)
+            return True, None
+        return False, None
+
+    def _remember_probes(
+            self,
+            word: str,
+            url: Optional[str],
+            updated_stats: Dict[str, TemplateStats],
+            failed_urls: List[str],
+    ):
+        self._save_template_stats(updated_stats)
+        if url:
+            self._cache_handler.save_data_to_cache(self.cache_entity, word, url.encode())
+        elif failed_urls:
+            # some URLs might exist, we just couldn't check them, so try again next time
+            logger.info(
+                "Couldn't test %d pronunciation urls for word %s, will not remember it as a miss",
+                len(failed_urls), word
+            )
+        else:
+            self._negative_cache.record_miss(word)
+
+    def _probe_urls(
+            self,
+            url_templates: List[str],
+            word: str,
+            updated_stats: Dict[str, TemplateStats],
+            failed_urls: List[str],
+    ) -> Optional[str]:
+        """
+        Tests urls built from templates concurrently, returns the first one which exists.
+        URLs which couldn't be tested because of network errors are added to `failed_urls`.
+        """
+        found = threading.Event()
+
+        def probe(url_template: str) -> bool:
+            # other probe already succeeded
+            if found.is_set():
+                return False
+            url = url_template.format(word=word)
+            try:
+                exists = self._test_url(url)
+            except requests.RequestException as exc:
+                # network errors say nothing about the template
+                logger.debug("Can't test url %s. Err: %s", url, exc)
+                failed_urls.append(url)
+                return False
+            self._record_probe(url_template, exists, updated_stats)
+            return exists
+
+        futures = {self._executor.submit(probe, url_template): url_template for url_template in url_templates}
+        try:
+            for future in as_completed(futures):
+                if future.result():
+                    found.set()
+                    return futures[future].format(word=word)
+        finally:
+            for future in futures:
+                future.cancel()
         return None
 
-    def _guess_urls(self, word: str) -> Iterable[str]:
-        base_dicts = [
-            {
-                "base": "https://audio.oxforddictionaries.com/en/mp3/",
-                "path_templates": [
-                    "{word}__us_1.mp3",
-                    "{word}__us_2.mp3",
-                    "{word}__us_3.mp3",
-                    "{word}-us.mp3",
-                    "{word}.mp3",
-                    "{word}-au.mp3",
-                    "{word}-uk.mp3",
-                ]
+    async def _aprobe_urls(
+            self,
+            url_templates: List[str],
+            word: str,
+            updated_stats: Dict[str, TemplateStats],
+            failed_urls: List[str],
+    ) -> Optional[str]:
+        """
+        Same as _probe_urls, probes which are still running when an URL is found are cancelled.
+        """
+        async def probe(url_template: str) -> bool:
+            url = url_template.format(word=word)
+            try:
+                exists = await self._atest_url(url)
+            except REQUEST_ERRORS + (requests.HTTPError,) as exc:
+                logger.debug("Can't test url %s. Err: %r", url, exc)
+                failed_urls.append(url)
+                return False
+            self._record_probe(url_template, exists, updated_stats)
+            return exists
+
+        tasks = {asyncio.ensure_future(probe(url_template)): url_template for url_template in url_templates}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result():
+                        return tasks[task].format(word=word)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return None
+
+    def _get_url_templates(self) -> List[str]:
+        """
+        Returns URL templates ordered by hit rate, without ones which never succeeded.
+        """
+        with self._stats_lock:
+            url_templates = [
+                url_template for url_template in self._iter_url_templates()
+                if not self._is_pruned(self._template_stats.get(url_template, TemplateStats()))
+            ]
+            # sort is stable, so templates with the same rate keep default order
+            url_templates.sort(
+                key=lambda url_template: self._template_stats.get(url_template, TemplateStats()).hit_rate,
+                reverse=True,
+            )
+        return url_templates
+
+    def _is_pruned(self, stats: TemplateStats) -> bool:
+        return stats.hits == 0 and stats.misses >= self._max_template_misses
+
+    def _record_probe(self, url_template: str, exists: bool, updated_stats: Dict[str, TemplateStats]):
+        with self._stats_lock:
+            stats = self._template_stats.setdefault(url_template, TemplateStats())
+            if exists:
+                stats.hits += 1
+            else:
+                stats.misses += 1
+            updated_stats[url_template] = stats
+
+    def _load_template_stats(self) -> Dict[str, TemplateStats]:
+        template_stats = {}  # type: Dict[str, TemplateStats]
+        cached_stats = self._cache_handler.get_many(
+            self.stats_cache_entity, list(self._iter_url_templates())
+        )
+        for url_template, data in cached_stats.items():
+            try:
+                template_stats[url_template] = TemplateStats(**json.loads(data))
+            except (ValueError, TypeError) as exc:
+                logger.warning("Can't parse statistics of url template %s. Err: %s", url_template, exc)
+        return template_stats
+
+    def _save_template_stats(self, updated_stats: Dict[str, TemplateStats]):
+        if not updated_stats:
+            return
+        with self._stats_lock:
+            items = {
+                url_template: json.dumps(dataclasses.asdict(stats)).encode()
+                for url_template, stats in updated_stats.items()
             }
-        ]
-        for base_dict in base_dicts:
+        self._cache_handler.put_many(self.stats_cache_entity, items)
+
+    def _iter_url_templates(self) -> Iterable[str]:
+        for base_dict in self.base_dicts:
             for path_template in base_dict["path_templates"]:
-                url_template = urljoin(base_dict["base"], path_template)
-                url = url_template.format(word=word)
-                yield url
+                yield urljoin(base_dict["base"], path_template)
+
+    def _guess_urls(self, word: str) -> Iterable[str]:
+        for url_template in self._get_url_templates():
+            yield url_template.format(word=word)
 
     def _test_url(self, url: str) -> bool:
-        response = requests.head(url)
+        """
+        True if URL exists, False if server says it doesn't.
+        Throttled or failed requests say nothing about the URL, requests.HTTPError is raised for them.
+        """
+        return self._url_exists(url, self._session.head(url))
+
+    async def _atest_url(self, url: str) -> bool:
+        return self._url_exists(url, await get_async_session().head(url))
+
+    def _url_exists(self, url: str, response: Union[requests.Response, AsyncResponse]) -> bool:
         if response.status_code >= 200 and response.status_code < 300:
             return True
+        if response.status_code in RETRY_STATUSES or not 400 <= response.status_code < 500:
+            raise requests.HTTPError(f"Unexpected status {response.status_code} of {url}", response=response)
         return False
@@ -0,0 +1,80 @@
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Union
+
+from kobo2anki import model
+from kobo2anki.dicts import DictClient
+from kobo2anki.dicts.batch import DEFAULT_LOOKUP_WORKERS, LOOKUP_ERRORS, map_definitions
+
+
+logger = logging.getLogger(__name__)
+
+# seconds primary dictionary has to answer before secondary one is asked too
+DEFAULT_HEDGE_DELAY = 2.0
+
+
+class HedgedDictClient:
+    """
+    Asks the primary dictionary first, if it doesn't answer within `hedge_delay` seconds
+    or fails, asks the secondary one too. The first found definition wins,
+    request which isn't needed anymore is cancelled if it hasn't started yet,
+    a running blocking HTTP request can't be interrupted, its result is ignored.
+    If both dictionaries fail, the primary dictionary error is raised.
+    """
+
+    def __init__(
+            self,
+            primary: DictClient,
+            secondary: DictClient,
+            hedge_delay: float = DEFAULT_HEDGE_DELAY,
+            lookup_workers: int = DEFAULT_LOOKUP_WORKERS,
+    ):
+        self._primary = primary
+        self._secondary = secondary
+        self._hedge_delay = hedge_delay
+        self._lookup_workers = lookup_workers
+        # every word being looked up might wait for both dictionaries
+        self._executor = ThreadPoolExecutor(
+            max_workers=2 * max(lookup_workers, 1), thread_name_prefix="hedged-lookup"
+        )
+
+    def get_definition(self, word: str) -> model.WordDefinition:
+        primary_future = self._executor.submit(self._primary.get_definition, word)
+        done, _ = wait([primary_future], timeout=self._hedge_delay)
+        if done and primary_future.exception() is None:
+            return primary_future.result()
+        if done:
+            self._raise_unexpected(primary_future)
+            logger.debug("%s failed for word %s, asking %s", self._primary, word, self._secondary)
+        else:
+            logger.debug(
+                "%s didn't answer for word %s in %s seconds, asking %s too",
+                self._primary, word, self._hedge_delay, self._secondary
+            )
+        secondary_future = self._executor.submit(self._secondary.get_definition, word)
+
+        pending = {secondary_future} if done else {primary_future, secondary_future}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                self._raise_unexpected(future)
+                if future.exception() is None:
+                    for other_future in pending:
+                        other_future.cancel()
+                    return future.result()
+        # both failed with lookup errors
+        return primary_future.result()
+
+    def _raise_unexpected(self, future: Future):
+        # only lookup errors mean the other dictionary should answer
+        exc = future.exception()
+        if exc is not None and not isinstance(exc, LOOKUP_ERRORS):
+            raise exc
+
+    def get_definitions(
+            self, words: Iterable[str]
+    ) -> Dict[str, Union[model.WordDefinition, Exception]]:
+        return map_definitions(self.get_definition, words, self._lookup_workers)
+
+    def __repr__(self):
+        return f"HedgedDictClient({self._primary!r}, {self._secondary!r})"
@@ -0,0 +1,37 @@
+import logging
+from typing import Dict, Iterable, Union
+
+from kobo2anki import model
+from kobo2anki.dicts import errors
+from kobo2anki.dicts.batch import map_definitions
+from kobo2anki.dicts.offline.storage import OfflineDictReader
+
+
+logger = logging.getLogger(__name__)
+
+DICT_NAME = "offline"
+
+
+class OfflineDictionaryClient:
+    """
+    Serves definitions from offline dictionary built with 'kobo2anki offline-dict build'.
+    """
+
+    def __init__(self, path: str):
+        self._reader = OfflineDictReader(path)
+        logger.info("Opened offline dictionary %s with %d words", path, len(self._reader))
+
+    def get_definition(self, word: str) -> model.WordDefinition:
+        word_definition = self._reader.get(word)
+        if word_definition is None:
+            raise errors.WordTranslationNotFound(word)
+        return word_definition
+
+    def get_definitions(
+            self, words: Iterable[str]
+    ) -> Dict[str, Union[model.WordDefinition, Exception]]:
+        # lookups are local and take microseconds, threads wouldn't make them faster
+        return map_definitions(self.get_definition, words, workers=1)
+
+    def __repr__(self):
+        return "OfflineDictionaryClient"
@@ -0,0 +1,92 @@
+import json
+import logging
+import dataclasses
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+
+from kobo2anki import model
+from kobo2anki.caching import CacheHandler, LocalFSCaching, SQLiteCaching
+from kobo2anki.dicts import errors
+from kobo2anki.dicts.freedict import client as freedict_client, parser as freedict_parser
+from kobo2anki.dicts.freedict.pronunciation_guesser import PronunciationURLGuesser
+from kobo2anki.dicts.oxforddictionaries import client as of_client, parser as of_parser
+from kobo2anki.dicts.offline.storage import OfflineDictWriter
+from kobo2anki.pronunciation import WordPronunciation
+
+
+logger = logging.getLogger(__name__)
+
+# both dictionaries cache responses as word_{word}.json
+CACHE_KEY_PREFIX = "word_"
+CACHE_KEY_SUFFIX = ".json"
+
+
+@dataclasses.dataclass
+class ImportResult:
+    imported: int = 0
+    duplicates: int = 0
+    failed: int = 0
+
+
+def _parse_freedict(word: str, data, cache_handler: CacheHandler) -> model.WordDefinition:
+    word_definition = freedict_parser.parse_data(word, data)
+    pronunciation_url = freedict_parser.get_audio_file_url(data)
+    if not pronunciation_url:
+        # url guessed by an earlier run, guessing itself needs network
+        cached_url = cache_handler.get_cached_data(PronunciationURLGuesser.cache_entity, word)
+        pronunciation_url = cached_url.decode() if cached_url else None
+    if pronunciation_url:
+        word_definition.pronunciation = WordPronunciation(pronunciation_url)
+    return word_definition
+
+
+def _parse_oxforddict(word: str, data, cache_handler: CacheHandler) -> model.WordDefinition:  # pylint: disable=unused-argument
+    word_definition = of_parser.parse_data(data)
+    pronunciation_url = of_parser.get_audio_file_url(data)
+    if pronunciation_url:
+        word_definition.pronunciation = WordPronunciation(pronunciation_url)
+    return word_definition
+
+
+# dictionary name in CLIENTS: (cache entity, parser of cached response)
+SOURCES = {
+    "oxforddict": (of_client.DICT_NAME, _parse_oxforddict),
+    "freedict": (freedict_client.DICT_NAME, _parse_freedict),
+}  # type: Dict[str, Tuple[str, Callable[[str, object, CacheHandler], model.WordDefinition]]]
+DEFAULT_SOURCES = ("oxforddict", "freedict")
+
+
+def _get_word(cache_key: str) -> Optional[str]:
+    if cache_key.startswith(CACHE_KEY_PREFIX) and cache_key.endswith(CACHE_KEY_SUFFIX):
+        return cache_key[len(CACHE_KEY_PREFIX):-len(CACHE_KEY_SUFFIX)]
+    return None
+
+
+def import_from_cache(
+        cache_backend: Union[SQLiteCaching, LocalFSCaching],
+        path: str,
+        sources: Iterable[str] = DEFAULT_SOURCES,
+) -> ImportResult:
+    """
+    Builds offline dictionary in `path` from cached dictionary responses.
+    If a word is cached by several dictionaries, definition from the first source is used.
+    """
+    result = ImportResult()
+    with OfflineDictWriter(path) as writer:
+        for source in sources:
+            entity, parse = SOURCES[source]
+            logger.info("Importing cached '%s' responses", source)
+            for cache_key, data in cache_backend.iter_entity(entity):
+                word = _get_word(cache_key)
+                if word is None:
+                    continue
+                try:
+                    word_definition = parse(word, json.loads(data), cache_backend)
+                except (errors.CantParseDictData, json.JSONDecodeError, KeyError, ValueError, TypeError) as exc:
+                    logger.warning("Can't parse cached '%s' response for word %s. Err: %s", source, word, exc)
+                    result.failed += 1
+                    continue
+                if writer.add(word, word_definition):
+                    result.imported += 1
+                else:
+                    result.duplicates += 1
+    return result
@@ -0,0 +1,219 @@
+"""
+Read-only offline dictionary format.
+
+Dictionary is a directory with two files:
+- records file: header followed by zlib compressed JSON records of word definitions;
+- index file: header, fixed size slots sorted by word and a blob of utf-8 words.
+  Every slot points to a word in the blob and to a record in the records file.
+Both headers have the same random build id, so index and records of different builds are never used together.
+
+Both files are memory mapped, a lookup is a binary search over slots,
+so opening a dictionary costs the same and takes the same memory whatever its size is.
+"""
+import os
+import json
+import mmap
+import zlib
+import struct
+import logging
+import dataclasses
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from kobo2anki import model
+from kobo2anki.dicts import errors
+from kobo2anki.pronunciation import WordPronunciation
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "index.bin"
+RECORDS_FILENAME = "records.bin"
+
+FORMAT_VERSION = 2
+INDEX_MAGIC = b"K2DI"
+RECORDS_MAGIC = b"K2DR"
+BUILD_ID_SIZE = 16
+# magic, version, build id, number of words
+INDEX_HEADER = struct.Struct(f">4sB{BUILD_ID_SIZE}sI")
+# magic, version, build id
+RECORDS_HEADER = struct.Struct(f">4sB{BUILD_ID_SIZE}s")
+# word offset in the words blob, word length, record offset, record length
+INDEX_SLOT = struct.Struct(">IHQI")
+
+
+def _definition_to_dict(word_definition: model.WordDefinition) -> Dict:
+    return {
+        "word": word_definition.word,
+        "transcription": word_definition.transcription,
+        "explanations": [
+            {
+                "part": explanation.part.value,
+                "definitions": [dataclasses.asdict(definition) for definition in explanation.definitions],
+            }
+            for explanation in word_definition.explanations
+        ],
+        "pronunciation": word_definition.pronunciation.get_url() if word_definition.pronunciation else None,
+    }
+
+
+def _definition_from_dict(data: Dict) -> model.WordDefinition:
+    return model.WordDefinition(
+        word=data["word"],
+        transcription=data["transcription"],
+        explanations=[
+            model.PartExplanations(
+                part=model.Parts(explanation["part"]),
+                definitions=[model.Definition(**definition) for definition in explanation["definitions"]],
+            )
+            for explanation in data["explanations"]
+        ],
+        pronunciation=WordPronunciation(data["pronunciation"]) if data["pronunciation"] else None,
+    )
+
+
+class OfflineDictWriter:
+    """
+    Builds offline dictionary in `path` directory.
+    Records are streamed to disk, only words and offsets are kept in memory.
+    If the same word is added twice, the first definition is kept.
+    Files are replaced on close, every file is replaced atomically. Reader opened between
+    the two replaces finds files of different builds and fails instead of reading a mix of them.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+        self._records_tmp_path = os.path.join(path, f".{RECORDS_FILENAME}.tmp")
+        self._records_fh = open(self._records_tmp_path, "wb")  # type: BinaryIO  # pylint: disable=consider-using-with
+        self._build_id = os.urandom(BUILD_ID_SIZE)
+        self._records_fh.write(RECORDS_HEADER.pack(RECORDS_MAGIC, FORMAT_VERSION, self._build_id))
+        self._slots = {}  # type: Dict[bytes, Tuple[int, int]]
+
+    def __enter__(self) -> "OfflineDictWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._records_fh.close()
+            os.remove(self._records_tmp_path)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, word: str, word_definition: model.WordDefinition) -> bool:
+        """
+        Returns False if the word is already in the dictionary.
+        """
+        key = word.lower().encode()
+        if key in self._slots:
+            return False
+        record = zlib.compress(json.dumps(_definition_to_dict(word_definition)).encode())
+        self._slots[key] = (self._records_fh.tell(), len(record))
+        self._records_fh.write(record)
+        return True
+
+    def close(self):
+        self._records_fh.flush()
+        os.fsync(self._records_fh.fileno())
+        self._records_fh.close()
+
+        index_tmp_path = os.path.join(self._path, f".{INDEX_FILENAME}.tmp")
+        keys = sorted(self._slots)
+        with open(index_tmp_path, "wb") as fh:
+            fh.write(INDEX_HEADER.pack(INDEX_MAGIC, FORMAT_VERSION, self._build_id, len(keys)))
+            key_offset = 0
+            for key in keys:
+                record_offset, record_length = self._slots[key]
+                fh.write(INDEX_SLOT.pack(key_offset, len(key), record_offset, record_length))
+                key_offset += len(key)
+            for key in keys:
+                fh.write(key)
+            fh.flush()
+            os.fsync(fh.fileno())
+        # between these replaces index and records have different build ids, readers refuse to open them
+        os.replace(self._records_tmp_path, os.path.join(self._path, RECORDS_FILENAME))
+        os.replace(index_tmp_path, os.path.join(self._path, INDEX_FILENAME))
+        logger.info("Wrote %d words to offline dictionary %s", len(keys), self._path)
+
+
+class OfflineDictReader:
+    """
+    Looks up word definitions in offline dictionary built by OfflineDictWriter.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._index = self._map_file(INDEX_FILENAME)
+        self._records = self._map_file(RECORDS_FILENAME)
+
+        try:
+            magic, version, index_build_id, self._count = INDEX_HEADER.unpack_from(self._index)
+            if magic != INDEX_MAGIC or version != FORMAT_VERSION:
+                raise errors.OfflineDictFormatError(path, f"unknown index format {magic!r} v{version}")
+            magic, version, records_build_id = RECORDS_HEADER.unpack_from(self._records)
+            if magic != RECORDS_MAGIC or version != FORMAT_VERSION:
+                raise errors.OfflineDictFormatError(path, f"unknown records format {magic!r} v{version}")
+        except struct.error as exc:
+            raise errors.OfflineDictFormatError(path, f"truncated header: {exc}") from exc
+        if index_build_id != records_build_id:
+            raise errors.OfflineDictFormatError(
+                path, "index and records are from different builds, dictionary is being rebuilt"
+            )
+        self._keys_offset = INDEX_HEADER.size + self._count * INDEX_SLOT.size
+
+    def _map_file(self, filename: str) -> mmap.mmap:
+        file_path = os.path.join(self._path, filename)
+        try:
+            with open(file_path, "rb") as fh:
+                # mapping stays valid after the file is closed
+                return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as exc:
+            raise errors.OfflineDictFormatError(self._path, f"{file_path}: {exc}") from exc
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, word: str) -> bool:
+        return self._find_slot(word.lower().encode()) is not None
+
+    def get(self, word: str) -> Optional[model.WordDefinition]:
+        slot = self._find_slot(word.lower().encode())
+        if slot is None:
+            return None
+        record_offset, record_length = slot
+        record = self._records[record_offset:record_offset + record_length]
+        try:
+            return _definition_from_dict(json.loads(zlib.decompress(record)))
+        except (zlib.error, ValueError, KeyError, TypeError) as exc:
+            raise errors.CantParseDictData(f"broken offline dictionary record of word {word}: {exc}") from exc
+
+    def words(self) -> List[str]:
+        return [self._get_key(i).decode() for i in range(self._count)]
+
+    def close(self):
+        self._index.close()
+        self._records.close()
+
+    def _get_key(self, position: int) -> bytes:
+        key_offset, key_length, _, _ = INDEX_SLOT.unpack_from(
+            self._index, INDEX_HEADER.size + position * INDEX_SLOT.size
+        )
+        start = self._keys_offset + key_offset
+        return self._index[start:start + key_length]
+
+    def _find_slot(self, key: bytes) -> Optional[Tuple[int, int]]:
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._get_key(low) == key:
+            _, _, record_offset, record_length = INDEX_SLOT.unpack_from(
+                self._index, INDEX_HEADER.size + low * INDEX_SLOT.size
+            )
+            return record_offset, record_length
+        return None
@@ -1,14 +1,19 @@
 import json
 import logging
 import requests
-from urllib.parse import urljoin
-from typing import Dict, Optional
+from urllib.parse import urljoin, urlparse
+from typing import Dict, Iterable, List, Optional, Union
 
 
-from kobo2anki.caching import LocalFSCaching
+from kobo2anki.caching import get_cache_handler, NegativeResultCache, DEFAULT_NEGATIVE_CACHE_TTL
 from kobo2anki.pronunciation import WordPronunciation
 from kobo2anki.dicts.oxforddictionaries import parser
 from kobo2anki.dicts import errors
+from kobo2anki.dicts.aio import gather_definitions
+from kobo2anki.dicts.batch import DEFAULT_LOOKUP_WORKERS, map_definitions
+from kobo2anki.http_session import get_session
+from kobo2anki.aio_session import REQUEST_ERRORS, AsyncResponse, get_async_session
+from kobo2anki.circuit_breaker import get_circuit_breaker
 from kobo2anki import model
 
 logger = logging.getLogger(__name__)
@@ -20,15 +25,73 @@ DICT_NAME = "oxforddictionaries"
 
 class OxfordDictionaryClient:
 
-    credentials_accepted: bool = True
-
-    def __init__(self, app_id: str, app_key: str):
+    def __init__(
+            self,
+            app_id: str,
+            app_key: str,
+            negative_cache_ttl: float = DEFAULT_NEGATIVE_CACHE_TTL,
+            lookup_workers: int = DEFAULT_LOOKUP_WORKERS,
+    ):
         self._app_id = app_id
         self._app_key = app_key
-        self._cache_handler = LocalFSCaching()
+        self._cache_handler = get_cache_handler()
+        self._negative_cache = NegativeResultCache(self._cache_handler, DICT_NAME, negative_cache_ttl)
+        self._session = get_session()
+        self._lookup_workers = lookup_workers
 
     def get_definition(self, word: str) -> model.WordDefinition:
         json_response = self._get_raw_response(word)
+        return self._build_definition(word, json_response)
+
+    def get_definitions(
+            self, words: Iterable[str]
+    ) -> Dict[str, Union[model.WordDefinition, Exception]]:
+        # read cache for all words at once, only misses go to the dictionary
+        unique_words = list(dict.fromkeys(words))
+        cached_responses = self._get_many_cached_json(unique_words)
+        known_misses = self._negative_cache.get_known_misses(
+            [word for word in unique_words if word not in cached_responses]
+        )
+
+        def _get(word: str) -> model.WordDefinition:
+            if word in known_misses:
+                raise errors.WordTranslationNotFound(word)
+            response_json = cached_responses.get(word)
+            if response_json is None:
+                response_json = self._get_word_from_dictionary(word)
+                self._save_response_to_cache(word, response_json)
+            return self._build_definition(word, response_json)
+
+        return map_definitions(_get, unique_words, self._lookup_workers)
+
+    async def aget_definition(self, word: str) -> model.WordDefinition:
+        json_response = self._get_cached_json(word)
+        if json_response is None:
+            json_response = await self._aget_word_from_dictionary(word)
+            self._save_response_to_cache(word, json_response)
+        return self._build_definition(word, json_response)
+
+    async def aget_definitions(
+            self, words: Iterable[str]
+    ) -> Dict[str, Union[model.WordDefinition, Exception]]:
+        unique_words = list(dict.fromkeys(words))
+        cached_responses = self._get_many_cached_json(unique_words)
+        known_misses = self._negative_cache.get_known_misses(
+            [word for word in unique_words if word not in cached_responses]
+        )
+
+        async def _get(word: str) -> model.WordDefinition:
+            if word in known_misses:
+                raise errors.WordTranslationNotFound(word)
+            response_json = cached_responses.get(word)
+            if response_json is None:
+                response_json = await self._aget_word_from_dictionary(word)
+                self._save_response_to_cache(word, response_json)
+            return self._build_definition(word, response_json)
+
+        return await gather_definitions(_get, unique_words)
+
+    def _build_definition(self, word: str, json_response: Dict) -> model.WordDefinition:
         definition = self._parse_json_definition(word, json_response)
         definition.pronunciation = self._get_pronunciation(json_response)
         return definition
@@ -74,6 +137,21 @@ class OxfordDictionaryClient:
                 )
         return result
 
+    def _get_many_cached_json(self, words: List[str]) -> Dict[str, Dict]:
+        keys = {self._get_word_cache_key(word): word for word in words}
+        result = {}  # type: Dict[str, Dict]
+        for key, cached_data in self._cache_handler.get_many(DICT_NAME, list(keys)).items():
+            try:
+                result[keys[key]] = json.loads(cached_data)
+            except json.JSONDecodeError as exc:
+                logger.warning(
+                    "Can't parse cache json for word '%s'. Err: %s",
+                    keys[key],
+                    exc
+                )
+        logger.debug("Found cache for %d of %d words", len(result), len(words))
+        return result
+
     def _save_response_to_cache(self, word: str, response_json: Dict):
         self._cache_handler.save_data_to_cache(
             DICT_NAME,
@@ -85,40 +163,64 @@ class OxfordDictionaryClient:
         )
 
     def _get_word_from_dictionary(self, word: str) -> Dict:
-        if not self.credentials_accepted:
-            raise errors.NotAbleToGetWordTranlsation(
-                word,
-                "Dictioanry doesn't accept credentials, will not even call it"
-            )
-        url = urljoin(
-            BASE_URL,
-            LANGUAGE + "/" + word.lower()
-        )
+        if self._negative_cache.is_known_miss(word):
+            logger.debug("Dictionary didn't know word %s last time, will not call it", word)
+            raise errors.WordTranslationNotFound(word)
+        url = self._get_word_url(word)
         try:
             logger.debug("Will use '%s' for word %s", url, word)
-            response = requests.get(
+            response = self._session.get(
                 url,
                 headers={"app_id": self._app_id, "app_key": self._app_key}
             )
-            if response.status_code == 404:
-                raise errors.WordTranslationNotFound(word)
-            elif response.status_code == 403:
-                self.credentials_accepted = False
-                raise errors.NotAbleToGetWordTranlsation(
-                    word,
-                    f"Got status code {response.status_code}, will not use this dictionary"
-                )
-            elif response.status_code != 200:
-                raise errors.NotAbleToGetWordTranlsation(
-                    word,
-                    f"Got status code {response.status_code}"
-                )
-            response_json = response.json()
-            logger.info("Got translation for word %s", word)
-            logger.debug("Response for word %s is '%s'", word, response_json)
-            return response_json
+            return self._parse_response(word, url, response)
         except requests.RequestException as exc:
             raise errors.NotAbleToGetWordTranlsation(word, exc) from exc
 
+    async def _aget_word_from_dictionary(self, word: str) -> Dict:
+        if self._negative_cache.is_known_miss(word):
+            logger.debug("Dictionary didn't know word %s last time, will not call it", word)
+            raise errors.WordTranslationNotFound(word)
+        url = self._get_word_url(word)
+        try:
+            logger.debug("Will use '%s' for word %s", url, word)
+            response = await get_async_session().get(
+                url,
+                headers={"app_id": self._app_id, "app_key": self._app_key}
+            )
+        except REQUEST_ERRORS as exc:
+            raise errors.NotAbleToGetWordTranlsation(word, repr(exc)) from exc
+        try:
+            return self._parse_response(word, url, response)
+        except ValueError as exc:
+            raise errors.NotAbleToGetWordTranlsation(word, repr(exc)) from exc
+
+    def _get_word_url(self, word: str) -> str:
+        return urljoin(
+            BASE_URL,
+            LANGUAGE + "/" + word.lower()
+        )
+
+    def _parse_response(self, word: str, url: str, response: Union[requests.Response, AsyncResponse]) -> Dict:
+        if response.status_code == 404:
+            self._negative_cache.record_miss(word)
+            raise errors.WordTranslationNotFound(word)
+        elif response.status_code == 403:
+            # credentials will not be accepted for other words either
+            get_circuit_breaker(urlparse(url).netloc).trip()
+            raise errors.NotAbleToGetWordTranlsation(
+                word,
+                f"Got status code {response.status_code}, will not use this dictionary"
+            )
+        elif response.status_code != 200:
+            raise errors.NotAbleToGetWordTranlsation(
+                word,
+                f"Got status code {response.status_code}"
+            )
+        response_json = response.json()
+        logger.info("Got translation for word %s", word)
+        logger.debug("Response for word %s is '%s'", word, response_json)
+        return response_json
+
     def __repr__(self):
         return "OxfordDictionaryClient"
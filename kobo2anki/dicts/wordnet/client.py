@@ -0,0 +1,78 @@
+import logging
+from typing import Dict, Iterable, List, Union
+
+from nltk.corpus import wordnet
+
+from kobo2anki import model
+from kobo2anki.nltk_corpora import ensure_wordnet
+from kobo2anki.dicts import errors
+from kobo2anki.dicts.batch import map_definitions
+
+
+logger = logging.getLogger(__name__)
+
+DICT_NAME = "wordnet"
+
+# WordNet synset parts of speech, 's' is an adjective satellite.
+# Tags are literals, any attribute of the lazy `wordnet` loader loads the corpus.
+POS_TO_PART = {
+    "n": model.Parts.NOUN,
+    "v": model.Parts.VERB,
+    "a": model.Parts.ADJECTIVE,
+    "s": model.Parts.ADJECTIVE,
+    "r": model.Parts.ADVERB,
+}
+
+
+class WordNetClient:
+    """
+    Builds definitions from local NLTK WordNet data, doesn't use network
+    except downloading WordNet once. WordNet has no transcriptions and pronunciations.
+    """
+
+    def __init__(self):
+        ensure_wordnet()
+
+    def get_definition(self, word: str) -> model.WordDefinition:
+        logger.info("Getting defintion for word %s, using 'wordnet'", word)
+        # multi word expressions use underscores in WordNet
+        synsets = wordnet.synsets(word.replace(" ", "_"))
+        if not synsets:
+            raise errors.WordTranslationNotFound(word)
+
+        definitions_by_part = {}  # type: Dict[model.Parts, List[model.Definition]]
+        for synset in synsets:
+            part = POS_TO_PART.get(synset.pos())
+            if part is None:
+                logger.debug("Unknown part of speech %s of synset %s", synset.pos(), synset.name())
+                continue
+            definitions_by_part.setdefault(part, []).append(
+                model.Definition(
+                    definitions=[synset.definition()],
+                    synonyms=self._get_synonyms(word, synset),
+                    examples=synset.examples(),
+                )
+            )
+        # parts are in the order WordNet returns synsets, the most common first
+        explanations = [
+            model.PartExplanations(part=part, definitions=definitions)
+            for part, definitions in definitions_by_part.items()
+        ]
+        return model.WordDefinition(word=word, transcription="", explanations=explanations)
+
+    def _get_synonyms(self, word: str, synset) -> List[str]:
+        synonyms = []  # type: List[str]
+        for lemma_name in synset.lemma_names():
+            synonym = lemma_name.replace("_", " ")
+            if synonym.lower() != word.lower() and synonym not in synonyms:
+                synonyms.append(synonym)
+        return synonyms
+
+    def get_definitions(
+            self, words: Iterable[str]
+    ) -> Dict[str, Union[model.WordDefinition, Exception]]:
+        # lookups are local and CPU bound, threads wouldn't make them faster
+        return map_definitions(self.get_definition, words, workers=1)
+
+    def __repr__(self):
+        return "WordNetClient"
@@ -1,3 +1,6 @@
+import requests
+
+
 class GettingPronunciationError(Exception):
     def __init__(self, msg: str):
         super().__init__(self, msg)
@@ -5,3 +8,8 @@ class GettingPronunciationError(Exception):
 class SavingPronunciationError(Exception):
     def __init__(self, msg: str):
         super().__init__(self, msg)
+
+
+class CircuitOpenError(requests.RequestException):
+    def __init__(self, name: str):
+        super().__init__(f"Circuit {name} is open, service is considered unavailable")
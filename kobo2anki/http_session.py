@@ -0,0 +1,226 @@
+import time
+import random
+import logging
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from kobo2anki.circuit_breaker import get_circuit_breaker
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 10  # seconds
+# number of hosts connection pools are kept for
+DEFAULT_POOL_CONNECTIONS = 10
+# number of keep-alive connections kept for a single host
+DEFAULT_POOL_MAXSIZE = 16
+DEFAULT_RETRIES = 4
+# delays between retries are backoff_factor * 2 ** (retry - 1) seconds plus jitter
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_BACKOFF_JITTER = 0.5
+# don't wait longer than that even if server asks to
+MAX_RETRY_AFTER = 60
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+# requests per second to a single host, burst is number of requests which can be sent at once
+DEFAULT_HOST_RATE = 10.0
+DEFAULT_HOST_BURST = 10
+# requests to a single host in flight on an event loop, see aio_session
+DEFAULT_HOST_CONCURRENCY = 8
+
+
+class JitteredRetry(Retry):
+    """
+    urllib3 retry policy which adds random jitter to exponential backoff,
+    so parallel workers don't retry at the same moment, and caps Retry-After.
+    """
+
+    backoff_jitter_max = DEFAULT_BACKOFF_JITTER
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return backoff + random.uniform(0, self.backoff_jitter_max)
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_AFTER)
+
+
+def build_retry(retries: int = DEFAULT_RETRIES, backoff_factor: float = DEFAULT_BACKOFF_FACTOR) -> Retry:
+    return JitteredRetry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(("GET", "HEAD")),
+        respect_retry_after_header=True,
+        # return the last response, callers report status codes themselves
+        raise_on_status=False,
+    )
+
+
+class TokenBucket:
+    """
+    Lets through `rate` requests per second on average and up to `burst` at once.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes a token and returns seconds to wait before the request can be sent.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self._rate)
+            self._updated_at = now
+            # take token in advance, so waiting callers are served in order
+            self._tokens -= 1
+            return -self._tokens / self._rate if self._tokens < 0 else 0
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """
+    Token bucket per host, rate of zero disables limiting.
+    """
+
+    def __init__(self, rate: float = DEFAULT_HOST_RATE, burst: int = DEFAULT_HOST_BURST):
+        self._rate = rate
+        self._burst = burst
+        self._buckets = {}  # type: Dict[str, TokenBucket]
+        self._lock = threading.Lock()
+
+    def reserve(self, url: str) -> float:
+        """
+        Returns seconds to wait before a request to `url` can be sent, used on an event loop.
+        """
+        if self._rate <= 0:
+            return 0
+        return self._get_bucket(url).reserve()
+
+    def acquire(self, url: str):
+        if self._rate <= 0:
+            return
+        self._get_bucket(url).acquire()
+
+    def _get_bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self._rate, self._burst)
+            return self._buckets[host]
+
+
+class HTTPSession(requests.Session):
+    """
+    requests session with keep-alive connection pools per host,
+    a timeout applied to requests which don't set their own,
+    retries of throttled and failed requests, per host rate limiting
+    and per host circuit breakers.
+    """
+
+    def __init__(
+            self,
+            timeout: float = DEFAULT_TIMEOUT,
+            pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+            pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+            retry: Optional[Retry] = None,
+            rate_limiter: Optional[HostRateLimiter] = None,
+    ):
+        super().__init__()
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=build_retry() if retry is None else retry,
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, *args, **kwargs):  # pylint: disable=arguments-differ
+        kwargs.setdefault("timeout", self.timeout)
+        breaker = get_circuit_breaker(urlparse(url).netloc)
+        breaker.before_call()
+        self.rate_limiter.acquire(url)
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+        # retries are already exhausted at this point
+        if response.status_code in RETRY_STATUSES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+
+_timeout = DEFAULT_TIMEOUT  # type: float
+_pool_connections = DEFAULT_POOL_CONNECTIONS
+_pool_maxsize = DEFAULT_POOL_MAXSIZE
+_retries = DEFAULT_RETRIES
+_host_rate = DEFAULT_HOST_RATE  # type: float
+_session = None  # type: Optional[HTTPSession]
+_session_lock = threading.Lock()
+
+
+def configure_session(
+        timeout: float = DEFAULT_TIMEOUT,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        retries: int = DEFAULT_RETRIES,
+        host_rate: float = DEFAULT_HOST_RATE,
+):
+    """
+    Choose default timeout, connection pools sizes, number of retries
+    and requests per second to a single host used by get_session.
+    """
+    global _timeout, _pool_connections, _pool_maxsize, _retries, _host_rate, _session  # pylint: disable=global-statement
+    with _session_lock:
+        _timeout = timeout
+        _pool_connections = pool_connections
+        _pool_maxsize = pool_maxsize
+        _retries = retries
+        _host_rate = host_rate
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_session() -> HTTPSession:
+    """
+    Returns HTTP session shared by the whole process,
+    so connections to the same host are reused by all network components.
+    """
+    global _session  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is None:
+            logger.debug(
+                "Initialize HTTP session, timeout %s, pool size %d", _timeout, _pool_maxsize
+            )
+            _session = HTTPSession(
+                timeout=_timeout,
+                pool_connections=_pool_connections,
+                pool_maxsize=_pool_maxsize,
+                retry=build_retry(_retries),
+                rate_limiter=HostRateLimiter(_host_rate),
+            )
+        return _session
@@ -1,16 +1,23 @@
 import os
 import logging
+import httplib2
 import requests
 import tempfile
-import googleapiclient
+import googleapiclient.errors
 from typing import Optional
 from google_images_search import GoogleImagesSearch
 
-from kobo2anki.caching import LocalFSCaching
+from kobo2anki import errors
+from kobo2anki.caching import get_cache_handler
+from kobo2anki.circuit_breaker import get_circuit_breaker
 
 
 logger = logging.getLogger(__name__)
 
+# googleapiclient sends search requests with httplib2, images are downloaded with requests,
+# timeouts and connection errors of httplib2 are raised as OSError
+SEARCH_ERRORS = (googleapiclient.errors.HttpError, httplib2.HttpLib2Error, requests.RequestException, OSError)
+
 
 class WordImage:
 
@@ -36,9 +43,11 @@ class WordImage:
 class ImageSearcher:
 
     cache_entity = "images"
+    circuit_name = "google_images_search"
 
     def __init__(self, api_key: str, custom_search_cx: str):
-        self._cache = LocalFSCaching()
+        self._cache = get_cache_handler()
+        self._circuit_breaker = get_circuit_breaker(self.circuit_name)
         self._tempdir = tempfile.mkdtemp()
         self._gis = GoogleImagesSearch(api_key, custom_search_cx)
 
@@ -57,13 +66,27 @@ class ImageSearcher:
             }
 
             # Search for the image
+            try:
+                self._circuit_breaker.before_call()
+            except errors.CircuitOpenError as exc:
+                logger.debug("Will not search image for word %s, err %s", word, str(exc))
+                return None
+            succeeded = False
             try:
                 self._gis.search(search_params)
+                succeeded = True
 
                 for result in self._gis.results():
                     self._cache.save_data_to_cache(self.cache_entity, cache_filename, result.get_raw_data())
                     return WordImage(cache_filename, result.get_raw_data())
-            except googleapiclient.errors.HttpError as exc:
+            except SEARCH_ERRORS as exc:
+                succeeded = False
                 logger.warning("Can't get image for word %s, err %s", word, str(exc))
+            finally:
+                # outcome is recorded whatever was raised, so a half-open circuit isn't left waiting for it
+                if succeeded:
+                    self._circuit_breaker.record_success()
+                else:
+                    self._circuit_breaker.record_failure()
 
         return None
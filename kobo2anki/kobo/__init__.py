@@ -1,4 +1,4 @@
-from typing import Protocol, runtime_checkable, List
+from typing import Protocol, runtime_checkable, Iterable, Iterator, List
 
 
 @runtime_checkable
@@ -9,3 +9,15 @@ class KoboDBReaderProtocol(Protocol):  # pylint: disable=all
         Extract saved words from kobo sqlite DB.
         """
         pass
+
+    def iter_saved_words(self) -> Iterator[str]:
+        """
+        Same as get_saved_words, but words are yielded while they are read.
+        """
+        pass
+
+    def retry_later(self, words: Iterable[str]):
+        """
+        Words which couldn't be looked up because of errors, reader may return them again next time.
+        """
+        pass
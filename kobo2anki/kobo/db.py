@@ -1,59 +1,176 @@
 import os
 import sqlite3
+import hashlib
 import logging
-from typing import List, Tuple, Optional
+import tempfile
+from typing import Iterator, List, Tuple, Optional
+from urllib.parse import quote
 
 from kobo2anki.kobo import errors, model
 
 logger = logging.getLogger(__name__)
 
+SNAPSHOT_FILENAME = "KoboReader.sqlite"
+# rows fetched from Kobo DB at once by streaming queries
+DEFAULT_FETCH_SIZE = 1000
+
 
 class KoboDB:
     """
-    Class to work with kobo sqlite db
+    Class to work with kobo sqlite db.
+    DB is opened read-only once and the connection is reused until close.
+    With `snapshot` DB is first copied to a local temporary file with SQLite backup API,
+    so slow e-reader mounts are read once and the device DB isn't locked while we query.
     """
 
-    def __init__(self, db_file_path: str):
+    def __init__(self, db_file_path: str, snapshot: bool = False):
         self._db_file_path = db_file_path
         if not os.path.exists(self._db_file_path):
             raise errors.KoboDataNotFound(
                 f"Path {self._db_file_path} doesn't exists. Can't open Kobo DB"
             )
+        self._snapshot = snapshot
+        self._snapshot_dir = None  # type: Optional[tempfile.TemporaryDirectory]
         self._con = None  # type: Optional[sqlite3.Connection]
 
-    def _execute_query(self, query: str) -> List[Tuple]:
+    def __enter__(self) -> "KoboDB":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self._con:
+            self._con.close()
+            self._con = None
+            logger.debug("Closed connection to Kobo DB")
+        if self._snapshot_dir:
+            self._snapshot_dir.cleanup()
+            self._snapshot_dir = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # device doesn't change DB while it is mounted, so it is safe to skip locking
+        uri = f"file:{quote(os.path.abspath(self._db_file_path))}?mode=ro&immutable=1"
+        try:
+            con = sqlite3.connect(uri, uri=True)
+            if not self._snapshot:
+                logger.debug("Opened read-only connection to Kobo DB - %s", self._db_file_path)
+                return con
+            self._snapshot_dir = tempfile.TemporaryDirectory(prefix="kobo2anki-")
+            snapshot_path = os.path.join(self._snapshot_dir.name, SNAPSHOT_FILENAME)
+            snapshot_con = sqlite3.connect(snapshot_path)
+            with con:
+                con.backup(snapshot_con)
+            con.close()
+        except sqlite3.Error as exc:
+            raise errors.KoboDataReadingError(f"{self._db_file_path}: {exc}") from exc
+        logger.debug("Copied Kobo DB %s to %s", self._db_file_path, snapshot_path)
+        return snapshot_con
+
+    def _execute_query(self, query: str, params: Tuple = ()) -> List[Tuple]:
         if not self._con:
-            self._con = sqlite3.connect(self._db_file_path)
-            logger.debug(
-                "Opened connection to Kobo DB - %s", self._db_file_path
-            )
+            self._con = self._connect()
         logger.debug("Going to execute query: %s", query)
         cursor = self._con.cursor()
-        response = cursor.execute(query)
+        response = cursor.execute(query, params)
         result = response.fetchall()
         logger.debug("Query '%s' returned %d rows", query, len(result))
-        if self._con:
-            self._con.close()
-            self._con = None
-            logger.debug("Closed connection to Kobo DB")
         return result
 
+    def _iter_query(self, query: str, params: Tuple = (), batch_size: int = DEFAULT_FETCH_SIZE) -> Iterator[Tuple]:
+        """
+        Yields rows fetched in batches, so only one batch is kept in memory.
+        """
+        if not self._con:
+            self._con = self._connect()
+        logger.debug("Going to stream query: %s", query)
+        cursor = self._con.cursor()
+        cursor.execute(query, params)
+        rows = 0
+        while True:
+            records = cursor.fetchmany(batch_size)
+            if not records:
+                break
+            rows += len(records)
+            yield from records
+        logger.debug("Query '%s' returned %d rows", query, rows)
+
+    def iter_dict_words(self) -> Iterator[model.DictWord]:
+        for record in self._iter_query("select Text, DictSuffix from wordlist"):
+            yield model.DictWord(text=record[0], dict_suffix=record[1])
+
     def get_dict_words(self) -> List[model.DictWord]:
-        res = []  # type: List[model.DictWord]
-        records = self._execute_query("select Text, DictSuffix from wordlist")
-        for record in records:
-            res.append(
-                model.DictWord(text=record[0], dict_suffix=record[1])
-            )
-        return res
-
-    def get_highlights(self) -> List[model.HighLight]:
-        res = []  # type: List[model.HighLight]
-        records = self._execute_query(
-            'select BookmarkID, Text from bookmark where Type="highlight"'
-        )
-        for record in records:
-            res.append(
-                model.HighLight(id=record[0], text=record[1])
-            )
-        return res
+        return list(self.iter_dict_words())
+
+    def iter_highlights(
+            self,
+            after_rowid: int = 0,
+            max_rowid: Optional[int] = None,
+            max_length: Optional[int] = None,
+            max_spaces: Optional[int] = None,
+            created_after: Optional[str] = None,
+    ) -> Iterator[model.HighLight]:
+        """
+        Yields highlights with rowid in (after_rowid, max_rowid], all of them by default.
+        With `created_after` only highlights with later DateCreated are yielded.
+        Highlights longer than `max_length` chars or with more than `max_spaces` spaces are skipped by SQLite.
+        """
+        # rowid range goes first, so SQLite seeks the table instead of scanning it from the start
+        query = "select BookmarkID, Text from bookmark where rowid > ?"
+        params = (after_rowid,)  # type: Tuple
+        if max_rowid is not None:
+            query += " and rowid <= ?"
+            params += (max_rowid,)
+        query += " and Type = 'highlight' and Text is not null"
+        if created_after is not None:
+            query += " and DateCreated > ?"
+            params += (created_after,)
+        if max_length is not None:
+            query += " and length(Text) <= ?"
+            params += (max_length,)
+        if max_spaces is not None:
+            query += " and length(Text) - length(replace(Text, ' ', '')) <= ?"
+            params += (max_spaces,)
+        for record in self._iter_query(query, params):
+            yield model.HighLight(id=record[0], text=record[1])
+
+    def get_highlights(self, after_rowid: int = 0, max_rowid: Optional[int] = None) -> List[model.HighLight]:
+        return list(self.iter_highlights(after_rowid, max_rowid))
+
+    def get_max_highlight_rowid(self) -> int:
+        # max rowid of the whole table is a lookup of the last row, not a scan
+        records = self._execute_query("select max(rowid) from bookmark")
+        return records[0][0] or 0
+
+    def get_bookmark_id(self, rowid: int) -> Optional[str]:
+        records = self._execute_query("select BookmarkID from bookmark where rowid = ?", (rowid,))
+        return records[0][0] if records else None
+
+    def get_max_bookmark_date(self, after_rowid: int = 0, max_rowid: Optional[int] = None) -> Optional[str]:
+        """
+        The latest DateCreated of bookmarks with rowid in (after_rowid, max_rowid].
+        """
+        query = "select max(DateCreated) from bookmark where rowid > ?"
+        params = (after_rowid,)  # type: Tuple
+        if max_rowid is not None:
+            query += " and rowid <= ?"
+            params += (max_rowid,)
+        return self._execute_query(query, params)[0][0]
+
+    def get_fingerprint(self) -> str:
+        """
+        Cheap digest which changes when words are saved or highlights are added or removed:
+        row counts and max rowids of both tables, BookmarkID of the last bookmark and text of saved words.
+        Highlights text isn't read, so fingerprint of a big library is still computed in milliseconds.
+        """
+        digest = hashlib.sha1()
+        for query in (
+            "select count(*), max(rowid) from wordlist",
+            "select count(*), max(rowid) from bookmark",
+            # bookmark added after the last one was deleted reuses its rowid, but has a new BookmarkID
+            "select BookmarkID from bookmark order by rowid desc limit 1",
+        ):
+            digest.update(repr(self._execute_query(query)).encode())
+        for record in self._iter_query("select Text from wordlist order by rowid"):
+            digest.update(f"{record[0]}\0".encode())
+        return digest.hexdigest()
@@ -1,16 +1,36 @@
 import os
 import re
+import hashlib
 import logging
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
 
 from kobo2anki.kobo import errors, db
+from kobo2anki.kobo.state import ExtractionState, ExtractionStateStore
 
 logger = logging.getLogger(__name__)
 
+# words are runs of at least 3 word chars, shorter runs are parts of words cut by highlight bounds
+WORD_RE = re.compile(r"\w{3,}")
+# highlights which can still be a single word, e.g. 'er flatter t'
+MAX_WORD_HIGHLIGHT_LENGTH = 100
+MAX_WORD_HIGHLIGHT_SPACES = 5
+
 
 class KoboReader:
+    """
+    Reads words saved on Kobo e-reader mounted at `mount_path`.
+    Kobo DB stays open until close, see KoboDB for `snapshot`.
+    With `state_store` only words saved after the last committed run are read,
+    plus words which failed to be looked up last time,
+    state of the current run is saved by commit_state.
+    """
 
-    def __init__(self, mount_path: str):
+    def __init__(
+            self,
+            mount_path: str,
+            snapshot: bool = False,
+            state_store: Optional[ExtractionStateStore] = None,
+    ):
         self._mount_path = mount_path
         if not os.path.exists(self._mount_path):
             raise errors.KoboDataNotFound(
@@ -18,47 +38,152 @@ class KoboReader:
             )
         logger.debug("Look for kobo data in folder - %s", self._mount_path)
         self._db_handler = db.KoboDB(
-            os.path.join(self._mount_path, ".kobo/KoboReader.sqlite")
+            os.path.join(self._mount_path, ".kobo/KoboReader.sqlite"),
+            snapshot=snapshot,
         )
+        self._state_store = state_store
+        self._pending_state = None  # type: Optional[ExtractionState]
+        self._words_to_retry = set()  # type: Set[str]
+
+    def __enter__(self) -> "KoboReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._db_handler.close()
+
+    @property
+    def device_id(self) -> str:
+        """
+        Serial number from .kobo/version, hash of the mount path if it can't be read.
+        """
+        try:
+            with open(os.path.join(self._mount_path, ".kobo/version"), encoding="utf-8") as fh:
+                serial = fh.read().split(",", 1)[0].strip()
+        except OSError:
+            serial = ""
+        if serial:
+            return serial
+        return "path-" + hashlib.sha1(os.path.abspath(self._mount_path).encode()).hexdigest()
+
+    def get_fingerprint(self) -> str:
+        """
+        Changes when words are saved on the device, see KoboDB.get_fingerprint.
+        """
+        return self._db_handler.get_fingerprint()
 
     def get_saved_words(self) -> List[str]:
-        words = []  # type: List[str]
-        dict_words = self._db_handler.get_dict_words()
-        logger.info("Got %d saved dict words from kobo", len(dict_words))
-        words.extend(filter(
-            None,
-            map(lambda x: self._extract_word(x.text), dict_words)
-        ))
-        logger.debug("Added %d words after cleaning", len(words))
-
-        highlights = self._db_handler.get_highlights()
-        logger.info("Got %d highlights from kobo", len(highlights))
-        words.extend(filter(
-            None,
-            map(lambda x: self._extract_word(x.text), highlights)
-        ))
-        logger.debug("Added %d more words after cleaning", len(words))
-        return list(tuple(words))
+        return list(self.iter_saved_words())
 
-    def _extract_word(self, sentence: str) -> Optional[str]:
+    def iter_saved_words(self) -> Iterator[str]:
+        """
+        Yields cleaned saved dict words and highlighted words while they are read from Kobo DB.
+        """
+        state = None  # type: Optional[ExtractionState]
+        if self._state_store is not None:
+            state = self._state_store.load(self.device_id)
+            if state.retry_words:
+                logger.info("Will retry %d words which failed last time", len(state.retry_words))
+                # they are added back by retry_later if they fail again
+                yield from sorted(state.retry_words)
+                state.retry_words = set()
 
-        # split sentence into parts by non word chars
-        parts = re.split(r"\W+", sentence)
-        logger.debug(
-            "Split string %s into parts %s", sentence, parts
-        )
+        dict_words_count = 0
+        for dict_word in self._db_handler.iter_dict_words():
+            if state is not None:
+                if not state.is_new_word(dict_word.text):
+                    continue
+                state.add_words([dict_word.text])
+            dict_words_count += 1
+            word = self._extract_word(dict_word.text)
+            if word:
+                yield word
+        logger.info("Got %d saved dict words from kobo", dict_words_count)
 
-        # filter out parts shorter than 3 chars
-        words = list(filter(lambda x: len(x) > 2, parts))
-        logger.debug(
-            "We identified following words in the sentence: %s",
-            words
+        after_rowid, max_rowid = 0, None  # type: int, Optional[int]
+        # highlights with rowid up to `replaced_rowid` are read again if they were created after the last run
+        replaced_rowid = 0
+        if state is not None:
+            max_rowid = self._db_handler.get_max_highlight_rowid()
+            after_rowid, replaced_rowid = self._check_last_bookmark(state, max_rowid)
+        highlights_count = 0
+        ranges = [(after_rowid, max_rowid, None)]  # type: List[Tuple[int, Optional[int], Optional[str]]]
+        if replaced_rowid and state is not None:
+            ranges.append((0, replaced_rowid, state.bookmark_date))
+        for range_after_rowid, range_max_rowid, created_after in ranges:
+            for highlight in self._db_handler.iter_highlights(
+                    range_after_rowid, range_max_rowid, created_after=created_after,
+                    max_length=MAX_WORD_HIGHLIGHT_LENGTH, max_spaces=MAX_WORD_HIGHLIGHT_SPACES,
+            ):
+                highlights_count += 1
+                word = self._extract_word(highlight.text)
+                if word:
+                    yield word
+        logger.info("Got %d highlights from kobo", highlights_count)
+
+        if state is not None and max_rowid is not None:
+            # replaced bookmarks are anywhere below the read range, so all dates are checked then
+            new_date = self._db_handler.get_max_bookmark_date(0 if replaced_rowid else after_rowid, max_rowid)
+            state.bookmark_date = max(filter(None, [state.bookmark_date, new_date]), default=None)
+            state.bookmark_rowid = max_rowid
+            state.bookmark_id = self._db_handler.get_bookmark_id(max_rowid)
+            self._pending_state = state
+
+    def _check_last_bookmark(self, state: ExtractionState, max_rowid: int) -> Tuple[int, int]:
+        """
+        Returns rowid to read highlights after and rowid up to which highlights created
+        after the last run are read too, it isn't 0 when the last read bookmark was deleted:
+        bookmarks added after that reuse rowids which were already read.
+        """
+        after_rowid = state.bookmark_rowid
+        if not after_rowid:
+            return 0, 0
+        if state.bookmark_id is None:
+            # state saved before bookmark ids were kept
+            if max_rowid < after_rowid:
+                logger.warning("Kobo DB has fewer bookmarks than last time, will read all highlights")
+                return 0, 0
+            return after_rowid, 0
+        if self._db_handler.get_bookmark_id(after_rowid) == state.bookmark_id:
+            return after_rowid, 0
+        if state.bookmark_date is None:
+            logger.warning("The last read bookmark was deleted, will read all highlights")
+            return 0, 0
+        logger.info(
+            "The last read bookmark was deleted, will read highlights created after %s", state.bookmark_date
         )
-        if len(words) == 1:
-            logger.debug(
-                "Identified string as a word '%s'", words[0]
-            )
-            return words[0]
-        else:
-            logger.debug("String is not a single word")
+        return after_rowid, after_rowid
+
+    @property
+    def words_to_retry(self) -> Set[str]:
+        return set(self._words_to_retry)
+
+    def retry_later(self, words: Iterable[str]):
+        """
+        Words which couldn't be looked up, they are read again next run.
+        """
+        self._words_to_retry.update(words)
+
+    def commit_state(self):
+        """
+        Remember words read by iter_saved_words, so next run doesn't return them again,
+        except words passed to retry_later.
+        Should be called once they were processed successfully.
+        """
+        if self._state_store is None or self._pending_state is None:
+            return
+        self._pending_state.retry_words.update(self._words_to_retry)
+        self._state_store.save(self.device_id, self._pending_state)
+        self._pending_state = None
+
+    def _extract_word(self, sentence: str) -> Optional[str]:
+        """
+        Returns the only word of 3 or more chars in the sentence, None if there is no such word or more of them.
+        """
+        words = WORD_RE.finditer(sentence)
+        word = next(words, None)
+        if word is None or next(words, None) is not None:
             return None
+        return word.group()
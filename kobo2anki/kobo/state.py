@@ -0,0 +1,94 @@
+import json
+import hashlib
+import logging
+import dataclasses
+from typing import Iterable, Optional, Set
+
+from kobo2anki.caching import CacheHandler
+
+
+logger = logging.getLogger(__name__)
+
+
+def word_digest(text: str) -> str:
+    # short digest is enough to tell saved words apart and keeps the state small
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+@dataclasses.dataclass
+class ExtractionState:
+    """
+    What was already read from a device: the highest highlight rowid, BookmarkID of that row,
+    the latest DateCreated of read bookmarks and digests of saved dictionary words.
+    Words which couldn't be looked up because of errors are kept to be read again.
+    """
+    bookmark_rowid: int = 0
+    bookmark_id: Optional[str] = None
+    bookmark_date: Optional[str] = None
+    wordlist_digests: Set[str] = dataclasses.field(default_factory=set)
+    retry_words: Set[str] = dataclasses.field(default_factory=set)
+
+    def is_new_word(self, text: str) -> bool:
+        return word_digest(text) not in self.wordlist_digests
+
+    def add_words(self, texts: Iterable[str]):
+        self.wordlist_digests.update(map(word_digest, texts))
+
+    def to_json(self) -> bytes:
+        return json.dumps({
+            "bookmark_rowid": self.bookmark_rowid,
+            "bookmark_id": self.bookmark_id,
+            "bookmark_date": self.bookmark_date,
+            "wordlist_digests": sorted(self.wordlist_digests),
+            "retry_words": sorted(self.retry_words),
+        }).encode()
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "ExtractionState":
+        state = json.loads(data)
+        return cls(
+            bookmark_rowid=int(state["bookmark_rowid"]),
+            # state saved before replaced bookmarks were detected has no id and date
+            bookmark_id=state.get("bookmark_id"),
+            bookmark_date=state.get("bookmark_date"),
+            wordlist_digests=set(state["wordlist_digests"]),
+            # state saved before words were retried has no retry words
+            retry_words=set(state.get("retry_words", [])),
+        )
+
+
+class ExtractionStateStore:
+    """
+    Keeps extraction state and Kobo DB fingerprint of the last successful run of every device in cache.
+    """
+
+    cache_entity = "kobo_state"
+    fingerprint_cache_entity = "kobo_fingerprints"
+
+    def __init__(self, cache_handler: CacheHandler):
+        self._cache_handler = cache_handler
+
+    def load(self, device_id: str) -> ExtractionState:
+        data = self._cache_handler.get_cached_data(self.cache_entity, device_id)
+        if not data:
+            logger.info("No extraction state for device %s, will read all words", device_id)
+            return ExtractionState()
+        try:
+            return ExtractionState.from_json(data)
+        except (ValueError, KeyError, TypeError) as exc:
+            logger.warning("Can't parse extraction state of device %s, will read all words. Err: %s", device_id, exc)
+            return ExtractionState()
+
+    def save(self, device_id: str, state: ExtractionState):
+        self._cache_handler.save_data_to_cache(self.cache_entity, device_id, state.to_json())
+        logger.debug(
+            "Saved extraction state of device %s: bookmark rowid %d, %d saved words, %d words to retry",
+            device_id, state.bookmark_rowid, len(state.wordlist_digests), len(state.retry_words)
+        )
+
+    def load_fingerprint(self, device_id: str) -> Optional[str]:
+        data = self._cache_handler.get_cached_data(self.fingerprint_cache_entity, device_id)
+        return data.decode() if data else None
+
+    def save_fingerprint(self, device_id: str, fingerprint: str):
+        self._cache_handler.save_data_to_cache(self.fingerprint_cache_entity, device_id, fingerprint.encode())
@@ -1,13 +1,88 @@
-import nltk
-nltk.download('wordnet')
+import logging
+import functools
+import threading
+from typing import Dict, Iterable, List, Optional
 
+from nltk.corpus import wordnet
 from nltk.stem import WordNetLemmatizer
 
+from kobo2anki.caching import CacheHandler
+from kobo2anki.nltk_corpora import ensure_wordnet
+
+
+logger = logging.getLogger(__name__)
+
+# number of words whose base forms are kept in memory
+DEFAULT_MEMO_SIZE = 4096
+
+# WordNet parts of speech tried in turn: verb, noun, adjective, adverb
+LEMMATIZE_POS = ("v", "n", "a", "r")
+
 
 class LanguageProcessor:
-    def __init__(self):
-        self.lemmatizer = WordNetLemmatizer()
+    """
+    Turns words into their base forms using WordNet.
+    Part of speech of a saved word isn't known, so a word which is a base form of any part of speech
+    is kept as is, e.g. 'evening' isn't turned into 'even'. Other words are lemmatized as a verb,
+    a noun, an adjective and an adverb in turn and the first base form different from the word is used.
+    WordNet is loaded on first use and downloaded only if it isn't installed yet.
+    Base forms are memoized, if `cache_handler` is given `lemmatize_many` also keeps
+    a surface form to base form table in cache, so next runs don't need WordNet for known words.
+    """
+
+    # "lemmas" has base forms of the noun only lemmatizer, they are not reused
+    cache_entity = "lemmas_v2"
+
+    def __init__(self, cache_handler: Optional[CacheHandler] = None, memo_size: int = DEFAULT_MEMO_SIZE):
+        self._cache_handler = cache_handler
+        self._lemmatizer = None  # type: Optional[WordNetLemmatizer]
+        self._lemmatizer_lock = threading.Lock()
+        self._lemmatize_memoized = functools.lru_cache(maxsize=memo_size)(self._lemmatize)
+
+    @property
+    def lemmatizer(self) -> WordNetLemmatizer:
+        with self._lemmatizer_lock:
+            if self._lemmatizer is None:
+                ensure_wordnet()
+                self._lemmatizer = WordNetLemmatizer()
+            return self._lemmatizer
 
     def lemmatize_word(self, word: str) -> str:
-        base_word = self.lemmatizer.lemmatize(word)
-        return base_word
+        return self._lemmatize_memoized(word)
+
+    def lemmatize_many(self, words: Iterable[str]) -> List[str]:
+        """
+        Returns base forms of words in the same order.
+        """
+        words = list(words)
+        unique_words = list(dict.fromkeys(words))
+        base_words = {}  # type: Dict[str, str]
+        if self._cache_handler is not None:
+            cached = self._cache_handler.get_many(self.cache_entity, unique_words)
+            base_words.update((word, data.decode()) for word, data in cached.items())
+
+        new_base_words = {
+            word: self.lemmatize_word(word) for word in unique_words if word not in base_words
+        }
+        logger.debug(
+            "Lemmatized %d words, %d of them were known from cache",
+            len(unique_words), len(unique_words) - len(new_base_words)
+        )
+        if self._cache_handler is not None and new_base_words:
+            self._cache_handler.put_many(
+                self.cache_entity,
+                {word: base_word.encode() for word, base_word in new_base_words.items()},
+            )
+        base_words.update(new_base_words)
+        return [base_words[word] for word in words]
+
+    def _lemmatize(self, word: str) -> str:
+        # makes sure WordNet is installed before morphy reads it
+        lemmatizer = self.lemmatizer
+        if any(wordnet.morphy(word, pos) == word for pos in LEMMATIZE_POS):
+            return word
+        for pos in LEMMATIZE_POS:
+            base_word = lemmatizer.lemmatize(word, pos)
+            if base_word != word:
+                return base_word
+        return word
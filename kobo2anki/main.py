@@ -1,24 +1,43 @@
 import os
 import sys
 import random
+import asyncio
 import logging
 import itertools
-from typing import List, Set, Optional, Type, Iterable
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Set, Optional, Tuple, Type, Iterable, Union
 
 import click
 
 from kobo2anki import model
 from kobo2anki.kobo import reader as kobo_reader
 from kobo2anki.kobo import KoboDBReaderProtocol
-from kobo2anki.dicts import CLIENTS, DictClient
+from kobo2anki.kobo.state import ExtractionStateStore
+from kobo2anki.dicts import CLIENTS, DictClient, AsyncDictClient
 from kobo2anki.dicts import errors as dict_errors
-from kobo2anki.language_processor import LanguageProcessor
-from kobo2anki.image_searcher import ImageSearcher
-from kobo2anki.anki import anki
+from kobo2anki.dicts.hedged import DEFAULT_HEDGE_DELAY, HedgedDictClient
+from kobo2anki.caching import (
+    CACHE_BACKENDS, CODECS, DEFAULT_CACHE_BACKEND, DEFAULT_ENTITY_CODECS, DEFAULT_ENTITY_LIMITS,
+    DEFAULT_NEGATIVE_CACHE_TTL, DAY, MB, EntityLimits, configure_cache, get_cache_handler
+)
+from kobo2anki.http_session import (
+    DEFAULT_HOST_CONCURRENCY, DEFAULT_HOST_RATE, DEFAULT_POOL_MAXSIZE, DEFAULT_RETRIES, DEFAULT_TIMEOUT,
+    configure_session
+)
+
+if TYPE_CHECKING:
+    from kobo2anki.language_processor import LanguageProcessor
+    from kobo2anki.image_searcher import ImageSearcher
+    from kobo2anki.anki import anki
 
 logger = logging.getLogger(__name__)
 
 
+class NoDefinitionsFound(RuntimeError):
+    pass
+
+
 # TODO
 # Add tests
 # Restructure to make it simpler
@@ -35,8 +54,9 @@ a number from 0000 to 9999.
 )
 # TODO: Implement dict choosing
 @click.option("--dict-client", show_default=True,
-              type=click.Choice(['freedict', 'oxforddict']), default='freedict',
-              help="Choose dictionary for translation. Currently supported: freedict, oxforddict"
+              type=click.Choice(list(CLIENTS)), default='freedict',
+              help="Choose dictionary for translation. 'wordnet' uses local NLTK WordNet data "
+                   + "and doesn't need network."
               )
 @click.option("--deck-name", show_default=True,
               default="Kobo words deck"
@@ -54,8 +74,80 @@ a number from 0000 to 9999.
     help="Path to a file with a list words(base form) you want to exclude. One word per line."
          + "Can be useful if cleaning anki sqlite DB after every import is not desired."
 )
+@click.option(
+    "--workers", default=1, show_default=True, type=click.IntRange(min=1),
+    help="Number of words looked up in dictionary(and enriched with images) at the same time."
+)
+@click.option(
+    "--snapshot/--no-snapshot", default=False, show_default=True,
+    help="Copy Kobo DB to a local temporary file before reading it. "
+         + "Faster on slow e-reader mounts and doesn't lock the device DB."
+)
+@click.option(
+    "--incremental/--no-incremental", default=False, show_default=True,
+    help="Read only words saved on the device since the last successful run."
+)
+@click.option(
+    "--force/--no-force", default=False, show_default=True,
+    help="Convert words even if nothing was saved on Kobo since the last successful run."
+)
+@click.option(
+    "--use-asyncio/--no-use-asyncio", default=False, show_default=True,
+    help="Look up all words at once on an asyncio event loop with aiohttp instead of worker threads."
+)
+@click.option(
+    "--max-requests-per-host", default=DEFAULT_HOST_CONCURRENCY, show_default=True, type=click.IntRange(min=1),
+    help="Maximum number of requests to the same dictionary or pronunciation host in flight, "
+         + "used with --use-asyncio."
+)
+@click.option(
+    "--negative-cache-ttl", default=DEFAULT_NEGATIVE_CACHE_TTL / DAY, show_default=True,
+    type=click.FloatRange(min=0),
+    help="Number of days words dictionary doesn't know are not looked up again. Zero disables it."
+)
+@click.option(
+    "--cache-backend", show_default=True,
+    type=click.Choice(list(CACHE_BACKENDS)), default=DEFAULT_CACHE_BACKEND,
+    help="Where to keep cached dictionary responses and media. 'sqlite' keeps everything in one DB, "
+         + "'fs' keeps every record in a separate file."
+)
+@click.option(
+    "--http-timeout", default=DEFAULT_TIMEOUT, show_default=True, type=click.FloatRange(min=0, min_open=True),
+    help="Seconds to wait for dictionary and pronunciation servers before giving up on a request."
+)
+@click.option(
+    "--http-retries", default=DEFAULT_RETRIES, show_default=True, type=click.IntRange(min=0),
+    help="Number of retries of throttled(429) or failed(5xx) requests, "
+         + "done with exponential backoff or after the time server asked to wait."
+)
+@click.option(
+    "--max-requests-per-second", default=DEFAULT_HOST_RATE, show_default=True, type=click.FloatRange(min=0),
+    help="Maximum rate of requests to a single host. Zero disables the limit."
+)
+@click.option(
+    "--secondary-dict-client", type=click.Choice(list(CLIENTS)),
+    help="Dictionary asked when --dict-client fails or doesn't answer within --hedge-delay. "
+         + "The first found definition is used."
+)
+@click.option(
+    "--hedge-delay", default=DEFAULT_HEDGE_DELAY, show_default=True, type=click.FloatRange(min=0),
+    help="Seconds to wait for --dict-client before asking --secondary-dict-client too."
+)
+@click.option(
+    "--offline-dict-path", type=click.Path(exists=True, file_okay=False),
+    help="Offline dictionary built with 'kobo2anki offline-dict build', used with '--dict-client offline'."
+)
+@click.option(
+    "--cache-codec", multiple=True, metavar="ENTITY=CODEC",
+    help="Compression of cache entity records, one of: " + ", ".join(CODECS)
+         + ". Dictionary responses are compressed with zlib by default, media is stored as is. "
+         + "Can be repeated."
+)
 def cli(kobo_path, output_deck_path, dict_client,
-        deck_name, debug, limit, exclude_words_path
+        deck_name, debug, limit, exclude_words_path, workers, snapshot, incremental, force,
+        use_asyncio, max_requests_per_host, negative_cache_ttl, cache_backend, cache_codec,
+        http_timeout, http_retries, max_requests_per_second, offline_dict_path,
+        secondary_dict_client, hedge_delay
 ):  # pylint: disable=too-many-arguments, too-many-locals
     """
     Main enter function for command line interface
@@ -65,36 +157,57 @@ def cli(kobo_path, output_deck_path, dict_client,
     else:
         logging.basicConfig(level=logging.INFO)
 
-    # Select correct dict client class
-    try:
-        dict_client_class = CLIENTS[dict]
-    except KeyError:
-        logger.error(
-            "Unsupported dictionary %s, supported dictionaries: %s",
-            dict,
-            list(CLIENTS.keys())
-        )
-        sys.exit(1)
-    logger.debug("Using dict client: %s", type(dict_client_class))
-
-    # initialize dict client class
-    # TODO: Rework
-    if dict_client_class == CLIENTS["oxforddict"]:
-        dict_app_id = os.environ.get("DICT_APP_ID")
-        dict_key = os.environ.get("DICT_KEY")
-        if dict_app_id and dict_key:
-            dict_client = dict_client_class.OxfordDictionaryClient(dict_app_id, dict_key)
-        else:
-            logger.error(
-                "Can't use 'oxforddict', env variables 'DICT_APP_ID' or 'DICT_KEY' are not defined",
+    codecs = dict(DEFAULT_ENTITY_CODECS)
+    for value in cache_codec:
+        entity, _, codec_name = value.partition("=")
+        if codec_name not in CODECS:
+            raise click.BadParameter(
+                f"expected ENTITY=CODEC with one of {list(CODECS)}, got '{value}'",
+                param_hint="--cache-codec"
             )
-    else:
-        dict_client = dict_client_class()
+        codecs[entity] = codec_name
+    configure_cache(cache_backend, codecs=codecs)
+
+    state_store = ExtractionStateStore(get_cache_handler())
+    kobo = kobo_reader.KoboReader(
+        kobo_path, snapshot=snapshot, state_store=state_store if incremental else None,
+    )
+    logger.debug("Initialized Kobo reader with kobo DB path: %s", kobo_path)
+    click.get_current_context().call_on_close(kobo.close)
+    fingerprint = kobo.get_fingerprint()
+    if not force and state_store.load_fingerprint(kobo.device_id) == fingerprint:
+        logger.info("Nothing was saved on Kobo since the last successful run, use --force to convert words anyway")
+        return
+
+    # imported only when there are words to convert, they take a while to load
+    from kobo2anki.anki import anki  # pylint: disable=import-outside-toplevel
+    from kobo2anki.image_searcher import ImageSearcher  # pylint: disable=import-outside-toplevel
+    from kobo2anki.language_processor import LanguageProcessor  # pylint: disable=import-outside-toplevel
+
+    # keep enough keep-alive connections for all requests to a host in flight
+    configure_session(
+        timeout=http_timeout,
+        pool_maxsize=max(DEFAULT_POOL_MAXSIZE, workers),
+        retries=http_retries,
+        host_rate=max_requests_per_second,
+    )
+
+    dict_client = _init_dict_client(
+        dict_client, negative_cache_ttl * DAY, workers, offline_dict_path
+    )
+    if dict_client and secondary_dict_client:
+        secondary = _init_dict_client(
+            secondary_dict_client, negative_cache_ttl * DAY, workers, offline_dict_path
+        )
+        dict_client = HedgedDictClient(
+            dict_client, secondary, hedge_delay=hedge_delay, lookup_workers=workers
+        ) if secondary else None
     if not dict_client:
         logger.error(
             "Can't initialize dictionary client"
         )
         sys.exit(1)
+    logger.debug("Using dict client: %s", dict_client)
 
     # Initialize image searcher
     gis_api_key = os.environ.get("GIS_API_KEY")
@@ -108,16 +221,13 @@ def cli(kobo_path, output_deck_path, dict_client,
         )
         image_searcher = None
 
-    kobo = kobo_reader.KoboReader(kobo_path)
-    logger.debug("Initialized Kobo reader with kobo DB path: %s", kobo_path)
-
-    language_processor = LanguageProcessor()
+    language_processor = LanguageProcessor(get_cache_handler())
     logger.info("Initialized language processor")
 
     anki_deck_class = anki.AnkiDeck
 
     if exclude_words_path:
-        if not os.file.exists(exclude_words_path):
+        if not os.path.exists(exclude_words_path):
             logger.error(f"Exclude words file {exclude_words_path} not found.")
             sys.exit(1)
         with open(exclude_words_path, 'r', encoding="utf-8") as fh:
@@ -125,43 +235,193 @@ def cli(kobo_path, output_deck_path, dict_client,
     else:
         exclude_words = []
 
-    added_words = main(
-        dict_client,
-        kobo,
-        anki_deck_class,
-        language_processor,
-        output_deck_path,
-        limit,
-        image_searcher,
-        words_to_exclude=set(exclude_words)
-    )
+    try:
+        if use_asyncio:
+            from kobo2anki.aio_session import configure_async_session  # pylint: disable=import-outside-toplevel
+            configure_async_session(
+                timeout=http_timeout,
+                max_requests_per_host=max_requests_per_host,
+                retries=http_retries,
+                host_rate=max_requests_per_second,
+            )
+            asyncio.run(
+                async_main(
+                    dict_client,
+                    kobo,
+                    anki_deck_class,
+                    language_processor,
+                    output_deck_path,
+                    limit,
+                    image_searcher,
+                    words_to_exclude=set(exclude_words),
+                    workers=workers,
+                )
+            )
+        else:
+            main(
+                dict_client,
+                kobo,
+                anki_deck_class,
+                language_processor,
+                output_deck_path,
+                limit,
+                image_searcher,
+                words_to_exclude=set(exclude_words),
+                workers=workers,
+            )
+    except NoDefinitionsFound as exc:
+        # the words are still processed, unknown ones are negative-cached and would fail again
+        logger.warning("%s", exc)
+    kobo.commit_state()
+    if kobo.words_to_retry:
+        # next run shouldn't be skipped even if nothing new is saved on Kobo
+        logger.warning("Couldn't look up %d words, will try them again next run", len(kobo.words_to_retry))
+    else:
+        state_store.save_fingerprint(kobo.device_id, fingerprint)
+    logger.info("Cache usage: %s", get_cache_handler().stats)
+    # keep cache within its quotas without running 'kobo2anki cache gc' by hand
+    gc_result = get_cache_handler().backend.gc()
+    if gc_result.removed_entries:
+        logger.info(
+            "Removed %d expired or over quota cache records, freed %.1f MB",
+            gc_result.removed_entries, gc_result.freed_bytes / MB
+        )
 
 
 def main(
         dict_client: DictClient,
         kobo_db: KoboDBReaderProtocol,
-        anki_deck_class: Type[anki.AnkiDeck],
-        language_processor: LanguageProcessor,
+        anki_deck_class: Type["anki.AnkiDeck"],
+        language_processor: "LanguageProcessor",
         output_deck_path: str,
         words_per_deck_limit: int,
-        image_searcher: Optional[ImageSearcher],
-        words_to_exclude: Optional[Set[str]]
+        image_searcher: Optional["ImageSearcher"],
+        words_to_exclude: Optional[Set[str]],
+        workers: int = 1,
 ) -> List[model.WordDefinition]:
     """
+    Read words from Kobo, get their definitions and save them as anki decks.
+    All words are passed to the dict client at once, images are searched for
+    up to `workers` words at the same time. Order of words in decks
+    is the same as with a serial run.
+    """
+    base_words = _get_words_to_process(
+        kobo_db, language_processor, words_to_exclude, words_per_deck_limit
+    )
+
+    if not base_words:
+        logger.info("No new words to process")
+        return []
 
+    lookup_results = dict_client.get_definitions(base_words)
+    words_definitions = _collect_definitions(base_words, lookup_results, dict_client)
+    kobo_db.retry_later(_get_words_to_retry(lookup_results))
+
+    _add_images(words_definitions, image_searcher, workers)
+    _save_decks(words_definitions, anki_deck_class, output_deck_path, words_per_deck_limit)
+    return words_definitions
+
+
+async def async_main(
+        dict_client: DictClient,
+        kobo_db: KoboDBReaderProtocol,
+        anki_deck_class: Type["anki.AnkiDeck"],
+        language_processor: "LanguageProcessor",
+        output_deck_path: str,
+        words_per_deck_limit: int,
+        image_searcher: Optional["ImageSearcher"],
+        words_to_exclude: Optional[Set[str]],
+        workers: int = 1,
+) -> List[model.WordDefinition]:
+    """
+    Same as main, but dict clients implementing AsyncDictClient look up all words at once
+    on the running event loop, how many requests are in flight is limited by the async HTTP session.
+    Other dict clients and image search are blocking, they run in worker threads.
     """
+    # imported here, so aiohttp isn't loaded when asyncio isn't used
+    from kobo2anki.aio_session import close_async_session  # pylint: disable=import-outside-toplevel
 
-    words_definitions: List[model.WordDefinition] = []
-    words_from_kobo = kobo_db.get_saved_words()
+    base_words = _get_words_to_process(
+        kobo_db, language_processor, words_to_exclude, words_per_deck_limit
+    )
+
+    if not base_words:
+        logger.info("No new words to process")
+        return []
+
+    try:
+        if isinstance(dict_client, AsyncDictClient):
+            lookup_results = await dict_client.aget_definitions(base_words)
+        else:
+            lookup_results = await asyncio.to_thread(dict_client.get_definitions, base_words)
+    finally:
+        await close_async_session()
+    words_definitions = _collect_definitions(base_words, lookup_results, dict_client)
+    kobo_db.retry_later(_get_words_to_retry(lookup_results))
+
+    await asyncio.to_thread(_add_images, words_definitions, image_searcher, workers)
+    _save_decks(words_definitions, anki_deck_class, output_deck_path, words_per_deck_limit)
+    return words_definitions
+
+
+def _init_dict_client(
+        dict_client_name: str,
+        negative_cache_ttl: float,
+        workers: int,
+        offline_dict_path: Optional[str],
+) -> Optional[DictClient]:
+    """
+    Returns dictionary client by its name in CLIENTS, None if it can't be used.
+    """
+    try:
+        dict_client_class = CLIENTS[dict_client_name]
+    except KeyError:
+        logger.error(
+            "Unsupported dictionary %s, supported dictionaries: %s",
+            dict_client_name,
+            list(CLIENTS.keys())
+        )
+        return None
 
-    # dedup words
-    words_from_kobo = list(
-        set(
-            map(lambda x: x.lower(), words_from_kobo)
+    if dict_client_name == "oxforddict":
+        dict_app_id = os.environ.get("DICT_APP_ID")
+        dict_key = os.environ.get("DICT_KEY")
+        if dict_app_id and dict_key:
+            return dict_client_class.OxfordDictionaryClient(
+                dict_app_id, dict_key,
+                negative_cache_ttl=negative_cache_ttl, lookup_workers=workers,
+            )
+        logger.error(
+            "Can't use 'oxforddict', env variables 'DICT_APP_ID' or 'DICT_KEY' are not defined",
         )
+        return None
+    if dict_client_name == "wordnet":
+        return dict_client_class.WordNetClient()
+    if dict_client_name == "offline":
+        if offline_dict_path:
+            return dict_client_class.OfflineDictionaryClient(offline_dict_path)
+        logger.error("Can't use 'offline', --offline-dict-path is not set")
+        return None
+    return dict_client_class.FreeDictionaryClient(
+        negative_cache_ttl=negative_cache_ttl,
+        lookup_workers=workers,
     )
-    logger.info("Read %d words from kobo", len(words_from_kobo))
-    # exclude already processed words
+
+
+def _get_words_to_process(
+        kobo_db: KoboDBReaderProtocol,
+        language_processor: "LanguageProcessor",
+        words_to_exclude: Optional[Set[str]],
+        words_per_deck_limit: int,
+) -> List[str]:
+    """
+    Read words from Kobo, normalize them to unique base forms and drop excluded words.
+    Words are returned in random order.
+    """
+    # repeated words are dropped while they are read from Kobo, so only unique words are kept in memory,
+    # then all of them are lemmatized at once, so cached lemmas are read with one get_many call
+    words_from_kobo = _normalize_words(kobo_db.iter_saved_words(), language_processor)
+    # exclude already processed words, exclusion list has base forms too
     if words_to_exclude:
         words_from_kobo = list(filter(lambda x: x not in words_to_exclude, words_from_kobo))
         logger.info("After exclusion have %d words from kobo to process", len(words_from_kobo))
@@ -178,47 +438,30 @@ def main(
         )
     else:
         logger.debug("Words limit was not set, will put all words in one deck")
+    return words_from_kobo
 
-    # TODO: restructure to make it simpler
-    for word_from_kobo in words_from_kobo:
-        word_definition = None
-        word_from_kobo = language_processor.lemmatize_word(word_from_kobo)
-        try:
-            logger.debug(
-                "Getting definition for word %s, using %s",
-                word_from_kobo, dict_client
-            )
-            word_definition = dict_client.get_definition(word_from_kobo)
-
-            if image_searcher:
-                for explanation in word_definition.explanations:
-                    if explanation.part == model.Parts.NOUN:
-                        logger.info(
-                            "Word %s has Noun part, will get image",
-                            word_definition.word,
-                        )
-                        word_definition.image = image_searcher.get_image_for_word(
-                            word_definition.word
-                        )
-                        break
-            else:
-                logger.debug("Will not try to get image for word %s", word_definition.word)
-
-            words_definitions.append(word_definition)
-            logger.info("Found definition for word %s using client %s", word_from_kobo, dict_client)
-        except dict_errors.WordTranslationNotFound:
-            logger.warning(
-                "Didn't find definition for word %s, will skip the word", word_from_kobo
-            )
-        except dict_errors.CantParseDictData as exc:
-            logger.warning("Can't parse word %s. Error %s", word_from_kobo, exc)
 
-        except dict_errors.NotAbleToGetWordTranlsation as exc:
-            logger.warning("Can't get word %s. Err: %s", word_from_kobo, exc)
+def _normalize_words(words: Iterable[str], language_processor: "LanguageProcessor") -> List[str]:
+    """
+    Lowercase and lemmatize all words, then dedup base forms keeping first seen order,
+    so different forms of the same word are looked up and put in a deck once.
+    """
+    surface_words = list(dict.fromkeys(word.lower() for word in words))
+    logger.info("Read %d unique words from kobo", len(surface_words))
+    base_words = list(dict.fromkeys(language_processor.lemmatize_many(surface_words)))
+    logger.info(
+        "Normalized %d unique words to %d base forms, %d lookups removed",
+        len(surface_words), len(base_words), len(surface_words) - len(base_words)
+    )
+    return base_words
 
-        if word_definition is None:
-            logger.error("Didn't find word definition for word %s", word_from_kobo)
 
+def _save_decks(
+        words_definitions: List[model.WordDefinition],
+        anki_deck_class: Type["anki.AnkiDeck"],
+        output_deck_path: str,
+        words_per_deck_limit: int,
+):
     if words_definitions:
         words_definitions_batches = []  # type: Iterable
         if words_per_deck_limit and len(words_definitions) > words_per_deck_limit:
@@ -237,9 +480,188 @@ def main(
                 output_deck_path
             )
     else:
-        raise RuntimeError("No words definitions found, skip generation of anki deck")
+        raise NoDefinitionsFound("No words definitions found, skip generation of anki deck")
+
+
+# TODO: restructure to make it simpler
+def _collect_definitions(
+        base_words: List[str],
+        lookup_results: Dict[str, Union[model.WordDefinition, Exception]],
+        dict_client: DictClient,
+) -> List[model.WordDefinition]:
+    """
+    Returns found definitions in the original order of words, so decks are the same
+    whichever way words were looked up.
+    """
+    words_definitions: List[model.WordDefinition] = []
+    for base_word in base_words:
+        lookup_result = lookup_results[base_word]
+        if isinstance(lookup_result, Exception):
+            _log_lookup_error(base_word, lookup_result)
+            continue
+        logger.info("Found definition for word %s using client %s", base_word, dict_client)
+        words_definitions.append(lookup_result)
     return words_definitions
 
 
+def _get_words_to_retry(lookup_results: Dict[str, Union[model.WordDefinition, Exception]]) -> List[str]:
+    """
+    Returns words which lookups failed because dictionary couldn't be reached.
+    Words dictionary doesn't know or whose data can't be parsed would fail again, they aren't retried.
+    """
+    return [
+        word for word, lookup_result in lookup_results.items()
+        if isinstance(lookup_result, dict_errors.NotAbleToGetWordTranlsation)
+    ]
+
+
+def _add_images(
+        words_definitions: List[model.WordDefinition],
+        image_searcher: Optional["ImageSearcher"],
+        workers: int,
+):
+    logger.debug("Will search images using %d workers", workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(
+            lambda word_definition: _add_image(word_definition, image_searcher),
+            words_definitions
+        ))
+
+
+def _add_image(
+        word_definition: model.WordDefinition,
+        image_searcher: Optional["ImageSearcher"],
+):
+    if image_searcher:
+        for explanation in word_definition.explanations:
+            if explanation.part == model.Parts.NOUN:
+                logger.info(
+                    "Word %s has Noun part, will get image",
+                    word_definition.word,
+                )
+                word_definition.image = image_searcher.get_image_for_word(
+                    word_definition.word
+                )
+                break
+    else:
+        logger.debug("Will not try to get image for word %s", word_definition.word)
+
+
+def _log_lookup_error(word: str, exc: Exception):
+    if isinstance(exc, dict_errors.WordTranslationNotFound):
+        logger.warning(
+            "Didn't find definition for word %s, will skip the word", word
+        )
+    elif isinstance(exc, dict_errors.CantParseDictData):
+        logger.warning("Can't parse word %s. Error %s", word, exc)
+    elif isinstance(exc, dict_errors.NotAbleToGetWordTranlsation):
+        logger.warning("Can't get word %s. Err: %s", word, exc)
+    logger.error("Didn't find word definition for word %s", word)
+
+
+def _parse_entity_values(values: Tuple[str, ...], option_name: str) -> Dict[str, float]:
+    result = {}  # type: Dict[str, float]
+    for value in values:
+        entity, _, number = value.partition("=")
+        try:
+            result[entity] = float(number)
+        except ValueError as exc:
+            raise click.BadParameter(f"expected ENTITY=NUMBER, got '{value}'", param_hint=option_name) from exc
+    return result
+
+
+@click.group(help="Manage kobo2anki cache.")
+@click.option(
+    "--cache-backend", show_default=True,
+    type=click.Choice(list(CACHE_BACKENDS)), default=DEFAULT_CACHE_BACKEND,
+)
+@click.option(
+    "--max-size", multiple=True, metavar="ENTITY=MB",
+    help="Size quota for a cache entity in megabytes, overrides the default one. Can be repeated."
+)
+@click.option(
+    "--max-age", multiple=True, metavar="ENTITY=DAYS",
+    help="Maximum age of cache entity records in days, overrides the default one. Can be repeated."
+)
+@click.pass_context
+def cache(ctx, cache_backend, max_size, max_age):
+    entity_limits = {
+        entity: dataclasses.replace(limits) for entity, limits in DEFAULT_ENTITY_LIMITS.items()
+    }
+    for entity, size in _parse_entity_values(max_size, "--max-size").items():
+        entity_limits.setdefault(entity, EntityLimits()).max_bytes = int(size * MB)
+    for entity, days in _parse_entity_values(max_age, "--max-age").items():
+        entity_limits.setdefault(entity, EntityLimits()).max_age = days * DAY
+    ctx.obj = CACHE_BACKENDS[cache_backend](entity_limits=entity_limits)
+
+
+@cache.command(name="gc", help="Remove expired records and records of entities over their quota.")
+@click.pass_obj
+def cache_gc(cache_handler):
+    result = cache_handler.gc()
+    click.echo(
+        f"Removed {result.removed_entries} records, freed {result.freed_bytes / MB:.1f} MB"
+    )
+
+
+@cache.command(name="stats", help="Show number of records and size of every cache entity.")
+@click.pass_obj
+def cache_stats(cache_handler):
+    for entity, usage in cache_handler.usage().items():
+        click.echo(f"{entity}: {usage.entries} records, {usage.bytes / MB:.1f} MB")
+
+
+@click.group(name="offline-dict", help="Manage offline dictionaries used with '--dict-client offline'.")
+def offline_dict():
+    pass
+
+
+@offline_dict.command(name="build", help="Build offline dictionary in OUTPUT_PATH from cached dictionary responses.")
+@click.argument("output_path", type=click.Path(file_okay=False))
+@click.option(
+    "--cache-backend", show_default=True,
+    type=click.Choice(list(CACHE_BACKENDS)), default=DEFAULT_CACHE_BACKEND,
+)
+@click.option(
+    "--source", "sources", multiple=True, show_default=True,
+    # same as importer DEFAULT_SOURCES, importer loads dictionary clients, so it is imported by the command
+    default=("oxforddict", "freedict"),
+    help="Dictionaries which cached responses are imported, 'oxforddict' or 'freedict'. "
+         + "If several have the same word, the one given first wins. Can be repeated."
+)
+def offline_dict_build(output_path, cache_backend, sources):
+    from kobo2anki.dicts.offline import importer as offline_importer  # pylint: disable=import-outside-toplevel
+    for source in sources:
+        if source not in offline_importer.SOURCES:
+            raise click.BadParameter(
+                f"expected one of {list(offline_importer.SOURCES)}, got '{source}'", param_hint="--source"
+            )
+    result = offline_importer.import_from_cache(
+        CACHE_BACKENDS[cache_backend](), output_path, sources
+    )
+    click.echo(
+        f"Imported {result.imported} words, skipped {result.duplicates} duplicates "
+        + f"and {result.failed} unparsable responses"
+    )
+
+
+# commands which can be used instead of converting Kobo words, e.g. 'kobo2anki cache gc'
+COMMANDS = {
+    "cache": cache,
+    "offline-dict": offline_dict,
+}
+
+
+def run():
+    """
+    Entry point for 'kobo2anki' script
+    """
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        command_name = sys.argv[1]
+        COMMANDS[command_name](sys.argv[2:], prog_name=f"kobo2anki {command_name}")
+    else:
+        cli()  # pylint: disable=no-value-for-parameter
+
+
 if __name__ == '__main__':
-    cli()  # pylint: disable=no-value-for-parameter
+    run()
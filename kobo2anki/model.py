@@ -1,9 +1,12 @@
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 from enum import Enum
 from dataclasses import dataclass
 
 from kobo2anki.pronunciation import WordPronunciation
-from kobo2anki.image_searcher import WordImage
+
+if TYPE_CHECKING:
+    # image searcher pulls in Google API client, it isn't needed to describe words
+    from kobo2anki.image_searcher import WordImage
 
 
 class Parts(Enum):
@@ -35,4 +38,4 @@ class WordDefinition:
     transcription: str
     explanations: List[PartExplanations]
     pronunciation: Optional[WordPronunciation] = None
-    image: Optional[WordImage] = None
+    image: Optional["WordImage"] = None
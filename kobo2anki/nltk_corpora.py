@@ -0,0 +1,17 @@
+import logging
+
+import nltk
+
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_wordnet():
+    """
+    Downloads WordNet data unless it is already installed.
+    """
+    try:
+        nltk.data.find("corpora/wordnet")
+    except LookupError:
+        logger.info("WordNet data not found, will download it")
+        nltk.download("wordnet")
@@ -4,7 +4,8 @@ import requests
 from urllib.parse import urlparse
 
 from kobo2anki import errors
-from kobo2anki.caching import LocalFSCaching
+from kobo2anki.caching import get_cache_handler
+from kobo2anki.http_session import get_session
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +16,11 @@ class WordPronunciation:
 
     def __init__(self, url: str):
         self._url = url
-        self._cache_handler = LocalFSCaching()
+        self._cache_handler = get_cache_handler()
+        self._session = get_session()
+
+    def get_url(self) -> str:
+        return self._url
 
     def get_filename(self) -> str:
         filename = urlparse(self._url).path.split('/')[-1]
@@ -25,7 +30,12 @@ class WordPronunciation:
         logger.debug(
             "Going to download audio data from url %s", self._url
         )
-        response = requests.get(self._url)
+        try:
+            response = self._session.get(self._url)
+        except requests.RequestException as exc:
+            raise errors.GettingPronunciationError(
+                f"Can't download {self._url}. Err: {exc}"
+            ) from exc
         if 200 <= response.status_code < 300:
             audio_data = response.content
             if len(audio_data) > 0:
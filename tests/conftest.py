@@ -1,12 +1,23 @@
+import time
 import pytest
-from typing import Optional
+import threading
+from typing import Dict, List, Optional, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pytest_mock import MockerFixture
 
 from kobo2anki.caching import LocalFSCaching
+from kobo2anki.circuit_breaker import reset_circuit_breakers
 from kobo2anki import model
 from kobo2anki.model import WordDefinition
 
 
+@pytest.fixture(autouse=True)
+def circuit_breakers():
+    # circuit breakers are shared by the whole process, don't let tests affect each other
+    yield
+    reset_circuit_breakers()
+
+
 @pytest.fixture
 def cache_handler_factory(mocker: MockerFixture):
 
@@ -50,4 +61,34 @@ def word_definition_factory():
         )
         return word_definition
 
-    return _factory
\ No newline at end of file
+    return _factory
+
+
+@pytest.fixture
+def flaky_server():
+    """
+    Local HTTP server which answers with queued status codes, then with 200.
+    """
+    statuses = []  # type: List[Tuple[int, Dict[str, str]]]
+    requests_count = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            requests_count.append(time.monotonic())
+            status, headers = statuses.pop(0) if statuses else (200, {})
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/word", statuses, requests_count
+    server.shutdown()
+    server.server_close()
@@ -1,7 +1,11 @@
+import json
+import asyncio
 import pytest
 import requests
-from unittest.mock import MagicMock
-from kobo2anki.dicts.freedict import client
+from unittest.mock import AsyncMock, MagicMock
+from kobo2anki.dicts import errors
+from kobo2anki.aio_session import AsyncResponse
+from kobo2anki.dicts.freedict import client, pronunciation_guesser
 from kobo2anki.model import Parts, Definition, PartExplanations, WordDefinition
 
 
@@ -12,7 +16,16 @@ def mock_word_pronunciation(mocker):
 
 @pytest.fixture
 def mock_requests_get(mocker):
-    return mocker.patch("kobo2anki.dicts.freedict.client.requests.get")
+    return mocker.patch.object(client, "get_session").return_value.get
+
+
+@pytest.fixture(autouse=True)
+def cache_mock(mocker, cache_handler_factory):
+    # by default simulate that cache wasn't found
+    cache_mock = cache_handler_factory(get_cache_response=None)
+    mocker.patch.object(client, "get_cache_handler", cache_mock)
+    mocker.patch.object(pronunciation_guesser, "get_cache_handler", cache_mock)
+    return cache_mock
 
 
 class TestFreeDictinaryClient:
@@ -168,3 +181,159 @@ class TestFreeDictinaryClient:
         mock_word_pronunciation.assert_called_once_with(
             'https://lex-audio.useremarkable.com/mp3/coax_gb_1.mp3'
         )
+
+    def test_get_definitions(self, mocker, mock_requests_get, mock_word_pronunciation, cache_mock):
+        mock_data = [
+            {
+                "word": "example",
+                "phonetics": [{"audio": "https://lex-audio.useremarkable.com/mp3/example_us_1.mp3"}],
+                "meanings": [
+                    {"partOfSpeech": "noun", "definitions": [{"definition": "A representative form."}]}
+                ]
+            }
+        ]
+        cached_data = [dict(mock_data[0], word="cached")]
+        # only cached word is found in cache
+        cache_mock.return_value.get_many.side_effect = lambda entity, keys: {
+            key: json.dumps(cached_data).encode() for key in keys if key == "word_cached.json"
+        }
+
+        def get(url):
+            mock_response = MagicMock(spec=requests.Response)
+            if url.endswith("/example"):
+                mock_response.status_code = 200
+                mock_response.json.return_value = mock_data
+            else:
+                mock_response.status_code = 404
+            return mock_response
+
+        mock_requests_get.side_effect = get
+
+        results = client.FreeDictionaryClient(lookup_workers=4).get_definitions(
+            ["cached", "example", "unknownword", "example"]
+        )
+
+        assert list(results) == ["cached", "example", "unknownword"]
+        assert results["cached"].word == "cached"
+        assert results["example"].word == "example"
+        assert isinstance(results["unknownword"], errors.WordTranslationNotFound)
+        # cache is read for all words at once, only misses are looked up in dictionary
+        assert mocker.call(
+            client.DICT_NAME, ["word_cached.json", "word_example.json", "word_unknownword.json"]
+        ) in cache_mock.return_value.get_many.call_args_list
+        assert sorted(call.args[0] for call in mock_requests_get.call_args_list) == [
+            client.BASE_URL + "example", client.BASE_URL + "unknownword"
+        ]
+
+    def test_aget_definitions(self, mocker, mock_word_pronunciation, cache_mock):
+        mock_data = [
+            {
+                "word": "example",
+                "phonetics": [{"audio": "https://lex-audio.useremarkable.com/mp3/example_us_1.mp3"}],
+                "meanings": [
+                    {"partOfSpeech": "noun", "definitions": [{"definition": "A representative form."}]}
+                ]
+            }
+        ]
+        cache_mock.return_value.get_many.return_value = {}
+
+        async def get(url):
+            if url.endswith("/example"):
+                return AsyncResponse(200, json.dumps(mock_data).encode(), {})
+            if url.endswith("/throttled"):
+                return AsyncResponse(429, b"", {})
+            return AsyncResponse(404, b"", {})
+
+        get_mock = mocker.patch.object(client, "get_async_session").return_value.get = AsyncMock(side_effect=get)
+
+        results = asyncio.run(
+            client.FreeDictionaryClient().aget_definitions(["example", "unknownword", "throttled", "example"])
+        )
+
+        assert list(results) == ["example", "unknownword", "throttled"]
+        assert results["example"].word == "example"
+        assert isinstance(results["unknownword"], errors.WordTranslationNotFound)
+        assert isinstance(results["throttled"], errors.NotAbleToGetWordTranlsation)
+        assert get_mock.await_count == 3
+        assert mocker.call(
+            client.DICT_NAME, "word_example.json", json.dumps(mock_data).encode()
+        ) in cache_mock.return_value.save_data_to_cache.call_args_list
+
+    def test_get_definition_saves_cache(self, mocker, mock_requests_get, mock_word_pronunciation, cache_mock):
+        mock_data = [
+            {
+                "word": "example",
+                "phonetics": [{"audio": "https://lex-audio.useremarkable.com/mp3/example_us_1.mp3"}],
+                "meanings": [
+                    {"partOfSpeech": "noun", "definitions": [{"definition": "A representative form."}]}
+                ]
+            }
+        ]
+        mock_response = MagicMock(spec=requests.Response)
+        mock_response.status_code = 200
+        mock_response.json.return_value = mock_data
+        mock_requests_get.return_value = mock_response
+
+        client.FreeDictionaryClient().get_definition(self.test_word)
+
+        # first we look for cached response, then check dictionary didn't know the word before
+        assert cache_mock.return_value.get_cached_data.call_args_list == [
+            mocker.call(client.DICT_NAME, f"word_{self.test_word}.json"),
+            mocker.call(f"{client.DICT_NAME}_misses", self.test_word),
+        ]
+        assert cache_mock.return_value.save_data_to_cache.call_args_list == [
+            mocker.call(
+                client.DICT_NAME,
+                f"word_{self.test_word}.json",
+                json.dumps(mock_data).encode()
+            )
+        ]
+
+    def test_get_definition_cache_found(self, mocker, cache_handler_factory, mock_requests_get, mock_word_pronunciation):
+        mock_data = [
+            {
+                "word": "example",
+                "phonetics": [{"audio": "https://lex-audio.useremarkable.com/mp3/example_us_1.mp3"}],
+                "meanings": [
+                    {"partOfSpeech": "noun", "definitions": [{"definition": "A representative form."}]}
+                ]
+            }
+        ]
+        cache_mock = cache_handler_factory(get_cache_response=json.dumps(mock_data).encode())
+        mocker.patch.object(client, "get_cache_handler", cache_mock)
+
+        result = client.FreeDictionaryClient().get_definition(self.test_word)
+
+        assert result.explanations == [
+            PartExplanations(
+                part=Parts.NOUN,
+                definitions=[
+                    Definition(definitions=["A representative form."], synonyms=[], examples=[])
+                ]
+            )
+        ]
+        # we found value in the cache, so neither dictionary was called nor cache updated
+        assert mock_requests_get.call_count == 0
+        assert cache_mock.return_value.save_data_to_cache.call_count == 0
+
+    def test_get_definition_not_found_remembered(self, mocker, mock_requests_get, cache_mock):
+        mock_response = MagicMock(spec=requests.Response)
+        mock_response.status_code = 404
+        mock_requests_get.return_value = mock_response
+
+        with pytest.raises(errors.WordTranslationNotFound):
+            client.FreeDictionaryClient().get_definition(self.test_word)
+
+        assert cache_mock.return_value.save_data_to_cache.call_args_list == [
+            mocker.call(f"{client.DICT_NAME}_misses", self.test_word, mocker.ANY)
+        ]
+
+    def test_get_definition_known_miss(self, mocker, mock_requests_get):
+        negative_cache_mock = mocker.patch.object(client, "NegativeResultCache")
+        negative_cache_mock.return_value.is_known_miss.return_value = True
+
+        with pytest.raises(errors.WordTranslationNotFound):
+            client.FreeDictionaryClient().get_definition(self.test_word)
+
+        # we know dictionary doesn't have the word, so we don't ask it
+        assert mock_requests_get.call_count == 0
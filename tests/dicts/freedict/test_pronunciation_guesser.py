@@ -0,0 +1,212 @@
+import json
+import asyncio
+import time
+import pytest
+import requests
+from unittest.mock import AsyncMock, MagicMock
+
+from kobo2anki.aio_session import AsyncResponse
+from kobo2anki.dicts.freedict import pronunciation_guesser
+
+
+@pytest.fixture
+def cache_mock(mocker, cache_handler_factory):
+    cache_mock = cache_handler_factory(get_cache_response=None)
+    mocker.patch.object(pronunciation_guesser, "get_cache_handler", cache_mock)
+    return cache_mock
+
+
+@pytest.fixture
+def head_mock(mocker):
+    return mocker.patch.object(pronunciation_guesser, "get_session").return_value.head
+
+
+def _response(status_code: int) -> MagicMock:
+    response = MagicMock(spec=requests.Response)
+    response.status_code = status_code
+    return response
+
+
+class TestPronunciationURLGuesser:
+
+    test_word = "example"
+
+    def test_get_url_first_success_wins(self, mocker, cache_mock, head_mock):
+        existing_url = "https://audio.oxforddictionaries.com/en/mp3/example-uk.mp3"
+
+        def head(url):
+            if url == existing_url:
+                return _response(200)
+            # other servers answer slowly
+            time.sleep(0.2)
+            return _response(404)
+
+        head_mock.side_effect = head
+        guesser = pronunciation_guesser.PronunciationURLGuesser(probe_workers=8)
+
+        started_at = time.monotonic()
+        assert guesser.get_url(self.test_word) == existing_url
+        # the best template is tried alone, after that didn't wait for other probes to finish
+        assert time.monotonic() - started_at < 0.4
+        assert cache_mock.return_value.save_data_to_cache.call_args_list == [
+            mocker.call(guesser.cache_entity, self.test_word, existing_url.encode())
+        ]
+
+    def test_get_url_cached(self, cache_mock, head_mock):
+        cached_url = "https://audio.oxforddictionaries.com/en/mp3/example.mp3"
+        cache_mock.return_value.get_cached_data.return_value = cached_url.encode()
+
+        guesser = pronunciation_guesser.PronunciationURLGuesser()
+        assert guesser.get_url(self.test_word) == cached_url
+        assert head_mock.call_count == 0
+
+    def test_get_url_not_found_recorded(self, mocker, cache_mock, head_mock):
+        head_mock.return_value = _response(404)
+        # nothing is known about templates yet
+        cache_mock.return_value.get_many.return_value = {}
+
+        guesser = pronunciation_guesser.PronunciationURLGuesser()
+        assert guesser.get_url(self.test_word) is None
+        assert head_mock.call_count == 7
+        assert cache_mock.return_value.save_data_to_cache.call_args_list == [
+            mocker.call(f"{guesser.cache_entity}_misses", self.test_word, mocker.ANY)
+        ]
+
+    def test_get_url_network_errors_not_recorded_as_miss(self, cache_mock, head_mock):
+        head_mock.side_effect = [_response(404)] * 6 + [requests.ConnectionError()]
+        cache_mock.return_value.get_many.return_value = {}
+
+        guesser = pronunciation_guesser.PronunciationURLGuesser()
+        assert guesser.get_url(self.test_word) is None
+        assert head_mock.call_count == 7
+        cache_mock.return_value.save_data_to_cache.assert_not_called()
+
+    @pytest.mark.parametrize("status_code", [429, 503])
+    def test_get_url_server_errors_not_recorded_as_miss(self, cache_mock, head_mock, status_code):
+        head_mock.return_value = _response(status_code)
+        cache_mock.return_value.get_many.return_value = {}
+
+        guesser = pronunciation_guesser.PronunciationURLGuesser()
+        assert guesser.get_url(self.test_word) is None
+        assert head_mock.call_count == 7
+        # neither the word nor template statistics are updated
+        cache_mock.return_value.save_data_to_cache.assert_not_called()
+        cache_mock.return_value.put_many.assert_not_called()
+
+    def test_get_url_after_network_errors(self, cache_mock, head_mock):
+        existing_url = "https://audio.oxforddictionaries.com/en/mp3/example__us_1.mp3"
+        head_mock.side_effect = requests.ConnectionError()
+        cache_mock.return_value.get_many.return_value = {}
+        guesser = pronunciation_guesser.PronunciationURLGuesser()
+        assert guesser.get_url(self.test_word) is None
+        cache_mock.return_value.save_data_to_cache.assert_not_called()
+
+        head_mock.side_effect = lambda url: _response(200 if url == existing_url else 404)
+        assert guesser.get_url(self.test_word) == existing_url
+
+    def test_get_url_known_miss(self, cache_mock, head_mock):
+        cache_mock.return_value.get_cached_data.side_effect = [None, str(time.time()).encode()]
+
+        guesser = pronunciation_guesser.PronunciationURLGuesser()
+        assert guesser.get_url(self.test_word) is None
+        assert head_mock.call_count == 0
+
+
+class TestAsyncPronunciationURLGuesser:
+
+    test_word = "example"
+
+    def test_aget_url_cancels_other_probes(self, mocker, cache_mock):
+        existing_url = "https://audio.oxforddictionaries.com/en/mp3/example-uk.mp3"
+        cache_mock.return_value.get_many.return_value = {}
+        guesser = pronunciation_guesser.PronunciationURLGuesser()
+        best_url = guesser._get_url_templates()[0].format(word=self.test_word)
+        cancelled = []
+
+        async def head(url):
+            if url == existing_url:
+                return AsyncResponse(200, b"", {})
+            if url == best_url:
+                # the best template is tried alone first
+                return AsyncResponse(404, b"", {})
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+            return AsyncResponse(404, b"", {})
+
+        mocker.patch.object(pronunciation_guesser, "get_async_session").return_value.head = AsyncMock(side_effect=head)
+
+        started_at = time.monotonic()
+        assert asyncio.run(guesser.aget_url(self.test_word)) == existing_url
+        assert time.monotonic() - started_at < 1
+        assert len(cancelled) == 5
+        assert cache_mock.return_value.save_data_to_cache.call_args_list == [
+            mocker.call(guesser.cache_entity, self.test_word, existing_url.encode())
+        ]
+
+    def test_aget_url_server_errors_not_recorded_as_miss(self, mocker, cache_mock):
+        cache_mock.return_value.get_many.return_value = {}
+        head_mock = mocker.patch.object(pronunciation_guesser, "get_async_session").return_value.head = AsyncMock(
+            return_value=AsyncResponse(503, b"", {})
+        )
+        guesser = pronunciation_guesser.PronunciationURLGuesser()
+
+        assert asyncio.run(guesser.aget_url(self.test_word)) is None
+        assert head_mock.await_count == 7
+        cache_mock.return_value.save_data_to_cache.assert_not_called()
+        cache_mock.return_value.put_many.assert_not_called()
+
+
+class TestAdaptiveTemplateOrdering:
+
+    test_word = "example"
+    base = "https://audio.oxforddictionaries.com/en/mp3/"
+
+    def _stats(self, **stats):
+        return {
+            self.base + template: json.dumps({"hits": hits, "misses": misses}).encode()
+            for template, (hits, misses) in stats.items()
+        }
+
+    def test_best_template_tried_alone(self, mocker, cache_mock, head_mock):
+        cache_mock.return_value.get_many.return_value = self._stats(
+            **{"{word}__us_1.mp3": (1, 30), "{word}-uk.mp3": (20, 2)}
+        )
+        head_mock.return_value = _response(200)
+
+        guesser = pronunciation_guesser.PronunciationURLGuesser()
+        assert guesser.get_url(self.test_word) == self.base + "example-uk.mp3"
+        assert head_mock.call_args_list == [mocker.call(self.base + "example-uk.mp3")]
+        # statistics is persisted
+        assert cache_mock.return_value.put_many.call_args_list == [
+            mocker.call(
+                guesser.stats_cache_entity,
+                {self.base + "{word}-uk.mp3": json.dumps({"hits": 21, "misses": 2}).encode()}
+            )
+        ]
+
+    def test_templates_ordered_by_hit_rate(self, cache_mock):
+        cache_mock.return_value.get_many.return_value = self._stats(
+            **{"{word}__us_1.mp3": (0, 10), "{word}-us.mp3": (6, 4), "{word}-uk.mp3": (9, 1)}
+        )
+
+        guesser = pronunciation_guesser.PronunciationURLGuesser()
+        urls = list(guesser._guess_urls(self.test_word))
+        assert urls[0] == self.base + "example-uk.mp3"
+        assert urls[1] == self.base + "example-us.mp3"
+        # templates without statistics keep their default order
+        assert urls[2] == self.base + "example__us_2.mp3"
+        assert urls[-1] == self.base + "example__us_1.mp3"
+
+    def test_never_succeeding_templates_pruned(self, cache_mock):
+        cache_mock.return_value.get_many.return_value = self._stats(
+            **{"{word}__us_1.mp3": (0, 3), "{word}__us_2.mp3": (1, 3)}
+        )
+
+        guesser = pronunciation_guesser.PronunciationURLGuesser(max_template_misses=3)
+        urls = list(guesser._guess_urls(self.test_word))
+        assert self.base + "example__us_1.mp3" not in urls
+        assert self.base + "example__us_2.mp3" in urls
+        assert len(urls) == 6
@@ -0,0 +1,72 @@
+import json
+import pytest
+import tempfile
+
+from kobo2anki import caching
+from kobo2anki.dicts import errors, DictClient
+from kobo2anki.dicts.offline import client, importer
+from kobo2anki.dicts.offline.storage import OfflineDictWriter
+from tests.dicts.oxforddictionaries import data as oxford_data
+
+
+FREEDICT_RESPONSE = [
+    {
+        "word": "example",
+        "phonetics": [{"audio": "https://lex-audio.useremarkable.com/mp3/example_us_1.mp3"}],
+        "meanings": [
+            {"partOfSpeech": "noun", "definitions": [{"definition": "A representative form."}]}
+        ]
+    }
+]
+
+
+@pytest.fixture
+def cache_backend(mocker):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        mocker.patch.object(caching.appdirs, "user_cache_dir", return_value=cache_dir)
+        yield caching.SQLiteCaching()
+
+
+class TestOfflineDictionaryClient:
+
+    def test_get_definitions(self, word_definition_factory):
+        with tempfile.TemporaryDirectory() as dict_path:
+            with OfflineDictWriter(dict_path) as writer:
+                writer.add("example", word_definition_factory("example"))
+
+            offline_client = client.OfflineDictionaryClient(dict_path)
+            assert isinstance(offline_client, DictClient)
+
+            results = offline_client.get_definitions(["example", "unknownword"])
+            assert results["example"] == word_definition_factory("example")
+            assert isinstance(results["unknownword"], errors.WordTranslationNotFound)
+
+
+class TestImportFromCache:
+
+    def test_import_freedict_and_oxford(self, cache_backend):
+        cache_backend.put_many("freedictionary", {
+            "word_example.json": json.dumps(FREEDICT_RESPONSE).encode(),
+            "word_broken.json": b"{not json",
+        })
+        cache_backend.put_many("oxforddictionaries", {
+            "word_example.json": json.dumps(oxford_data.response_data).encode(),
+        })
+        # pronunciation guessed by an earlier run
+        no_audio_response = [dict(FREEDICT_RESPONSE[0], word="sample", phonetics=[])]
+        cache_backend.put_many("freedictionary", {
+            "word_sample.json": json.dumps(no_audio_response).encode(),
+        })
+        cache_backend.save_data_to_cache("pronunciation_urls", "sample", b"https://audio.example.com/sample.mp3")
+
+        with tempfile.TemporaryDirectory() as dict_path:
+            result = importer.import_from_cache(cache_backend, dict_path, ["freedict", "oxforddict"])
+
+            assert result == importer.ImportResult(imported=2, duplicates=1, failed=1)
+            offline_client = client.OfflineDictionaryClient(dict_path)
+            example = offline_client.get_definition("example")
+            # freedict was the first source
+            assert example.explanations[0].definitions[0].definitions == ["A representative form."]
+            assert example.pronunciation.get_url() == FREEDICT_RESPONSE[0]["phonetics"][0]["audio"]
+            sample = offline_client.get_definition("sample")
+            assert sample.pronunciation.get_url() == "https://audio.example.com/sample.mp3"
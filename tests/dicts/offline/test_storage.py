@@ -0,0 +1,101 @@
+import os
+import pytest
+import tempfile
+
+from kobo2anki.dicts import errors
+from kobo2anki.dicts.offline import storage
+from kobo2anki.pronunciation import WordPronunciation
+
+
+@pytest.fixture
+def dict_path():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield os.path.join(temp_dir, "offline_dict")
+
+
+class TestOfflineDictStorage:
+
+    def test_write_and_read(self, dict_path, word_definition_factory):
+        words = [f"word{i}" for i in range(1000)] + ["éclair", "a", "zebra"]
+        with storage.OfflineDictWriter(dict_path) as writer:
+            for word in words:
+                word_definition = word_definition_factory(word)
+                word_definition.pronunciation = WordPronunciation(f"https://audio.example.com/{word}.mp3")
+                assert writer.add(word, word_definition)
+
+        reader = storage.OfflineDictReader(dict_path)
+        assert len(reader) == len(words)
+        assert reader.words() == sorted(words, key=str.encode)
+        for word in words:
+            result = reader.get(word)
+            expected = word_definition_factory(word)
+            assert result.word == expected.word
+            assert result.explanations == expected.explanations
+            assert result.pronunciation.get_url() == f"https://audio.example.com/{word}.mp3"
+        assert reader.get("Zebra").word == "zebra"
+        assert "word10" in reader
+        assert reader.get("missing") is None
+        assert reader.get("") is None
+        reader.close()
+
+    def test_first_definition_kept(self, dict_path, word_definition_factory):
+        with storage.OfflineDictWriter(dict_path) as writer:
+            assert writer.add("word", word_definition_factory("word"))
+            assert not writer.add("Word", word_definition_factory("other"))
+
+        assert storage.OfflineDictReader(dict_path).get("word").word == "word"
+
+    def test_empty_dictionary(self, dict_path):
+        with storage.OfflineDictWriter(dict_path):
+            pass
+        reader = storage.OfflineDictReader(dict_path)
+        assert len(reader) == 0
+        assert reader.get("word") is None
+
+    def test_failed_build_keeps_old_dictionary(self, dict_path, word_definition_factory):
+        with storage.OfflineDictWriter(dict_path) as writer:
+            writer.add("word", word_definition_factory("word"))
+
+        with pytest.raises(RuntimeError):
+            with storage.OfflineDictWriter(dict_path) as writer:
+                writer.add("other", word_definition_factory("other"))
+                raise RuntimeError("interrupted")
+
+        assert storage.OfflineDictReader(dict_path).words() == ["word"]
+        assert sorted(os.listdir(dict_path)) == [storage.INDEX_FILENAME, storage.RECORDS_FILENAME]
+
+    def test_not_a_dictionary(self, dict_path):
+        os.makedirs(dict_path)
+        with pytest.raises(errors.OfflineDictFormatError):
+            storage.OfflineDictReader(dict_path)
+
+        for filename in (storage.INDEX_FILENAME, storage.RECORDS_FILENAME):
+            with open(os.path.join(dict_path, filename), "wb") as fh:
+                fh.write(b"something else")
+        with pytest.raises(errors.OfflineDictFormatError):
+            storage.OfflineDictReader(dict_path)
+
+    def test_files_of_different_builds(self, dict_path, word_definition_factory):
+        with storage.OfflineDictWriter(dict_path) as writer:
+            writer.add("word", word_definition_factory("word"))
+        with open(os.path.join(dict_path, storage.RECORDS_FILENAME), "rb") as fh:
+            old_records = fh.read()
+        with storage.OfflineDictWriter(dict_path) as writer:
+            writer.add("other", word_definition_factory("other"))
+
+        # as if reader opened the dictionary between index and records replace
+        with open(os.path.join(dict_path, storage.RECORDS_FILENAME), "wb") as fh:
+            fh.write(old_records)
+        with pytest.raises(errors.OfflineDictFormatError):
+            storage.OfflineDictReader(dict_path)
+
+    def test_broken_record(self, dict_path, word_definition_factory):
+        with storage.OfflineDictWriter(dict_path) as writer:
+            writer.add("word", word_definition_factory("word"))
+        records_path = os.path.join(dict_path, storage.RECORDS_FILENAME)
+        with open(records_path, "r+b") as fh:
+            fh.seek(storage.RECORDS_HEADER.size)
+            fh.write(b"\x00" * 8)
+
+        with pytest.raises(errors.CantParseDictData):
+            storage.OfflineDictReader(dict_path).get("word")
@@ -1,7 +1,14 @@
 import json
+import asyncio
 import pytest
+from unittest.mock import AsyncMock
+from urllib.parse import urlparse
+
+from kobo2anki.dicts import errors
 
 from kobo2anki import model
+from kobo2anki.aio_session import AsyncResponse
+from kobo2anki.circuit_breaker import CircuitState, get_circuit_breaker
 from kobo2anki.dicts.oxforddictionaries import client as client_module
 
 
@@ -13,7 +20,7 @@ def dict_test_response():
 @pytest.fixture
 def requests_fixture(mocker, dict_test_response):
     # mock requests to return succesfull response
-    get_mock = mocker.patch.object(client_module.requests, "get")
+    get_mock = mocker.patch.object(client_module, "get_session").return_value.get
     get_mock.return_value.status_code = 200
     get_mock.return_value.json.return_value = dict_test_response
     return get_mock
@@ -62,7 +69,7 @@ class TestOxfordDictionariesClient:
     ):
         # simulate that cache wasn't found
         cache_mock = cache_handler_factory(get_cache_response=None)
-        mocker.patch.object(client_module, "LocalFSCaching", cache_mock)
+        mocker.patch.object(client_module, "get_cache_handler", cache_mock)
 
         client = client_module.OxfordDictionaryClient(self.test_app_id, self.test_app_key)
         response = client.get_definition(self.test_word)
@@ -73,9 +80,10 @@ class TestOxfordDictionariesClient:
         # ensure cache handler was iniitilized
         assert cache_mock.call_count == 1
 
-        # ensure we tried to read cache
+        # ensure we tried to read cache, and checked dictionary didn't know the word before
         assert cache_mock.return_value.get_cached_data.call_args_list == [
-            mocker.call(client_module.DICT_NAME, f"word_{self.test_word}.json")
+            mocker.call(client_module.DICT_NAME, f"word_{self.test_word}.json"),
+            mocker.call(f"{client_module.DICT_NAME}_misses", self.test_word),
         ]
         # ensure we tried to save cache
         assert cache_mock.return_value.save_data_to_cache.call_args_list == [
@@ -112,7 +120,7 @@ class TestOxfordDictionariesClient:
         cache_mock = cache_handler_factory(
             get_cache_response=json.dumps(dict_test_response).encode()
         )
-        mocker.patch.object(client_module, "LocalFSCaching", cache_mock)
+        mocker.patch.object(client_module, "get_cache_handler", cache_mock)
 
         client = client_module.OxfordDictionaryClient(self.test_app_id, self.test_app_key)
         response = client.get_definition(self.test_word)
@@ -131,3 +139,121 @@ class TestOxfordDictionariesClient:
 
         # ensure we called parser with right data
         assert parser_mock.call_args_list == [mocker.call(dict_test_response)]
+
+    def test_get_definition_not_found_remembered(
+        self,
+        mocker,
+        cache_handler_factory,
+        requests_fixture,
+    ):
+        cache_mock = cache_handler_factory(get_cache_response=None)
+        mocker.patch.object(client_module, "get_cache_handler", cache_mock)
+        requests_fixture.return_value.status_code = 404
+
+        client = client_module.OxfordDictionaryClient(self.test_app_id, self.test_app_key)
+        with pytest.raises(errors.WordTranslationNotFound):
+            client.get_definition(self.test_word)
+
+        assert cache_mock.return_value.save_data_to_cache.call_args_list == [
+            mocker.call(f"{client_module.DICT_NAME}_misses", self.test_word, mocker.ANY)
+        ]
+
+    def test_get_definition_known_miss(
+        self,
+        mocker,
+        cache_handler_factory,
+        requests_fixture,
+    ):
+        cache_mock = cache_handler_factory(get_cache_response=None)
+        mocker.patch.object(client_module, "get_cache_handler", cache_mock)
+        negative_cache_mock = mocker.patch.object(client_module, "NegativeResultCache")
+        negative_cache_mock.return_value.is_known_miss.return_value = True
+
+        client = client_module.OxfordDictionaryClient(self.test_app_id, self.test_app_key)
+        with pytest.raises(errors.WordTranslationNotFound):
+            client.get_definition(self.test_word)
+
+        # we know dictionary doesn't have the word, so we don't ask it
+        assert requests_fixture.call_count == 0
+
+    def test_rejected_credentials_open_circuit(
+        self,
+        mocker,
+        cache_handler_factory,
+        requests_fixture,
+    ):
+        cache_mock = cache_handler_factory(get_cache_response=None)
+        mocker.patch.object(client_module, "get_cache_handler", cache_mock)
+        requests_fixture.return_value.status_code = 403
+
+        client = client_module.OxfordDictionaryClient(self.test_app_id, self.test_app_key)
+        with pytest.raises(errors.NotAbleToGetWordTranlsation):
+            client.get_definition(self.test_word)
+
+        breaker = get_circuit_breaker(urlparse(client_module.BASE_URL).netloc)
+        assert breaker.state == CircuitState.OPEN
+
+    def test_get_definitions_known_miss_not_requested(
+        self,
+        mocker,
+        cache_handler_factory,
+        requests_fixture,
+        dict_test_response,
+        parser_mock,
+        dict_word_fixture,
+        parser_get_audio_file_url_mock,
+        mock_word_pronunciation,
+    ):
+        cache_mock = cache_handler_factory(get_cache_response=None)
+        mocker.patch.object(client_module, "get_cache_handler", cache_mock)
+        negative_cache_mock = mocker.patch.object(client_module, "NegativeResultCache")
+        negative_cache_mock.return_value.get_known_misses.return_value = {"unknownword"}
+        negative_cache_mock.return_value.is_known_miss.return_value = False
+        cache_mock.return_value.get_many.return_value = {}
+
+        client = client_module.OxfordDictionaryClient(self.test_app_id, self.test_app_key)
+        results = client.get_definitions([self.test_word, "unknownword"])
+
+        assert results[self.test_word] == dict_word_fixture
+        assert isinstance(results["unknownword"], errors.WordTranslationNotFound)
+        assert requests_fixture.call_count == 1
+        assert negative_cache_mock.return_value.get_known_misses.call_args_list == [
+            mocker.call([self.test_word, "unknownword"])
+        ]
+
+    def test_aget_definitions(
+        self,
+        mocker,
+        cache_handler_factory,
+        dict_test_response,
+        parser_mock,
+        dict_word_fixture,
+        parser_get_audio_file_url_mock,
+        mock_word_pronunciation,
+    ):
+        cache_mock = cache_handler_factory(get_cache_response=None)
+        mocker.patch.object(client_module, "get_cache_handler", cache_mock)
+        cache_mock.return_value.get_many.return_value = {}
+
+        async def get(url, headers):
+            if url.endswith("/" + self.test_word):
+                return AsyncResponse(200, json.dumps(dict_test_response).encode(), {})
+            if url.endswith("/broken"):
+                return AsyncResponse(200, b"<html>", {})
+            return AsyncResponse(404, b"", {})
+
+        get_mock = mocker.patch.object(client_module, "get_async_session").return_value.get = AsyncMock(
+            side_effect=get
+        )
+
+        client = client_module.OxfordDictionaryClient(self.test_app_id, self.test_app_key)
+        results = asyncio.run(client.aget_definitions([self.test_word, "unknownword", "broken"]))
+
+        assert results[self.test_word] == dict_word_fixture
+        assert isinstance(results["unknownword"], errors.WordTranslationNotFound)
+        assert isinstance(results["broken"], errors.NotAbleToGetWordTranlsation)
+        assert mocker.call(
+            client_module.BASE_URL + client_module.LANGUAGE + "/" + self.test_word,
+            headers={'app_id': self.test_app_id, "app_key": self.test_app_key}
+        ) in get_mock.await_args_list
+        assert parser_mock.call_args_list == [mocker.call(dict_test_response)]
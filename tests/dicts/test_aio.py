@@ -0,0 +1,33 @@
+import asyncio
+
+from kobo2anki.dicts import errors
+from kobo2anki.dicts.aio import gather_definitions
+
+
+class TestGatherDefinitions:
+
+    def test_errors_returned_in_order(self, word_definition_factory):
+        async def aget_definition(word: str):
+            if word == "unknownword":
+                raise errors.WordTranslationNotFound(word)
+            return word_definition_factory(word)
+
+        results = asyncio.run(gather_definitions(aget_definition, ["beta", "unknownword", "alpha", "beta"]))
+
+        assert list(results) == ["beta", "unknownword", "alpha"]
+        assert results["alpha"].word == "alpha"
+        assert isinstance(results["unknownword"], errors.WordTranslationNotFound)
+
+    def test_words_looked_up_concurrently(self, word_definition_factory):
+        async def lookup():
+            barrier = asyncio.Barrier(3)
+
+            async def aget_definition(word: str):
+                # hangs unless all words are looked up at the same time
+                await asyncio.wait_for(barrier.wait(), timeout=5)
+                return word_definition_factory(word)
+
+            return await gather_definitions(aget_definition, ["one", "two", "three"])
+
+        results = asyncio.run(lookup())
+        assert [definition.word for definition in results.values()] == ["one", "two", "three"]
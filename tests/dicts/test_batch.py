@@ -0,0 +1,30 @@
+import threading
+
+from kobo2anki.dicts import errors
+from kobo2anki.dicts.batch import map_definitions
+
+
+class TestMapDefinitions:
+
+    def test_errors_returned_in_order(self, word_definition_factory):
+        def get_definition(word: str):
+            if word == "unknownword":
+                raise errors.WordTranslationNotFound(word)
+            return word_definition_factory(word)
+
+        results = map_definitions(get_definition, ["beta", "unknownword", "alpha", "beta"], workers=4)
+
+        assert list(results) == ["beta", "unknownword", "alpha"]
+        assert results["alpha"].word == "alpha"
+        assert isinstance(results["unknownword"], errors.WordTranslationNotFound)
+
+    def test_words_looked_up_concurrently(self, word_definition_factory):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def get_definition(word: str):
+            # fails with BrokenBarrierError unless all words are looked up at the same time
+            barrier.wait()
+            return word_definition_factory(word)
+
+        results = map_definitions(get_definition, ["one", "two", "three"], workers=3)
+        assert [definition.word for definition in results.values()] == ["one", "two", "three"]
@@ -0,0 +1,87 @@
+import time
+import pytest
+
+from kobo2anki.dicts import errors
+from kobo2anki.dicts.hedged import HedgedDictClient
+from tests.stubs.dict import FakeDictClient
+
+
+class SlowDictClient(FakeDictClient):
+    """
+    FakeDictClient which answers after `delay` seconds.
+    """
+
+    def __init__(self, delay: float, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delay = delay
+        self.calls = []
+
+    def get_definition(self, word: str):
+        self.calls.append(word)
+        time.sleep(self.delay)
+        return super().get_definition(word)
+
+
+class PrimaryLookupError(errors.WordTranslationNotFound):
+    def __init__(self):
+        super().__init__("example")
+
+
+class TestHedgedDictClient:
+
+    test_word = "example"
+
+    def _clients(self, word_definition_factory, primary_delay, secondary_delay, primary_knows=True):
+        primary = SlowDictClient(
+            primary_delay,
+            {self.test_word: word_definition_factory("primary")} if primary_knows else {},
+            {}
+        )
+        secondary = SlowDictClient(secondary_delay, {self.test_word: word_definition_factory("secondary")}, {})
+        return primary, secondary
+
+    def test_fast_primary_not_hedged(self, word_definition_factory):
+        primary, secondary = self._clients(word_definition_factory, 0, 0)
+        client = HedgedDictClient(primary, secondary, hedge_delay=1)
+
+        assert client.get_definition(self.test_word).word == "primary"
+        assert secondary.calls == []
+
+    def test_slow_primary_hedged(self, word_definition_factory):
+        primary, secondary = self._clients(word_definition_factory, 1, 0)
+        client = HedgedDictClient(primary, secondary, hedge_delay=0.05)
+
+        started_at = time.monotonic()
+        assert client.get_definition(self.test_word).word == "secondary"
+        assert time.monotonic() - started_at < 0.5
+
+    def test_slow_secondary_primary_still_wins(self, word_definition_factory):
+        primary, secondary = self._clients(word_definition_factory, 0.2, 1)
+        client = HedgedDictClient(primary, secondary, hedge_delay=0.05)
+
+        assert client.get_definition(self.test_word).word == "primary"
+        assert secondary.calls == [self.test_word]
+
+    def test_failed_primary_falls_back(self, word_definition_factory):
+        primary, secondary = self._clients(word_definition_factory, 0, 0, primary_knows=False)
+        client = HedgedDictClient(primary, secondary, hedge_delay=1)
+
+        assert client.get_definition(self.test_word).word == "secondary"
+
+    def test_both_failed_primary_error_raised(self):
+        primary = FakeDictClient({}, {"example": PrimaryLookupError})
+        secondary = FakeDictClient({}, {})
+        client = HedgedDictClient(primary, secondary, hedge_delay=1)
+
+        with pytest.raises(PrimaryLookupError):
+            client.get_definition(self.test_word)
+        results = client.get_definitions([self.test_word])
+        assert isinstance(results[self.test_word], PrimaryLookupError)
+
+    def test_unexpected_error_raised(self, word_definition_factory):
+        primary = FakeDictClient({}, {"example": RuntimeError})
+        secondary = FakeDictClient({"example": word_definition_factory("secondary")}, {})
+        client = HedgedDictClient(primary, secondary, hedge_delay=1)
+
+        with pytest.raises(RuntimeError):
+            client.get_definition(self.test_word)
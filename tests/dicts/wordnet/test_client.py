@@ -0,0 +1,73 @@
+import os
+import sys
+import subprocess
+import pytest
+
+from kobo2anki.dicts import errors, DictClient
+from kobo2anki import nltk_corpora
+from kobo2anki.dicts.wordnet import client
+from kobo2anki.model import Parts
+
+
+class TestWordNetClient:
+
+    def test_import_doesnt_need_wordnet(self, tmp_path):
+        """
+        Module can be imported without WordNet installed, so client can download it.
+        """
+        code = (
+            "import nltk; "
+            f"nltk.data.path[:] = [{str(tmp_path)!r}]; "
+            "import kobo2anki.dicts.wordnet.client"
+        )
+        repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        subprocess.run([sys.executable, "-c", code], cwd=repo_root, check=True)
+
+    def test_wordnet_is_downloaded_if_missing(self, mocker):
+        mocker.patch.object(nltk_corpora.nltk.data, "find", side_effect=LookupError)
+        download_mock = mocker.patch.object(nltk_corpora.nltk, "download")
+        client.WordNetClient()
+        download_mock.assert_called_once_with("wordnet")
+
+    def test_protocols(self):
+        wordnet_client = client.WordNetClient()
+        assert isinstance(wordnet_client, DictClient)
+
+    def test_get_definition(self):
+        result = client.WordNetClient().get_definition("example")
+
+        assert result.word == "example"
+        assert result.pronunciation is None
+        assert [explanation.part for explanation in result.explanations] == [Parts.NOUN]
+        first_definition = result.explanations[0].definitions[0]
+        assert first_definition.definitions == [
+            "an item of information that is typical of a class or group"
+        ]
+        # lemma names are synonyms, without the word itself
+        assert "illustration" in first_definition.synonyms
+        assert "example" not in first_definition.synonyms
+        assert first_definition.examples
+
+    def test_parts_in_wordnet_order(self):
+        result = client.WordNetClient().get_definition("run")
+        assert [explanation.part for explanation in result.explanations] == [Parts.NOUN, Parts.VERB]
+
+    def test_adjective_satellites_are_adjectives(self):
+        result = client.WordNetClient().get_definition("quick")
+        parts = [explanation.part for explanation in result.explanations]
+        assert Parts.ADJECTIVE in parts
+        assert len(parts) == len(set(parts))
+
+    def test_multi_word_expression(self):
+        result = client.WordNetClient().get_definition("ice cream")
+        assert result.explanations[0].part == Parts.NOUN
+
+    def test_get_definitions(self):
+        results = client.WordNetClient().get_definitions(["example", "qwertyuiop"])
+
+        assert results["example"].word == "example"
+        assert isinstance(results["qwertyuiop"], errors.WordTranslationNotFound)
+
+    def test_unknown_word(self):
+        with pytest.raises(errors.WordTranslationNotFound):
+            client.WordNetClient().get_definition("qwertyuiop")
@@ -0,0 +1,113 @@
+"""
+Benchmark of reading saved words from a big Kobo DB.
+
+Builds a synthetic Kobo DB with 500k bookmarks from the test DB schema and times
+KoboReader.get_saved_words against the old way of reading words: all highlights
+were selected and every one was split with re.split in Python.
+
+Run from the repository root:
+
+    python -m tests.kobo.bench_highlights [--bookmarks 500000] [--repeat 3]
+
+Not collected by pytest, a run takes under a minute.
+"""
+import os
+import re
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+from typing import Callable, List, Optional
+
+from kobo2anki.kobo.reader import KoboReader
+
+
+TEST_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data/test_db.sqlite")
+
+
+def build_db(mount_path: str, bookmarks: int, seed: int = 1):
+    """
+    90% of bookmarks are highlights, 30% of them are single words, 30% short phrases
+    and the rest are paragraphs.
+    """
+    rnd = random.Random(seed)
+    os.makedirs(os.path.join(mount_path, ".kobo"))
+    db_path = os.path.join(mount_path, ".kobo/KoboReader.sqlite")
+    shutil.copy(TEST_DB_PATH, db_path)
+    vocabulary = [
+        "".join(rnd.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rnd.randint(2, 10)))
+        for _ in range(20000)
+    ]
+    rows = []
+    for i in range(bookmarks):
+        kind = rnd.random()
+        if kind < 0.3:
+            text = rnd.choice(vocabulary) + rnd.choice(["", ",", ".", " "])
+        elif kind < 0.6:
+            text = " ".join(rnd.choice(vocabulary) for _ in range(rnd.randint(2, 12)))
+        else:
+            text = " ".join(rnd.choice(vocabulary) for _ in range(rnd.randint(20, 120)))
+        bookmark_type = "highlight" if rnd.random() < 0.9 else "note"
+        rows.append((f"bench-{i}", "volume", "content", "path", 0, 0, "path", 0, 0, text, bookmark_type))
+    con = sqlite3.connect(db_path)
+    with con:
+        con.executemany(
+            "insert into bookmark (BookmarkID, VolumeID, ContentID, StartContainerPath, StartContainerChildIndex, "
+            "StartOffset, EndContainerPath, EndContainerChildIndex, EndOffset, Text, Type) "
+            "values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+    con.close()
+
+
+def _legacy_extract_word(sentence: str) -> Optional[str]:
+    words = list(filter(lambda x: len(x) > 2, re.split(r"\W+", sentence)))
+    return words[0] if len(words) == 1 else None
+
+
+def read_words_legacy(mount_path: str) -> List[str]:
+    con = sqlite3.connect(os.path.join(mount_path, ".kobo/KoboReader.sqlite"))
+    try:
+        texts = [record[0] for record in con.execute("select Text from wordlist")]
+        texts += [record[0] for record in con.execute('select Text from bookmark where Type="highlight"')]
+    finally:
+        con.close()
+    return list(filter(None, map(_legacy_extract_word, texts)))
+
+
+def read_words(mount_path: str) -> List[str]:
+    with KoboReader(mount_path) as kobo_reader:
+        return kobo_reader.get_saved_words()
+
+
+def best_time(read: Callable[[str], List[str]], mount_path: str, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        words = read(mount_path)
+        timings.append(time.perf_counter() - started_at)
+    return min(timings), words
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookmarks", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as mount_path:
+        build_db(mount_path, args.bookmarks)
+        db_size = os.path.getsize(os.path.join(mount_path, ".kobo/KoboReader.sqlite"))
+        print(f"Kobo DB with {args.bookmarks} bookmarks, {db_size / 2 ** 20:.0f} MB")
+
+        legacy_time, legacy_words = best_time(read_words_legacy, mount_path, args.repeat)
+        current_time, current_words = best_time(read_words, mount_path, args.repeat)
+        print(f"legacy:  {legacy_time:.2f}s, {len(legacy_words)} words")
+        print(f"current: {current_time:.2f}s, {len(current_words)} words")
+        print(f"same words: {sorted(legacy_words) == sorted(current_words)}")
+
+
+if __name__ == "__main__":
+    main()
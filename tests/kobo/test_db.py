@@ -1,7 +1,9 @@
 import os
+import shutil
+import sqlite3
 import pytest
 
-from kobo2anki.kobo import db, model
+from kobo2anki.kobo import db, errors, model
 
 
 @pytest.fixture
@@ -60,3 +62,97 @@ class TestKoboDB:
         db_reader = db.KoboDB(test_db_path)
         highlights = db_reader.get_highlights()
         assert sorted(highlights) == sorted(expected_highlights)
+
+    def test_connection_is_reused(self, mocker, test_db_path):
+        connect_spy = mocker.spy(db.sqlite3, "connect")
+        with db.KoboDB(test_db_path) as db_reader:
+            db_reader.get_dict_words()
+            db_reader.get_highlights()
+        connect_spy.assert_called_once()
+        assert "mode=ro&immutable=1" in connect_spy.call_args.args[0]
+
+    def test_connection_is_read_only(self, test_db_path):
+        with db.KoboDB(test_db_path) as db_reader:
+            with pytest.raises(sqlite3.OperationalError):
+                db_reader._execute_query("delete from wordlist")
+
+    def test_snapshot(self, mocker, test_db_path):
+        with db.KoboDB(test_db_path) as db_reader:
+            expected_dict_words = db_reader.get_dict_words()
+            expected_highlights = db_reader.get_highlights()
+
+        connect_spy = mocker.spy(db.sqlite3, "connect")
+        db_reader = db.KoboDB(test_db_path, snapshot=True)
+        assert db_reader.get_dict_words() == expected_dict_words
+        assert db_reader.get_highlights() == expected_highlights
+        # device DB is only opened to copy it
+        assert connect_spy.call_count == 2
+        snapshot_path = connect_spy.call_args_list[1].args[0]
+        assert os.path.isfile(snapshot_path)
+
+        db_reader.close()
+        assert not os.path.exists(snapshot_path)
+
+    def test_not_a_db(self, tmp_path):
+        db_file_path = tmp_path / "KoboReader.sqlite"
+        db_file_path.write_bytes(b"not a sqlite db" * 100)
+        with pytest.raises(errors.KoboDataReadingError):
+            db.KoboDB(str(db_file_path), snapshot=True).get_dict_words()
+
+    def test_iter_query_fetches_in_batches(self, test_db_path):
+        with db.KoboDB(test_db_path) as db_reader:
+            rows = db_reader._iter_query("select Text from wordlist order by rowid", batch_size=2)
+            assert next(rows) == ('bobbing.',)
+            assert [row[0] for row in rows] == ['goaded', 'lured', 'flatter', 'convalescent']
+
+    def test_iter_highlights_filters_long_highlights(self, test_db_path, tmp_path):
+        db_path = str(tmp_path / "KoboReader.sqlite")
+        shutil.copy(test_db_path, db_path)
+        con = sqlite3.connect(db_path)
+        with con:
+            con.execute(
+                "update bookmark set Text = 'a highlight of a whole sentence, not a word' "
+                "where BookmarkID = 'ccfd0458-99e0-4862-b87c-4db2d03809ff'"
+            )
+            con.execute("update bookmark set Text = ? where BookmarkID = 'eba8ddf4-c54a-44b5-ba16-aa1ade3dd0d9'", ("x" * 50,))
+            con.execute("update bookmark set Text = null where BookmarkID = 'f3439f55-c651-48a3-8635-d556763d67cd'")
+        con.close()
+
+        with db.KoboDB(db_path) as db_reader:
+            highlights = list(db_reader.iter_highlights(max_length=40, max_spaces=3))
+        assert sorted(highlight.text for highlight in highlights) == [' ribald', 'musings']
+
+    def test_fingerprint_changes_when_words_are_saved(self, test_db_path, tmp_path):
+        db_path = str(tmp_path / "KoboReader.sqlite")
+        shutil.copy(test_db_path, db_path)
+        with db.KoboDB(db_path) as db_reader:
+            fingerprint = db_reader.get_fingerprint()
+        with db.KoboDB(db_path) as db_reader:
+            assert db_reader.get_fingerprint() == fingerprint
+
+        con = sqlite3.connect(db_path)
+        with con:
+            con.execute("update wordlist set Text = 'lure' where Text = 'lured'")
+        con.close()
+        with db.KoboDB(db_path) as db_reader:
+            assert db_reader.get_fingerprint() != fingerprint
+
+    def test_fingerprint_changes_when_last_bookmark_is_replaced(self, test_db_path, tmp_path):
+        db_path = str(tmp_path / "KoboReader.sqlite")
+        shutil.copy(test_db_path, db_path)
+        with db.KoboDB(db_path) as db_reader:
+            fingerprint = db_reader.get_fingerprint()
+
+        # new bookmark gets rowid of the deleted one
+        con = sqlite3.connect(db_path)
+        with con:
+            con.execute("delete from bookmark where rowid = 6")
+            con.execute(
+                "insert into bookmark (BookmarkID, VolumeID, ContentID, StartContainerPath, StartContainerChildIndex, "
+                "StartOffset, EndContainerPath, EndContainerChildIndex, EndOffset, Text, Type) "
+                "values ('new-bookmark', 'volume', 'content', 'path', 0, 0, 'path', 0, 0, 'serendipity', 'highlight')"
+            )
+            assert con.execute("select rowid from bookmark where BookmarkID = 'new-bookmark'").fetchone() == (6,)
+        con.close()
+        with db.KoboDB(db_path) as db_reader:
+            assert db_reader.get_fingerprint() != fingerprint
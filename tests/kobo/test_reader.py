@@ -1,9 +1,12 @@
 import os
+import shutil
+import sqlite3
 import pytest
 from unittest.mock import call
 from pytest_mock import MockerFixture
 
 from kobo2anki.kobo import reader, db, model
+from kobo2anki.kobo.state import ExtractionStateStore
 
 
 @pytest.fixture
@@ -42,8 +45,8 @@ def db_reader_mock(
         test_highlights,
 ):
     db_reader = mocker.MagicMock(spec=db.KoboDB)
-    db_reader.return_value.get_dict_words.return_value = test_dict_words
-    db_reader.return_value.get_highlights.return_value = test_highlights
+    db_reader.return_value.iter_dict_words.side_effect = lambda: iter(test_dict_words)
+    db_reader.return_value.iter_highlights.side_effect = lambda *args, **kwargs: iter(test_highlights)
     return db_reader
 
 
@@ -66,5 +69,124 @@ class TestKoboReader:
         ]
         assert sorted(words) == sorted(expected_words)
         assert db_reader_mock.call_args_list == [
-            call(os.path.join(kobo_mount_path, ".kobo/KoboReader.sqlite"))
+            call(os.path.join(kobo_mount_path, ".kobo/KoboReader.sqlite"), snapshot=False)
         ]
+
+
+    def test_iter_saved_words_is_lazy(self, mocker, db_reader_mock):
+        mocker.patch.object(reader.db, 'KoboDB', db_reader_mock)
+        kobo_reader = reader.KoboReader(os.path.abspath(__file__))
+        words = kobo_reader.iter_saved_words()
+        assert next(words) == 'bobbing'
+        db_reader_mock.return_value.iter_highlights.assert_not_called()
+        assert list(words) == ['goaded', 'lured', 'flatter', 'convalescent', 'flatter', 'frail']
+
+    @pytest.mark.parametrize("sentence, expected_word", [
+        ("musings", "musings"),
+        (" ribald", "ribald"),
+        ("fret,", "fret"),
+        ("er flatter t", "flatter"),
+        ("Some highlighted text", None),
+        ("a, b", None),
+        ("", None),
+    ])
+    def test_extract_word(self, mocker, db_reader_mock, sentence, expected_word):
+        mocker.patch.object(reader.db, 'KoboDB', db_reader_mock)
+        kobo_reader = reader.KoboReader(os.path.abspath(__file__))
+        assert kobo_reader._extract_word(sentence) == expected_word
+
+class FakeCacheHandler:
+
+    def __init__(self):
+        self.data = {}
+
+    def get_cached_data(self, entity, key):
+        return self.data.get((entity, key))
+
+    def save_data_to_cache(self, entity, key, data):
+        self.data[(entity, key)] = data
+
+
+@pytest.fixture
+def kobo_mount_path(tmp_path):
+    test_db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data/test_db.sqlite")
+    os.makedirs(tmp_path / ".kobo")
+    shutil.copy(test_db_path, tmp_path / ".kobo/KoboReader.sqlite")
+    (tmp_path / ".kobo/version").write_text("N000000000001,4.38.21908,4.38.21908,4.38.21908,4.38.21908,00000000-0000-0000-0000-000000000387")
+    return str(tmp_path)
+
+
+class TestIncrementalKoboReader:
+
+    def read_words(self, mount_path, state_store, commit=True):
+        with reader.KoboReader(mount_path, state_store=state_store) as kobo_reader:
+            words = kobo_reader.get_saved_words()
+            if commit:
+                kobo_reader.commit_state()
+        return sorted(words)
+
+    def test_only_new_words_are_read(self, kobo_mount_path):
+        state_store = ExtractionStateStore(FakeCacheHandler())
+        all_words = [
+            'bobbing', 'convalescent', 'flatter', 'frail', 'fret', 'goaded', 'harangues', 'lured', 'musings', 'ribald'
+        ]
+        assert self.read_words(kobo_mount_path, state_store) == all_words
+        assert self.read_words(kobo_mount_path, state_store) == []
+
+        con = sqlite3.connect(os.path.join(kobo_mount_path, ".kobo/KoboReader.sqlite"))
+        with con:
+            con.execute("insert into wordlist (Text, DictSuffix) values ('quaint', '-en')")
+            con.execute(
+                "insert into bookmark (BookmarkID, VolumeID, ContentID, StartContainerPath, StartContainerChildIndex,"
+                " StartOffset, EndContainerPath, EndContainerChildIndex, EndOffset, Text, Type)"
+                " values ('new', 'v', 'c', 'p', 0, 0, 'p', 0, 0, 'wistful', 'highlight')"
+            )
+        con.close()
+        assert self.read_words(kobo_mount_path, state_store) == ['quaint', 'wistful']
+
+    @pytest.mark.parametrize("deleted_rowids", [[6], [5, 6]])
+    def test_highlight_added_after_the_last_one_was_deleted(self, kobo_mount_path, deleted_rowids):
+        state_store = ExtractionStateStore(FakeCacheHandler())
+        self.read_words(kobo_mount_path, state_store)
+
+        # new bookmarks reuse rowids of the deleted ones
+        con = sqlite3.connect(os.path.join(kobo_mount_path, ".kobo/KoboReader.sqlite"))
+        with con:
+            con.executemany("delete from bookmark where rowid = ?", [(rowid,) for rowid in deleted_rowids])
+            con.execute(
+                "insert into bookmark (BookmarkID, VolumeID, ContentID, StartContainerPath, StartContainerChildIndex,"
+                " StartOffset, EndContainerPath, EndContainerChildIndex, EndOffset, Text, Type, DateCreated)"
+                " values ('new', 'v', 'c', 'p', 0, 0, 'p', 0, 0, 'serendipity', 'highlight', '2021-01-01T00:00:00.000')"
+            )
+            assert con.execute("select rowid from bookmark where BookmarkID = 'new'").fetchone() == (deleted_rowids[0],)
+        con.close()
+        assert self.read_words(kobo_mount_path, state_store) == ['serendipity']
+        assert self.read_words(kobo_mount_path, state_store) == []
+
+    def test_failed_words_are_read_again(self, kobo_mount_path):
+        state_store = ExtractionStateStore(FakeCacheHandler())
+        with reader.KoboReader(kobo_mount_path, state_store=state_store) as kobo_reader:
+            kobo_reader.get_saved_words()
+            kobo_reader.retry_later(["frail", "lured"])
+            kobo_reader.commit_state()
+
+        with reader.KoboReader(kobo_mount_path, state_store=state_store) as kobo_reader:
+            assert kobo_reader.get_saved_words() == ["frail", "lured"]
+            kobo_reader.retry_later(["lured"])
+            kobo_reader.commit_state()
+
+        assert self.read_words(kobo_mount_path, state_store) == ["lured"]
+        assert self.read_words(kobo_mount_path, state_store) == []
+
+    def test_state_is_saved_only_on_commit(self, kobo_mount_path):
+        cache_handler = FakeCacheHandler()
+        state_store = ExtractionStateStore(cache_handler)
+        first_words = self.read_words(kobo_mount_path, state_store, commit=False)
+        assert cache_handler.data == {}
+        assert self.read_words(kobo_mount_path, state_store) == first_words
+        assert list(cache_handler.data) == [("kobo_state", "N000000000001")]
+
+    def test_device_id_without_version_file(self, kobo_mount_path):
+        os.remove(os.path.join(kobo_mount_path, ".kobo/version"))
+        with reader.KoboReader(kobo_mount_path) as kobo_reader:
+            assert kobo_reader.device_id.startswith("path-")
@@ -0,0 +1,22 @@
+from kobo2anki.kobo.state import ExtractionState, ExtractionStateStore
+
+
+class TestExtractionStateStore:
+
+    def test_save_and_load(self, mocker):
+        cache_handler = mocker.MagicMock()
+        state = ExtractionState(bookmark_rowid=42, bookmark_id="id", bookmark_date="2020-09-08T03:57:55.000")
+        state.add_words(["goaded", "lured"])
+        ExtractionStateStore(cache_handler).save("N1", state)
+
+        cache_handler.get_cached_data.return_value = cache_handler.save_data_to_cache.call_args.args[2]
+        loaded_state = ExtractionStateStore(cache_handler).load("N1")
+        assert loaded_state == state
+        assert not loaded_state.is_new_word("lured")
+        assert loaded_state.is_new_word("frail")
+        cache_handler.get_cached_data.assert_called_once_with("kobo_state", "N1")
+
+    def test_broken_state_is_ignored(self, mocker):
+        cache_handler = mocker.MagicMock()
+        cache_handler.get_cached_data.return_value = b'{"bookmark_rowid": 1}'
+        assert ExtractionStateStore(cache_handler).load("N1") == ExtractionState()
@@ -1,11 +1,13 @@
 """
 Stub of the dict for testing purposes
 """
-from typing import Dict, Type
+from typing import Dict, Iterable, Type, Union
 from logging import getLogger
 
 from kobo2anki.model import WordDefinition
 from kobo2anki.dicts import errors
+from kobo2anki.dicts.batch import map_definitions
+from kobo2anki.dicts.aio import gather_definitions
 
 logger = getLogger(__name__)
 
@@ -37,5 +39,18 @@ class FakeDictClient:
         logger.debug("Raising WordTranslationNotFound for word %s", word)
         raise errors.WordTranslationNotFound(word)
 
+    def get_definitions(
+            self, words: Iterable[str]
+    ) -> Dict[str, Union[WordDefinition, Exception]]:
+        return map_definitions(self.get_definition, words)
+
+    async def aget_definition(self, word: str) -> WordDefinition:
+        return self.get_definition(word)
+
+    async def aget_definitions(
+            self, words: Iterable[str]
+    ) -> Dict[str, Union[WordDefinition, Exception]]:
+        return await gather_definitions(self.aget_definition, words)
+
     def __repr__(self):
         return "FakeDictClient"
\ No newline at end of file
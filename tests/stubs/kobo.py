@@ -1,9 +1,16 @@
-from typing import List
+from typing import Iterable, Iterator, List, Set
 
 
 class FakeKoboReader:
     def __init__(self, words_to_return: List[str]):
         self.words_to_return = words_to_return
+        self.words_to_retry = set()  # type: Set[str]
 
     def get_saved_words(self):
         return self.words_to_return
+
+    def iter_saved_words(self) -> Iterator[str]:
+        yield from self.words_to_return
+
+    def retry_later(self, words: Iterable[str]):
+        self.words_to_retry.update(words)
@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+import aiohttp
+
+from kobo2anki import aio_session, errors
+from kobo2anki.circuit_breaker import CircuitState, get_circuit_breaker
+
+
+def _run(session: aio_session.AsyncHTTPSession, coro):
+    async def run():
+        async with session:
+            return await coro
+
+    return asyncio.run(run())
+
+
+class TestAsyncHTTPSession:
+
+    def test_retries_throttled_request(self, flaky_server):
+        url, statuses, requests_count = flaky_server
+        statuses.extend([(503, {}), (429, {"Retry-After": "0"})])
+        session = aio_session.AsyncHTTPSession(retries=3, backoff_factor=0.01)
+
+        response = _run(session, session.get(url))
+        assert response.status_code == 200
+        assert response.content == b"ok"
+        assert len(requests_count) == 3
+
+    def test_last_response_returned_when_retries_exhausted(self, flaky_server):
+        url, statuses, requests_count = flaky_server
+        statuses.extend([(503, {})] * 3)
+        session = aio_session.AsyncHTTPSession(retries=2, backoff_factor=0.01)
+
+        response = _run(session, session.get(url))
+        assert response.status_code == 503
+        assert len(requests_count) == 3
+
+    def test_requests_per_host_limited(self, flaky_server):
+        url, _, _ = flaky_server
+        session = aio_session.AsyncHTTPSession(max_requests_per_host=2)
+
+        async def get_all():
+            responses = await asyncio.gather(*[session.get(url) for _ in range(5)])
+            assert session._get_session().connector.limit_per_host == 2
+            return responses
+
+        assert [response.status_code for response in _run(session, get_all())] == [200] * 5
+
+    def test_connection_errors_open_circuit(self, mocker):
+        session = aio_session.AsyncHTTPSession(retries=0)
+        mocker.patch.object(aiohttp.ClientSession, "request", side_effect=aiohttp.ClientConnectionError())
+        breaker = get_circuit_breaker("example.com")
+
+        async def get_many():
+            for _ in range(5):
+                with pytest.raises(aiohttp.ClientConnectionError):
+                    await session.get("https://example.com/word")
+            with pytest.raises(errors.CircuitOpenError):
+                await session.get("https://example.com/word")
+
+        _run(session, get_many())
+        assert breaker.state == CircuitState.OPEN
+
+    def test_retry_after_capped(self):
+        session = aio_session.AsyncHTTPSession()
+        response = aio_session.AsyncResponse(429, b"", {"Retry-After": "3600"})
+        assert session._get_retry_after(response) == aio_session.MAX_RETRY_AFTER
+        response = aio_session.AsyncResponse(429, b"", {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        assert session._get_retry_after(response) is None
+
+    def test_invalid_host_limit(self):
+        with pytest.raises(ValueError):
+            aio_session.AsyncHTTPSession(max_requests_per_host=0)
+
+
+def test_async_session_is_shared_on_a_loop():
+    async def get_sessions():
+        try:
+            return aio_session.get_async_session(), aio_session.get_async_session()
+        finally:
+            await aio_session.close_async_session()
+
+    first, second = asyncio.run(get_sessions())
+    assert first is second
+    # every loop gets its own session
+    assert asyncio.run(get_sessions())[0] is not first
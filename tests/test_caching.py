@@ -1,7 +1,12 @@
+import gc
+import os
+import sqlite3
+import time
 import shutil
 import pytest
 import appdirs
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pytest_mock import MockerFixture
 
 from kobo2anki import caching
@@ -13,6 +18,8 @@ def appdirs_mock(mocker: MockerFixture):
     temp_folder = tempfile.mkdtemp()
     mock.user_cache_dir.return_value = temp_folder
     yield mock
+    # close SQLite connections of finished test first, closing removes WAL files
+    gc.collect()
     shutil.rmtree(temp_folder)
 
 
@@ -78,3 +85,552 @@ class TestLocalFSCaching:
             self.test_entity
         )
         assert cached_data == self.test_data
+
+
+class TestLocalFSCachingSafety:
+
+    test_key = "pytest"
+    test_entity = "somedict"
+    test_data = b"some_test_data"
+
+    def test_corrupted_record_ignored(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.LocalFSCaching()
+        cache_handler.save_data_to_cache(self.test_entity, self.test_key, self.test_data)
+
+        # simulate truncated file
+        file_path = cache_handler._get_cache_file_path(self.test_key, self.test_entity)
+        with open(file_path, "rb") as fh:
+            raw_data = fh.read()
+        with open(file_path, "wb") as fh:
+            fh.write(raw_data[:-3])
+
+        assert cache_handler.get_cached_data(self.test_entity, self.test_key) is None
+
+    def test_legacy_record_read_as_is(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.LocalFSCaching()
+        file_path = cache_handler._get_cache_file_path(self.test_key, self.test_entity)
+        os.makedirs(os.path.dirname(file_path))
+        with open(file_path, "wb") as fh:
+            fh.write(self.test_data)
+
+        assert cache_handler.get_cached_data(self.test_entity, self.test_key) == self.test_data
+
+    def test_failed_write_keeps_old_record(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.LocalFSCaching()
+        cache_handler.save_data_to_cache(self.test_entity, self.test_key, self.test_data)
+
+        mocker.patch.object(caching.os, "fsync", side_effect=OSError("disk is full"))
+        with pytest.raises(OSError):
+            cache_handler.save_data_to_cache(self.test_entity, self.test_key, b"new data")
+
+        assert cache_handler.get_cached_data(self.test_entity, self.test_key) == self.test_data
+        # temp file was cleaned up
+        entity_dir = os.path.dirname(
+            cache_handler._get_cache_file_path(self.test_key, self.test_entity)
+        )
+        assert sorted(os.listdir(entity_dir)) == [caching.LOCK_FILENAME, self.test_key]
+
+    def test_gc_removes_stale_tmp_files(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.LocalFSCaching(entity_limits={})
+        cache_handler.save_data_to_cache(self.test_entity, self.test_key, self.test_data)
+        entity_dir = os.path.dirname(
+            cache_handler._get_cache_file_path(self.test_key, self.test_entity)
+        )
+        stale_tmp_file = os.path.join(entity_dir, caching.TMP_FILE_PREFIX + "stale")
+        fresh_tmp_file = os.path.join(entity_dir, caching.TMP_FILE_PREFIX + "fresh")
+        for tmp_file in (stale_tmp_file, fresh_tmp_file):
+            with open(tmp_file, "wb") as fh:
+                fh.write(b"partial")
+        old = time.time() - caching.STALE_TMP_FILE_AGE - 1
+        os.utime(stale_tmp_file, (old, old))
+
+        cache_handler.gc()
+
+        assert not os.path.exists(stale_tmp_file)
+        assert os.path.exists(fresh_tmp_file)
+        assert cache_handler.usage()[self.test_entity].entries == 1
+
+    def test_concurrent_writers(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.LocalFSCaching()
+        payloads = [bytes([i]) * 100000 for i in range(8)]
+
+        def write(data: bytes):
+            for _ in range(5):
+                caching.LocalFSCaching().save_data_to_cache(self.test_entity, self.test_key, data)
+                # readers always see one of complete records
+                assert cache_handler.get_cached_data(self.test_entity, self.test_key) in payloads
+
+        with ThreadPoolExecutor(max_workers=len(payloads)) as executor:
+            list(executor.map(write, payloads))
+
+        assert cache_handler.get_cached_data(self.test_entity, self.test_key) in payloads
+
+
+class TestCompression:
+
+    test_key = "pytest"
+    test_entity = "freedictionary"
+    test_data = b'{"word": "test", "meanings": []}' * 100
+
+    @pytest.mark.parametrize("codec_name", sorted(caching.CODECS))
+    def test_fs_round_trip(self, mocker, appdirs_mock, codec_name):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.LocalFSCaching(codecs={self.test_entity: codec_name})
+        cache_handler.save_data_to_cache(self.test_entity, self.test_key, self.test_data)
+
+        assert cache_handler.get_cached_data(self.test_entity, self.test_key) == self.test_data
+
+    def test_fs_json_compressed_media_as_is(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.LocalFSCaching()
+        cache_handler.save_data_to_cache(self.test_entity, self.test_key, self.test_data)
+        cache_handler.save_data_to_cache("wp", "word.mp3", self.test_data)
+
+        json_size = os.path.getsize(cache_handler._get_cache_file_path(self.test_key, self.test_entity))
+        media_size = os.path.getsize(cache_handler._get_cache_file_path("word.mp3", "wp"))
+        assert json_size < len(self.test_data)
+        assert media_size == len(self.test_data) + caching.RECORD_HEADER.size
+
+    def test_fs_reads_v1_record(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.LocalFSCaching()
+        file_path = cache_handler._get_cache_file_path(self.test_key, self.test_entity)
+        os.makedirs(os.path.dirname(file_path))
+        with open(file_path, "wb") as fh:
+            fh.write(caching.RECORD_HEADER_V1.pack(
+                caching.RECORD_MAGIC, 1, caching.hashlib.sha256(self.test_data).digest()
+            ) + self.test_data)
+
+        assert cache_handler.get_cached_data(self.test_entity, self.test_key) == self.test_data
+
+    def test_sqlite_json_compressed(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.SQLiteCaching()
+        cache_handler.save_data_to_cache(self.test_entity, self.test_key, self.test_data)
+        cache_handler.save_data_to_cache("wp", "word.mp3", self.test_data)
+
+        stored = dict(cache_handler._con.execute("SELECT entity, length(data) FROM cache").fetchall())
+        assert stored[self.test_entity] < len(self.test_data)
+        assert stored["wp"] == len(self.test_data)
+        assert cache_handler.get_cached_data(self.test_entity, self.test_key) == self.test_data
+
+    def test_sqlite_reads_uncompressed_records(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        caching.SQLiteCaching(codecs={}).save_data_to_cache(
+            self.test_entity, self.test_key, self.test_data
+        )
+
+        cache_handler = caching.SQLiteCaching()
+        assert cache_handler.get_cached_data(self.test_entity, self.test_key) == self.test_data
+
+
+class TestNegativeResultCache:
+
+    test_entity = "somedict"
+    test_key = "unknownword"
+
+    def test_record_and_check_miss(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        negative_cache = caching.NegativeResultCache(
+            caching.LocalFSCaching(), self.test_entity, ttl=60
+        )
+        assert not negative_cache.is_known_miss(self.test_key)
+
+        negative_cache.record_miss(self.test_key)
+        assert negative_cache.is_known_miss(self.test_key)
+        assert not negative_cache.is_known_miss("otherword")
+
+    def test_miss_expires(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        time_mock = mocker.patch.object(caching.time, 'time')
+        time_mock.return_value = 1000.0
+        negative_cache = caching.NegativeResultCache(
+            caching.LocalFSCaching(), self.test_entity, ttl=60
+        )
+        negative_cache.record_miss(self.test_key)
+
+        time_mock.return_value = 1059.0
+        assert negative_cache.is_known_miss(self.test_key)
+
+        time_mock.return_value = 1061.0
+        assert not negative_cache.is_known_miss(self.test_key)
+
+    def test_get_known_misses(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        negative_cache = caching.NegativeResultCache(
+            caching.SQLiteCaching(), self.test_entity, ttl=60
+        )
+        negative_cache.record_miss(self.test_key)
+        negative_cache.record_miss("otherword")
+
+        assert negative_cache.get_known_misses(
+            [self.test_key, "otherword", "knownword"]
+        ) == {self.test_key, "otherword"}
+
+    def test_misses_kept_per_entity(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.LocalFSCaching()
+        caching.NegativeResultCache(cache_handler, "somedict", ttl=60).record_miss(self.test_key)
+        assert not caching.NegativeResultCache(
+            cache_handler, "otherdict", ttl=60
+        ).is_known_miss(self.test_key)
+
+    def test_disabled_with_zero_ttl(self, mocker):
+        cache_handler = mocker.MagicMock(autospec=caching.LocalFSCaching)
+        negative_cache = caching.NegativeResultCache(cache_handler, self.test_entity, ttl=0)
+        negative_cache.record_miss(self.test_key)
+        assert not negative_cache.is_known_miss(self.test_key)
+        assert cache_handler.save_data_to_cache.call_count == 0
+
+
+class TestSQLiteCaching:
+
+    test_key = "pytest"
+    test_entity = "somefile.bin"
+    test_data = b"some_test_data"
+
+    def test_get_cached_data_no_record(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.SQLiteCaching()
+        assert cache_handler.get_cached_data(self.test_entity, self.test_key) is None
+
+    def test_save_overwrite_and_get_cache(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.SQLiteCaching()
+        cache_handler.save_data_to_cache(
+            self.test_entity, self.test_key, b"some_other_data-" + self.test_data
+        )
+        cache_handler.save_data_to_cache(self.test_entity, self.test_key, self.test_data)
+
+        assert cache_handler.get_cached_data(self.test_entity, self.test_key) == self.test_data
+        # the same key in other entity is a different record
+        assert cache_handler.get_cached_data("other_entity", self.test_key) is None
+
+    def test_get_and_put_many(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        mocker.patch.object(caching.SQLiteCaching, 'batch_size', 3)
+        cache_handler = caching.SQLiteCaching()
+        items = {f"key{i}": f"data{i}".encode() for i in range(10)}
+        cache_handler.put_many(self.test_entity, items)
+
+        result = cache_handler.get_many(
+            self.test_entity, list(items) + ["missing_key"]
+        )
+        assert result == items
+
+    def test_wal_mode(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.SQLiteCaching()
+        journal_mode = cache_handler._con.execute("PRAGMA journal_mode").fetchone()[0]
+        assert journal_mode == "wal"
+
+    def test_migrate_from_fs(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        fs_cache_handler = caching.LocalFSCaching()
+        fs_cache_handler.save_data_to_cache(self.test_entity, self.test_key, self.test_data)
+        fs_cache_handler.save_data_to_cache("wp", "word.mp3", b"audio")
+
+        cache_handler = caching.SQLiteCaching()
+        assert cache_handler.get_cached_data(self.test_entity, self.test_key) == self.test_data
+        assert cache_handler.get_cached_data("wp", "word.mp3") == b"audio"
+
+        # files are imported only once
+        fs_cache_handler.save_data_to_cache("wp", "other.mp3", b"other audio")
+        assert caching.SQLiteCaching().get_cached_data("wp", "other.mp3") is None
+
+    def test_migrate_from_fs_in_batches(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        mocker.patch.object(caching.SQLiteCaching, 'batch_size', 3)
+        items = {f"key{i}": f"data{i}".encode() for i in range(10)}
+        caching.LocalFSCaching().put_many(self.test_entity, items)
+        put_many_spy = mocker.spy(caching.SQLiteCaching, "_put_many")
+
+        cache_handler = caching.SQLiteCaching()
+        assert cache_handler.get_many(self.test_entity, list(items)) == items
+        assert [len(call.args[2]) for call in put_many_spy.call_args_list] == [3, 3, 3, 1]
+
+    def test_migrate_from_fs_removes_files(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        mocker.patch.object(caching.SQLiteCaching, 'batch_size', 3)
+        items = {f"key{i}": f"data{i}".encode() for i in range(10)}
+        caching.LocalFSCaching().put_many(self.test_entity, items)
+        entity_dir = os.path.join(appdirs_mock.user_cache_dir(), "kobo2anki", self.test_entity)
+        put_many = caching.SQLiteCaching._put_many
+        batches = []
+
+        def interrupted_put_many(cache_handler, entity, batch):
+            batches.append(batch)
+            if len(batches) > 1:
+                raise sqlite3.OperationalError("database is locked")
+            put_many(cache_handler, entity, batch)
+
+        # import is interrupted after the first batch is committed
+        put_many_mock = mocker.patch.object(
+            caching.SQLiteCaching, "_put_many", autospec=True, side_effect=interrupted_put_many
+        )
+        with pytest.raises(sqlite3.OperationalError):
+            caching.SQLiteCaching().get_many(self.test_entity, list(items))
+        assert len([name for name in os.listdir(entity_dir) if not name.startswith(".")]) == 7
+        mocker.stop(put_many_mock)
+
+        # the files which were left are imported on the next use
+        cache_handler = caching.SQLiteCaching()
+        assert cache_handler.get_many(self.test_entity, list(items)) == items
+        assert not os.path.exists(entity_dir)
+
+    def test_usage_doesnt_migrate_from_fs(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        caching.LocalFSCaching().save_data_to_cache(self.test_entity, self.test_key, self.test_data)
+
+        assert caching.SQLiteCaching().usage() == {}
+        assert caching.LocalFSCaching().get_cached_data(self.test_entity, self.test_key) == self.test_data
+
+
+class TestIterEntity:
+
+    test_entity = "freedictionary"
+
+    @pytest.mark.parametrize("backend_class", [caching.LocalFSCaching, caching.SQLiteCaching])
+    def test_iter_entity(self, mocker, appdirs_mock, backend_class):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        mocker.patch.object(caching.SQLiteCaching, 'batch_size', 3)
+        cache_handler = backend_class()
+        items = {f"key{i}": f"data{i}".encode() for i in range(10)}
+        cache_handler.put_many(self.test_entity, items)
+        cache_handler.save_data_to_cache("other_entity", "key0", b"other")
+
+        assert dict(cache_handler.iter_entity(self.test_entity)) == items
+        assert list(cache_handler.iter_entity("missing_entity")) == []
+
+
+class TestMemoryLRUCaching:
+
+    test_entity = "somedict"
+
+    def test_read_from_memory(self, mocker):
+        backend = mocker.MagicMock(spec=caching.LocalFSCaching)
+        backend.get_cached_data.return_value = b"data"
+        cache_handler = caching.MemoryLRUCaching(backend)
+
+        assert cache_handler.get_cached_data(self.test_entity, "key") == b"data"
+        assert cache_handler.get_cached_data(self.test_entity, "key") == b"data"
+
+        # second read was served from memory
+        assert backend.get_cached_data.call_count == 1
+        assert cache_handler.stats == caching.CacheStats(hits=1, misses=1, evictions=0)
+
+    def test_missing_record_not_kept(self, mocker):
+        backend = mocker.MagicMock(spec=caching.LocalFSCaching)
+        backend.get_cached_data.return_value = None
+        cache_handler = caching.MemoryLRUCaching(backend)
+
+        assert cache_handler.get_cached_data(self.test_entity, "key") is None
+        assert cache_handler.get_cached_data(self.test_entity, "key") is None
+        assert backend.get_cached_data.call_count == 2
+
+    def test_write_through(self, mocker):
+        backend = mocker.MagicMock(spec=caching.LocalFSCaching)
+        cache_handler = caching.MemoryLRUCaching(backend)
+        cache_handler.save_data_to_cache(self.test_entity, "key", b"data")
+
+        assert backend.save_data_to_cache.call_args_list == [
+            mocker.call(self.test_entity, "key", b"data")
+        ]
+        assert cache_handler.get_cached_data(self.test_entity, "key") == b"data"
+        assert backend.get_cached_data.call_count == 0
+
+    def test_evict_by_entries(self, mocker):
+        backend = mocker.MagicMock(spec=caching.LocalFSCaching)
+        cache_handler = caching.MemoryLRUCaching(backend, max_entries=2)
+        cache_handler.save_data_to_cache(self.test_entity, "key1", b"data1")
+        cache_handler.save_data_to_cache(self.test_entity, "key2", b"data2")
+        # key1 becomes the most recently used
+        cache_handler.get_cached_data(self.test_entity, "key1")
+        cache_handler.save_data_to_cache(self.test_entity, "key3", b"data3")
+
+        backend.get_cached_data.return_value = None
+        assert cache_handler.get_cached_data(self.test_entity, "key2") is None
+        assert cache_handler.get_cached_data(self.test_entity, "key1") == b"data1"
+        assert cache_handler.stats.evictions == 1
+
+    def test_evict_by_size(self, mocker):
+        backend = mocker.MagicMock(spec=caching.LocalFSCaching)
+        backend.get_cached_data.return_value = None
+        cache_handler = caching.MemoryLRUCaching(backend, max_bytes=10)
+        cache_handler.save_data_to_cache(self.test_entity, "key1", b"12345")
+        cache_handler.save_data_to_cache(self.test_entity, "key2", b"12345")
+        cache_handler.save_data_to_cache(self.test_entity, "key3", b"12345")
+        # record which doesn't fit into memory at all
+        cache_handler.save_data_to_cache(self.test_entity, "big", b"12345678901")
+
+        assert cache_handler.get_cached_data(self.test_entity, "key1") is None
+        assert cache_handler.get_cached_data(self.test_entity, "key3") == b"12345"
+        assert cache_handler.get_cached_data(self.test_entity, "big") is None
+        assert cache_handler.stats.evictions == 1
+
+    def test_get_many(self, mocker):
+        backend = mocker.MagicMock(spec=caching.LocalFSCaching)
+        backend.get_many.return_value = {"key2": b"data2"}
+        cache_handler = caching.MemoryLRUCaching(backend)
+        cache_handler.save_data_to_cache(self.test_entity, "key1", b"data1")
+
+        result = cache_handler.get_many(self.test_entity, ["key1", "key2", "key3"])
+        assert result == {"key1": b"data1", "key2": b"data2"}
+        # only keys missing in memory were read from backend
+        assert backend.get_many.call_args_list == [
+            mocker.call(self.test_entity, ["key2", "key3"])
+        ]
+        assert cache_handler.get_cached_data(self.test_entity, "key2") == b"data2"
+
+
+class TestGetCacheHandler:
+
+    def test_shared_handler(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        caching.configure_cache("sqlite")
+        cache_handler = caching.get_cache_handler()
+        assert isinstance(cache_handler, caching.MemoryLRUCaching)
+        assert isinstance(cache_handler.backend, caching.SQLiteCaching)
+        assert caching.get_cache_handler() is cache_handler
+
+        caching.configure_cache("fs")
+        assert isinstance(caching.get_cache_handler().backend, caching.LocalFSCaching)
+        caching.configure_cache()
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            caching.configure_cache("unknown")
+
+    def test_unknown_codec(self):
+        with pytest.raises(ValueError):
+            caching.configure_cache(codecs={"freedictionary": "unknown"})
+
+
+class TestCacheLimits:
+
+    test_entity = "somedict"
+    # every file has a header in front of data
+    fs_record_size = 5 + caching.RECORD_HEADER.size
+
+    def _set_times(self, cache_handler, key: str, stored_at: float, accessed_at: float):
+        file_path = cache_handler._get_cache_file_path(key, self.test_entity)
+        os.utime(file_path, (accessed_at, stored_at))
+
+    def test_fs_expired_record_not_returned(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.LocalFSCaching(
+            entity_limits={self.test_entity: caching.EntityLimits(max_age=60)}
+        )
+        cache_handler.save_data_to_cache(self.test_entity, "fresh", b"data")
+        cache_handler.save_data_to_cache(self.test_entity, "old", b"data")
+        self._set_times(cache_handler, "old", time.time() - 120, time.time())
+
+        assert cache_handler.get_cached_data(self.test_entity, "fresh") == b"data"
+        assert cache_handler.get_cached_data(self.test_entity, "old") is None
+
+    def test_fs_gc(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.LocalFSCaching(
+            entity_limits={self.test_entity: caching.EntityLimits(max_bytes=2 * self.fs_record_size, max_age=60)}
+        )
+        now = time.time()
+        for key, stored_at, accessed_at in [
+            ("expired", now - 120, now),
+            ("least_used", now - 30, now - 30),
+            ("used", now - 30, now - 20),
+            ("recently_used", now - 30, now - 10),
+        ]:
+            cache_handler.save_data_to_cache(self.test_entity, key, b"12345")
+            self._set_times(cache_handler, key, stored_at, accessed_at)
+        # entities without limits are never removed
+        cache_handler.save_data_to_cache("unlimited", "key", b"12345")
+
+        result = cache_handler.gc()
+
+        assert result == caching.GCResult(removed_entries=2, freed_bytes=2 * self.fs_record_size)
+        assert cache_handler.usage() == {
+            self.test_entity: caching.EntityUsage(entries=2, bytes=2 * self.fs_record_size),
+            "unlimited": caching.EntityUsage(entries=1, bytes=self.fs_record_size),
+        }
+        assert cache_handler.get_cached_data(self.test_entity, "recently_used") == b"12345"
+        assert cache_handler.get_cached_data(self.test_entity, "used") == b"12345"
+
+    def test_fs_read_updates_last_use(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.LocalFSCaching(
+            entity_limits={self.test_entity: caching.EntityLimits(max_bytes=self.fs_record_size)}
+        )
+        now = time.time()
+        cache_handler.save_data_to_cache(self.test_entity, "first", b"12345")
+        self._set_times(cache_handler, "first", now - 30, now - 30)
+        cache_handler.save_data_to_cache(self.test_entity, "second", b"12345")
+        self._set_times(cache_handler, "second", now - 20, now - 20)
+
+        cache_handler.get_cached_data(self.test_entity, "first")
+        cache_handler.gc()
+
+        assert cache_handler.get_cached_data(self.test_entity, "first") == b"12345"
+        assert cache_handler.get_cached_data(self.test_entity, "second") is None
+
+    def test_sqlite_gc(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        time_mock = mocker.patch.object(caching.time, 'time')
+        cache_handler = caching.SQLiteCaching(
+            entity_limits={self.test_entity: caching.EntityLimits(max_bytes=10, max_age=60)}
+        )
+        for key, stored_at in [
+            ("expired", 1000.0), ("least_used", 1100.0), ("used", 1110.0), ("recently_used", 1120.0)
+        ]:
+            time_mock.return_value = stored_at
+            cache_handler.save_data_to_cache(self.test_entity, key, b"12345")
+        cache_handler.save_data_to_cache("unlimited", "key", b"12345")
+
+        # reading a record makes it the most recently used
+        time_mock.return_value = 1130.0
+        assert cache_handler.get_cached_data(self.test_entity, "least_used") == b"12345"
+        assert cache_handler.get_cached_data(self.test_entity, "expired") is None
+
+        result = cache_handler.gc()
+
+        assert result == caching.GCResult(removed_entries=2, freed_bytes=10)
+        assert cache_handler.usage() == {
+            self.test_entity: caching.EntityUsage(entries=2, bytes=10),
+            "unlimited": caching.EntityUsage(entries=1, bytes=5),
+        }
+        assert cache_handler.get_cached_data(self.test_entity, "least_used") == b"12345"
+        assert cache_handler.get_cached_data(self.test_entity, "used") is None
+
+    def test_sqlite_gc_shrinks_db(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.SQLiteCaching(
+            entity_limits={self.test_entity: caching.EntityLimits(max_bytes=10 * 1024)}
+        )
+        cache_handler.put_many(self.test_entity, {str(i): os.urandom(10 * 1024) for i in range(100)})
+
+        def page_count():
+            return cache_handler._con.execute("PRAGMA page_count").fetchone()[0]
+
+        pages_before_gc = page_count()
+        assert cache_handler.gc().removed_entries == 99
+        assert page_count() < pages_before_gc / 10
+
+    def test_sqlite_gc_doesnt_rebuild_db_for_few_free_pages(self, mocker, appdirs_mock):
+        mocker.patch.object(caching, 'appdirs', appdirs_mock)
+        cache_handler = caching.SQLiteCaching(
+            entity_limits={self.test_entity: caching.EntityLimits(max_bytes=90 * 10 * 1024)}
+        )
+        cache_handler.put_many(self.test_entity, {str(i): os.urandom(10 * 1024) for i in range(100)})
+
+        def page_count():
+            return cache_handler._con.execute("PRAGMA page_count").fetchone()[0]
+
+        pages_before_gc = page_count()
+        assert cache_handler.gc().removed_entries == 10
+        # DB isn't rebuilt, freed pages are reused by new records
+        assert page_count() == pages_before_gc
+        assert cache_handler._con.execute("PRAGMA freelist_count").fetchone()[0] > 0
@@ -0,0 +1,71 @@
+import time
+import pytest
+
+from kobo2anki import errors, http_session
+from kobo2anki.circuit_breaker import CircuitBreaker, CircuitState, get_circuit_breaker
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+        # success resets failures count
+        breaker.record_success()
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.state == CircuitState.CLOSED
+
+        breaker.record_failure()
+        assert breaker.state == CircuitState.OPEN
+        with pytest.raises(errors.CircuitOpenError):
+            breaker.before_call()
+
+    def test_half_open_lets_one_trial_call(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        assert breaker.state == CircuitState.HALF_OPEN
+
+        breaker.before_call()
+        # trial call is in progress
+        with pytest.raises(errors.CircuitOpenError):
+            breaker.before_call()
+
+        breaker.record_success()
+        assert breaker.state == CircuitState.CLOSED
+        breaker.before_call()
+
+    def test_failed_trial_opens_again(self):
+        breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=0.05)
+        breaker.trip(open_for=0.05)
+        time.sleep(0.06)
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == CircuitState.OPEN
+
+    def test_trip_keeps_circuit_open(self):
+        breaker = CircuitBreaker("test", reset_timeout=0)
+        breaker.trip()
+        assert breaker.state == CircuitState.OPEN
+
+
+class TestSessionCircuitBreaker:
+
+    def test_failing_host_not_called(self, mocker):
+        send_mock = mocker.patch("requests.Session.send")
+        send_mock.return_value.status_code = 503
+        session = http_session.HTTPSession()
+
+        for _ in range(5):
+            assert session.get("https://example.com/word").status_code == 503
+        with pytest.raises(errors.CircuitOpenError):
+            session.get("https://example.com/word")
+        assert send_mock.call_count == 5
+        assert get_circuit_breaker("example.com").state == CircuitState.OPEN
+
+        # other hosts are still called
+        send_mock.return_value.status_code = 404
+        assert session.get("https://other.example.com/word").status_code == 404
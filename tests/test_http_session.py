@@ -0,0 +1,105 @@
+import time
+
+from kobo2anki import http_session
+
+
+class TestHTTPSession:
+
+    def test_default_timeout(self, mocker):
+        send_mock = mocker.patch("requests.Session.send")
+        session = http_session.HTTPSession(timeout=3)
+
+        session.get("https://example.com/word")
+        assert send_mock.call_args.kwargs["timeout"] == 3
+
+        # explicit timeout wins
+        session.get("https://example.com/word", timeout=1)
+        assert send_mock.call_args.kwargs["timeout"] == 1
+
+    def test_pool_sizing(self):
+        session = http_session.HTTPSession(pool_connections=2, pool_maxsize=5)
+        adapter = session.get_adapter("https://example.com")
+        assert adapter is session.get_adapter("http://example.com")
+        assert adapter.poolmanager.connection_pool_kw["maxsize"] == 5
+        # connections to the same host come from the same keep-alive pool
+        pool = adapter.poolmanager.connection_from_url("https://example.com/a")
+        assert pool is adapter.poolmanager.connection_from_url("https://example.com/b")
+
+
+class TestGetSession:
+
+    def test_shared_session(self):
+        session = http_session.get_session()
+        assert isinstance(session, http_session.HTTPSession)
+        assert http_session.get_session() is session
+
+        http_session.configure_session(timeout=5, pool_maxsize=32)
+        configured_session = http_session.get_session()
+        assert configured_session is not session
+        assert configured_session.timeout == 5
+        http_session.configure_session()
+
+
+class TestRetry:
+
+    def test_retries_throttled_request(self, flaky_server):
+        url, statuses, requests_count = flaky_server
+        statuses.extend([(503, {}), (429, {"Retry-After": "0"})])
+        session = http_session.HTTPSession(retry=http_session.build_retry(3, backoff_factor=0.01))
+
+        response = session.get(url)
+        assert response.status_code == 200
+        assert len(requests_count) == 3
+
+    def test_last_response_returned_when_retries_exhausted(self, flaky_server):
+        url, statuses, requests_count = flaky_server
+        statuses.extend([(503, {})] * 3)
+        session = http_session.HTTPSession(retry=http_session.build_retry(2, backoff_factor=0.01))
+
+        response = session.get(url)
+        assert response.status_code == 503
+        assert len(requests_count) == 3
+
+    def test_retry_after_capped(self, mocker):
+        retry = http_session.build_retry()
+        response = mocker.MagicMock()
+        response.headers = {"Retry-After": "3600"}
+        assert retry.get_retry_after(response) == http_session.MAX_RETRY_AFTER
+
+    def test_backoff_jitter(self):
+        retry = http_session.build_retry(backoff_factor=1)
+        for _ in range(2):
+            retry = retry.increment(method="GET", url="/")
+        backoff = retry.get_backoff_time()
+        assert 2 <= backoff <= 2 + http_session.DEFAULT_BACKOFF_JITTER
+
+
+class TestHostRateLimiter:
+
+    def test_rate_limited_per_host(self):
+        rate_limiter = http_session.HostRateLimiter(rate=20, burst=1)
+
+        started_at = time.monotonic()
+        for _ in range(3):
+            rate_limiter.acquire("https://example.com/word")
+        # first request uses the burst, the next ones wait 1/20 seconds each
+        assert time.monotonic() - started_at >= 0.09
+
+        # other host has its own bucket
+        started_at = time.monotonic()
+        rate_limiter.acquire("https://other.example.com/word")
+        assert time.monotonic() - started_at < 0.05
+
+    def test_zero_rate_disables_limit(self):
+        rate_limiter = http_session.HostRateLimiter(rate=0)
+        started_at = time.monotonic()
+        for _ in range(100):
+            rate_limiter.acquire("https://example.com/word")
+        assert time.monotonic() - started_at < 0.05
+
+    def test_reserve_returns_wait(self):
+        rate_limiter = http_session.HostRateLimiter(rate=20, burst=1)
+        assert rate_limiter.reserve("https://example.com/word") == 0
+        assert 0.04 <= rate_limiter.reserve("https://example.com/word") <= 0.05
+        assert rate_limiter.reserve("https://other.example.com/word") == 0
+        assert http_session.HostRateLimiter(rate=0).reserve("https://example.com/word") == 0
@@ -0,0 +1,55 @@
+import time
+import socket
+import pytest
+import httplib2
+
+from kobo2anki import circuit_breaker, image_searcher
+from kobo2anki.circuit_breaker import CircuitState
+
+
+@pytest.fixture
+def searcher(mocker, cache_handler_factory):
+    mocker.patch.object(image_searcher, "get_cache_handler", cache_handler_factory(get_cache_response=None))
+    mocker.patch.object(image_searcher, "GoogleImagesSearch")
+    return image_searcher.ImageSearcher("API_KEY", "CX")
+
+
+class TestImageSearcher:
+
+    def test_get_image_for_word(self, mocker, searcher):
+        result = mocker.MagicMock()
+        result.get_raw_data.return_value = b"image"
+        searcher._gis.results.return_value = [result]
+
+        image = searcher.get_image_for_word("word")
+        assert image.get_filename() == "word.jpg"
+        assert searcher._circuit_breaker.state == CircuitState.CLOSED
+
+    @pytest.mark.parametrize("error", [socket.timeout("timed out"), httplib2.ServerNotFoundError("not found")])
+    def test_network_errors_open_circuit(self, searcher, error):
+        searcher._gis.search.side_effect = error
+
+        for _ in range(5):
+            assert searcher.get_image_for_word("word") is None
+        assert searcher._circuit_breaker.state == CircuitState.OPEN
+        assert searcher._gis.search.call_count == 5
+
+        assert searcher.get_image_for_word("word") is None
+        assert searcher._gis.search.call_count == 5
+
+    def test_unexpected_error_ends_half_open_trial(self, mocker, searcher):
+        searcher._circuit_breaker.trip(open_for=0)
+        searcher._gis.search.side_effect = ValueError("unexpected")
+
+        with pytest.raises(ValueError):
+            searcher.get_image_for_word("word")
+        assert searcher._circuit_breaker.state == CircuitState.OPEN
+
+        # trial failed, the next one is let through once circuit is half-open again
+        monotonic = time.monotonic()
+        mocker.patch.object(circuit_breaker.time, "monotonic", return_value=monotonic + 3600)
+        searcher._gis.search.side_effect = None
+        searcher._gis.results.return_value = []
+        assert searcher.get_image_for_word("word") is None
+        assert searcher._gis.search.call_count == 2
+        assert searcher._circuit_breaker.state == CircuitState.CLOSED
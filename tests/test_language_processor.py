@@ -0,0 +1,69 @@
+import pytest
+
+from kobo2anki import nltk_corpora, language_processor as language_processor_module
+from kobo2anki.language_processor import LanguageProcessor
+
+
+class TestLanguageProcessor:
+
+    def test_wordnet_is_not_loaded_until_used(self, mocker):
+        find_mock = mocker.patch.object(nltk_corpora.nltk.data, "find", wraps=nltk_corpora.nltk.data.find)
+        download_mock = mocker.patch.object(nltk_corpora.nltk, "download")
+        language_processor = LanguageProcessor()
+        find_mock.assert_not_called()
+
+        assert language_processor.lemmatize_word("cats") == "cat"
+        assert find_mock.call_args_list[0] == mocker.call("corpora/wordnet")
+        download_mock.assert_not_called()
+
+    def test_wordnet_is_downloaded_if_missing(self, mocker):
+        mocker.patch.object(nltk_corpora.nltk.data, "find", side_effect=LookupError)
+        download_mock = mocker.patch.object(nltk_corpora.nltk, "download")
+        mocker.patch.object(language_processor_module, "WordNetLemmatizer")
+        mocker.patch.object(language_processor_module, "wordnet")
+        LanguageProcessor().lemmatize_word("cats")
+        download_mock.assert_called_once_with("wordnet")
+
+    def test_lemmatize_word_is_memoized(self, mocker):
+        language_processor = LanguageProcessor()
+        lemmatize_spy = mocker.spy(language_processor.lemmatizer, "lemmatize")
+        assert language_processor.lemmatize_word("cats") == "cat"
+        assert language_processor.lemmatize_word("cats") == "cat"
+        lemmatize_spy.assert_called_once_with("cats", "v")
+
+    def test_lemmatize_word_tries_parts_of_speech(self):
+        language_processor = LanguageProcessor()
+        assert language_processor.lemmatize_word("ran") == "run"
+        assert language_processor.lemmatize_word("runs") == "run"
+        assert language_processor.lemmatize_word("geese") == "goose"
+        assert language_processor.lemmatize_word("test") == "test"
+
+    @pytest.mark.parametrize("word", [
+        "evening", "wedding", "rose", "building", "boring", "interested", "better", "running",
+    ])
+    def test_lemmatize_word_keeps_base_forms(self, word):
+        assert LanguageProcessor().lemmatize_word(word) == word
+
+    def test_lemmatize_many_keeps_order(self):
+        language_processor = LanguageProcessor()
+        assert language_processor.lemmatize_many(["cats", "dogs", "cats", "test"]) == [
+            "cat", "dog", "cat", "test"
+        ]
+
+    def test_lemmatize_many_uses_cached_lemmas(self, mocker):
+        cache_handler = mocker.MagicMock()
+        cache_handler.get_many.return_value = {"geese": b"goose"}
+        language_processor = LanguageProcessor(cache_handler)
+        lemmatize_spy = mocker.spy(language_processor.lemmatizer, "lemmatize")
+
+        assert language_processor.lemmatize_many(["geese", "cats", "geese"]) == ["goose", "cat", "goose"]
+        cache_handler.get_many.assert_called_once_with("lemmas_v2", ["geese", "cats"])
+        cache_handler.put_many.assert_called_once_with("lemmas_v2", {"cats": b"cat"})
+        lemmatize_spy.assert_called_once_with("cats", "v")
+
+    def test_lemmatize_many_all_cached(self, mocker):
+        cache_handler = mocker.MagicMock()
+        cache_handler.get_many.return_value = {"cats": b"cat"}
+        language_processor = LanguageProcessor(cache_handler)
+        assert language_processor.lemmatize_many(["cats"]) == ["cat"]
+        cache_handler.put_many.assert_not_called()
@@ -1,16 +1,24 @@
 import os
+import sys
+import shutil
+import subprocess
+import random
+import asyncio
 import tempfile
 from typing import Callable
 from click.testing import CliRunner
 
 import pytest
 
-from kobo2anki.main import main, cli
+from kobo2anki import caching
+from kobo2anki.main import main, async_main, cli, cache, offline_dict
+from kobo2anki.dicts.offline.storage import OfflineDictReader
 from tests.stubs.dict import FakeDictClient
 from tests.stubs.kobo import FakeKoboReader
 from kobo2anki.anki.anki import AnkiDeck
 from kobo2anki.model import WordDefinition
 from kobo2anki.language_processor import LanguageProcessor
+from kobo2anki.dicts import errors as dict_errors
 
 
 def test_cli_help():
@@ -46,6 +54,20 @@ def test_main_no_words_definitions():
             )
 
 
+def test_main_no_new_words():
+    """
+    Nothing is looked up and no deck is generated when Kobo has no new words.
+    """
+    dict_client = FakeDictClient(expected_definitions={}, expected_exceptions={})
+    with tempfile.TemporaryDirectory() as output_deck_path:
+        added_words = main(
+            dict_client, FakeKoboReader([]), AnkiDeck, LanguageProcessor(),
+            output_deck_path, 0, None, set([]),
+        )
+        assert added_words == []
+        assert os.listdir(output_deck_path) == []
+
+
 def test_main_successful_deck_generation(
         word_definition_factory: Callable[[str], WordDefinition],
 ):
@@ -126,6 +148,66 @@ def test_main_successful_deck_generation_with_exclusion(
         assert added_words == [test_definition]
 
 
+def test_main_normalizes_words_before_dedup_and_exclusion(
+        mocker,
+        word_definition_factory: Callable[[str], WordDefinition],
+):
+    """
+    Different forms of the same word are looked up once and exclusion list is matched
+    against base forms.
+    """
+    test_definition = word_definition_factory("test")
+    run_definition = word_definition_factory("run")
+    dict_client = FakeDictClient(
+        expected_definitions={
+            "test": test_definition,
+            "run": run_definition,
+            "example": word_definition_factory("example"),
+        },
+        expected_exceptions={},
+    )
+    get_definitions_spy = mocker.spy(dict_client, "get_definitions")
+    kobo_db = FakeKoboReader(['Tests', 'test', 'tests', 'runs', 'ran', 'examples', 'Example'])
+    with tempfile.TemporaryDirectory() as output_deck_path:
+        added_words = main(
+            dict_client,
+            kobo_db,
+            AnkiDeck,
+            LanguageProcessor(),
+            output_deck_path,
+            0,
+            None,
+            set(["example"]),
+        )
+    assert sorted(added_words, key=lambda x: x.word) == [run_definition, test_definition]
+    assert sorted(get_definitions_spy.call_args.args[0]) == ["run", "test"]
+
+
+def test_main_failed_lookups_are_retried_later(
+        word_definition_factory: Callable[[str], WordDefinition],
+):
+    """
+    Words dictionary failed to look up because of network errors are passed back to the reader,
+    words it doesn't know or can't parse are not.
+    """
+    test_definition = word_definition_factory("test")
+    dict_client = FakeDictClient(
+        expected_definitions={"test": test_definition},
+        expected_exceptions={
+            "example": lambda: dict_errors.NotAbleToGetWordTranlsation("example", "timeout"),
+            "broken": lambda: dict_errors.CantParseDictData("unexpected JSON"),
+        },
+    )
+    kobo_db = FakeKoboReader(["test", "example", "unknown", "broken"])
+    with tempfile.TemporaryDirectory() as output_deck_path:
+        added_words = main(
+            dict_client, kobo_db, AnkiDeck, LanguageProcessor(),
+            output_deck_path, 0, None, set([]),
+        )
+    assert added_words == [test_definition]
+    assert kobo_db.words_to_retry == {"example"}
+
+
 def test_main_successful_deck_generation_multiple_decks(
         word_definition_factory: Callable[[str], WordDefinition],
 ):
@@ -169,3 +251,250 @@ def test_main_successful_deck_generation_multiple_decks(
         assert os.path.getsize(expected_second_deck_file_path) > 0
 
         assert sorted(added_words) == sorted([test_definition, example_definition])
+
+
+def test_main_concurrent_lookups_same_as_serial(
+        word_definition_factory: Callable[[str], WordDefinition],
+):
+    """
+    Looking up words with several workers gives the same words in the same order as a serial run.
+    Words dictionary can't find or fails to get are skipped in both cases.
+    """
+    words = [f"word{i}" for i in range(20)]
+    dict_client = FakeDictClient(
+        expected_definitions={
+            word: word_definition_factory(word) for word in words[:15]
+        },
+        expected_exceptions={
+            "word15": lambda: dict_errors.NotAbleToGetWordTranlsation("word15", "error"),
+            "word16": lambda: dict_errors.CantParseDictData("error"),
+        },
+    )
+    language_processor = LanguageProcessor()
+    results = []
+    for workers in (1, 4):
+        random.seed(42)
+        with tempfile.TemporaryDirectory() as output_deck_path:
+            results.append(
+                main(
+                    dict_client,
+                    FakeKoboReader(words),
+                    AnkiDeck,
+                    language_processor,
+                    output_deck_path,
+                    0,
+                    None,
+                    set([]),
+                    workers=workers,
+                )
+            )
+    serial_words, concurrent_words = results
+    assert len(serial_words) == 15
+    assert concurrent_words == serial_words
+
+
+def test_async_main_same_as_main(
+        word_definition_factory: Callable[[str], WordDefinition],
+):
+    words = [f"word{i}" for i in range(10)]
+    dict_client = FakeDictClient(
+        expected_definitions={
+            word: word_definition_factory(word) for word in words[:8]
+        },
+        expected_exceptions={
+            "word8": lambda: dict_errors.NotAbleToGetWordTranlsation("word8", "error"),
+        },
+    )
+    language_processor = LanguageProcessor()
+    results = []
+    retried_words = []
+    for run in (main, lambda *args, **kwargs: asyncio.run(async_main(*args, **kwargs))):
+        random.seed(42)
+        kobo_db = FakeKoboReader(words)
+        with tempfile.TemporaryDirectory() as output_deck_path:
+            results.append(
+                run(
+                    dict_client,
+                    kobo_db,
+                    AnkiDeck,
+                    language_processor,
+                    output_deck_path,
+                    0,
+                    None,
+                    set([]),
+                    workers=2,
+                )
+            )
+        retried_words.append(kobo_db.words_to_retry)
+    sync_words, async_words = results
+    assert len(sync_words) == 8
+    assert async_words == sync_words
+    assert retried_words == [{"word8"}, {"word8"}]
+
+
+def test_cache_gc_and_stats(mocker):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        mocker.patch.object(caching.appdirs, "user_cache_dir", return_value=cache_dir)
+        caching.LocalFSCaching().save_data_to_cache("wp", "word.mp3", b"12345")
+        caching.LocalFSCaching().save_data_to_cache("images", "word.jpg", b"12345")
+
+        runner = CliRunner()
+        result = runner.invoke(cache, ["--cache-backend", "fs", "stats"])
+        assert result.exit_code == 0
+        assert "wp: 1 records" in result.output
+        assert "images: 1 records" in result.output
+
+        result = runner.invoke(cache, ["--cache-backend", "fs", "--max-size", "wp=0", "gc"])
+        assert result.exit_code == 0
+        assert "Removed 1 records" in result.output
+        assert caching.LocalFSCaching().usage()["wp"].entries == 0
+
+        result = runner.invoke(cache, ["--max-size", "wp", "gc"])
+        assert result.exit_code != 0
+
+
+def test_offline_dict_build(mocker):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        mocker.patch.object(caching.appdirs, "user_cache_dir", return_value=cache_dir)
+        caching.LocalFSCaching().save_data_to_cache(
+            "freedictionary", "word_example.json",
+            b'[{"word": "example", "meanings": [{"partOfSpeech": "noun", '
+            + b'"definitions": [{"definition": "A representative form."}]}]}]'
+        )
+        dict_path = os.path.join(cache_dir, "offline_dict")
+
+        result = CliRunner().invoke(
+            offline_dict, ["build", dict_path, "--cache-backend", "fs", "--source", "freedict"]
+        )
+        assert result.exit_code == 0, result.output
+        assert "Imported 1 words" in result.output
+        assert OfflineDictReader(dict_path).words() == ["example"]
+
+
+@pytest.fixture
+def kobo_mount_path(tmp_path):
+    os.makedirs(tmp_path / "kobo" / ".kobo")
+    shutil.copy(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "kobo/data/test_db.sqlite"),
+        tmp_path / "kobo" / ".kobo" / "KoboReader.sqlite",
+    )
+    return str(tmp_path / "kobo")
+
+
+def test_cli_exits_early_when_kobo_db_is_unchanged(mocker, tmp_path, kobo_mount_path):
+    mocker.patch.object(caching.appdirs, "user_cache_dir", return_value=str(tmp_path / "cache"))
+    init_dict_client_mock = mocker.patch(
+        "kobo2anki.main._init_dict_client", return_value=FakeDictClient({}, {})
+    )
+    main_mock = mocker.patch("kobo2anki.main.main", return_value=[])
+    args = [kobo_mount_path, str(tmp_path / "decks"), "--cache-backend", "fs"]
+    try:
+        result = CliRunner().invoke(cli, args)
+        assert result.exit_code == 0, result.output
+        assert main_mock.call_count == 1
+
+        # nothing was saved on Kobo since the last run
+        result = CliRunner().invoke(cli, args)
+        assert result.exit_code == 0, result.output
+        assert main_mock.call_count == 1
+        assert init_dict_client_mock.call_count == 1
+
+        result = CliRunner().invoke(cli, args + ["--force"])
+        assert result.exit_code == 0, result.output
+        assert main_mock.call_count == 2
+    finally:
+        caching.configure_cache()
+
+
+def test_cli_uses_asyncio(mocker, tmp_path, kobo_mount_path):
+    mocker.patch.object(caching.appdirs, "user_cache_dir", return_value=str(tmp_path / "cache"))
+    mocker.patch("kobo2anki.main._init_dict_client", return_value=FakeDictClient({}, {}))
+    main_mock = mocker.patch("kobo2anki.main.main", return_value=[])
+    async_main_mock = mocker.patch("kobo2anki.main.async_main", return_value=[])
+    configure_mock = mocker.patch("kobo2anki.aio_session.configure_async_session")
+    args = [
+        kobo_mount_path, str(tmp_path / "decks"), "--cache-backend", "fs",
+        "--use-asyncio", "--max-requests-per-host", "3",
+    ]
+    try:
+        result = CliRunner().invoke(cli, args)
+        assert result.exit_code == 0, result.output
+        assert async_main_mock.await_count == 1
+        assert main_mock.call_count == 0
+        assert configure_mock.call_args.kwargs["max_requests_per_host"] == 3
+    finally:
+        caching.configure_cache()
+
+
+def test_cli_doesnt_skip_failed_run(mocker, tmp_path, kobo_mount_path):
+    mocker.patch.object(caching.appdirs, "user_cache_dir", return_value=str(tmp_path / "cache"))
+    mocker.patch("kobo2anki.main._init_dict_client", return_value=FakeDictClient({}, {}))
+    main_mock = mocker.patch("kobo2anki.main.main", side_effect=OSError("No space left on device"))
+    args = [kobo_mount_path, str(tmp_path / "decks"), "--cache-backend", "fs"]
+    try:
+        assert CliRunner().invoke(cli, args).exit_code != 0
+        assert CliRunner().invoke(cli, args).exit_code != 0
+        assert main_mock.call_count == 2
+    finally:
+        caching.configure_cache()
+
+
+def test_cli_skips_run_after_no_definitions_found(mocker, tmp_path, kobo_mount_path):
+    """
+    Run where dictionary knows none of the words still counts, the same words aren't read again.
+    """
+    mocker.patch.object(caching.appdirs, "user_cache_dir", return_value=str(tmp_path / "cache"))
+    mocker.patch("kobo2anki.main._init_dict_client", return_value=FakeDictClient({}, {}))
+    main_spy = mocker.patch("kobo2anki.main.main", side_effect=main)
+    args = [kobo_mount_path, str(tmp_path / "decks"), "--cache-backend", "fs", "--incremental"]
+    try:
+        result = CliRunner().invoke(cli, args)
+        assert result.exit_code == 0, result.output
+        assert CliRunner().invoke(cli, args).exit_code == 0
+        assert main_spy.call_count == 1
+    finally:
+        caching.configure_cache()
+
+
+def test_cli_module_doesnt_import_heavy_dependencies():
+    code = (
+        "import sys, kobo2anki.main; "
+        "print(sorted(m for m in ('nltk', 'genanki', 'googleapiclient', 'aiohttp') if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_cli_doesnt_skip_run_after_failed_lookups(mocker, tmp_path, kobo_mount_path):
+    mocker.patch.object(caching.appdirs, "user_cache_dir", return_value=str(tmp_path / "cache"))
+    mocker.patch("kobo2anki.main._init_dict_client", return_value=FakeDictClient({}, {}))
+
+    def main_with_failed_lookups(dict_client, kobo_db, *args, **kwargs):
+        kobo_db.retry_later(["flatter"])
+        return []
+
+    main_mock = mocker.patch("kobo2anki.main.main", side_effect=main_with_failed_lookups)
+    args = [kobo_mount_path, str(tmp_path / "decks"), "--cache-backend", "fs"]
+    try:
+        assert CliRunner().invoke(cli, args).exit_code == 0
+        assert CliRunner().invoke(cli, args).exit_code == 0
+        assert main_mock.call_count == 2
+    finally:
+        caching.configure_cache()
+
+
+def test_cli_runs_cache_gc_after_conversion(mocker, tmp_path, kobo_mount_path):
+    mocker.patch.object(caching.appdirs, "user_cache_dir", return_value=str(tmp_path / "cache"))
+    mocker.patch("kobo2anki.main._init_dict_client", return_value=FakeDictClient({}, {}))
+    mocker.patch("kobo2anki.main.main", return_value=[])
+    gc_mock = mocker.patch.object(caching.SQLiteCaching, "gc", return_value=caching.GCResult(2, 10))
+    args = [kobo_mount_path, str(tmp_path / "decks"), "--cache-backend", "sqlite"]
+    try:
+        result = CliRunner().invoke(cli, args)
+        assert result.exit_code == 0, result.output
+        gc_mock.assert_called_once_with()
+    finally:
+        caching.configure_cache()
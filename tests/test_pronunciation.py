@@ -30,12 +30,12 @@ class TestWordPronunciation:
         get_mock = requests_mock("get", 200, self.test_response)
         mocker.patch.object(
             pronunciation,
-            "requests",
-            get_mock
+            "get_session",
+            return_value=get_mock
         )
 
         cache_mock = cache_handler_factory(None)
-        mocker.patch.object(pronunciation, "LocalFSCaching", cache_mock)
+        mocker.patch.object(pronunciation, "get_cache_handler", cache_mock)
 
         wp = pronunciation.WordPronunciation(self.test_url)
         with tempfile.TemporaryDirectory() as tmpdirname:
@@ -69,8 +69,8 @@ class TestWordPronunciation:
         get_mock = requests_mock("get", 500, b"")
         mocker.patch.object(
             pronunciation,
-            "requests",
-            get_mock
+            "get_session",
+            return_value=get_mock
         )
 
         wp = pronunciation.WordPronunciation(self.test_url)